@@ -25,5 +25,12 @@ __references__ = {1: dict(title='Revised Release on the IAPWS Industrial '
                   5: dict(title='Internation Steam Tables Properties of Water and Steam based on the Industrial Formulation IAPWS-IF97',
                           edition=3,
                           author=('Wagner, Wolfgang', 'Kretzschmar, Hans-Joachim'),
-                          ISBN='978-3-662-53217-1')
+                          ISBN='978-3-662-53217-1'),
+                  6: dict(title='Release on the IAPWS Formulation 2008 for the Viscosity of Ordinary Water Substance',
+                          date=date(2008, 9, 1),
+                          url='http://www.iapws.org/relguide/viscosity.html'),
+                  7: dict(title='Release on the IAPWS Formulation 2011 for the Thermal Conductivity of Ordinary Water '
+                                'Substance',
+                          date=date(2011, 9, 1),
+                          url='http://www.iapws.org/relguide/ThCond.html')
                   }
@@ -1,9 +1,12 @@
 import numpy as np
-from typing import Optional, Dict
+from fractions import Fraction
+from math import gcd, log, sqrt
+from typing import Callable, Optional, Dict, Iterable, Tuple, Union
 from abc import ABC, abstractmethod
-from collections import defaultdict
 from dataclasses import dataclass
 
+from scipy.optimize import newton
+
 R = 0.461526  # kJ/(kg*K)
 T_c = 647.096  # K
 p_c = 22.064  # MPa
@@ -186,10 +189,22 @@ def _p_s(T: float) -> float:
     Returns:
         The saturation pressure at the given temperature in MPa.
     Raises:
-        ValueError if T is out of bounds (bounds: [273.15, 647.096])
+        ValueError if T is out of bounds (bounds: [273.15, 647.096]). For arrays, with a status per point instead, see
+        `saturation.p_sat`.
     """
     if not 273.15 <= T <= 647.096:
         raise ValueError(f'T must be in the range [273.15, 647.096]. {T} given.')
+    return _p_s_eqn(T)
+
+
+def _p_s_eqn(T: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """
+    Equation 30 without the range check, so that it can be evaluated over arrays.
+    Args:
+        T: Temperature in K.
+    Returns:
+        The saturation pressure at the given temperature in MPa.
+    """
     z = T + table34[9] / (T - table34[10])
     A = z ** 2 + table34[1] * z + table34[2]
     B = table34[3] * z ** 2 + table34[4] * z + table34[5]
@@ -198,6 +213,66 @@ def _p_s(T: float) -> float:
     return p ** 4
 
 
+def _T_s_eqn(p: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """
+    Equation 31 (saturation temperature) without a range check, so that it can be evaluated over arrays.
+    Args:
+        p: Pressure in MPa.
+    Returns:
+        The saturation temperature at the given pressure in K.
+    """
+    beta = p ** (1 / 4)
+    E = beta ** 2 + table34[3] * beta + table34[6]
+    F = table34[1] * beta ** 2 + table34[4] * beta + table34[7]
+    G = table34[2] * beta ** 2 + table34[5] * beta + table34[8]
+    D = 2 * G / (-F - np.sqrt(F ** 2 - 4 * E * G))
+    return (table34[10] + D - np.sqrt((table34[10] + D) ** 2 - 4 * (table34[9] + table34[10] * D))) / 2
+
+
+def _piecewise(args: Tuple[np.ndarray, ...], conditions: Tuple, functions: Tuple[Callable, ...]):
+    """
+    Evaluates every function on the points where its condition holds, e.g. the backward equations of the subregions of
+    a region. 0-d inputs are evaluated as floats by the function of their subregion only, instead of by every function
+    on the masked arrays of one or no point.
+    Args:
+        args: Inputs of the functions, broadcast against each other.
+        conditions: Masks of the points of every function. Points where none holds are NaN.
+        functions: Functions of the inputs.
+    Returns:
+        The values, as a float for 0-d inputs.
+    """
+    if not args[0].shape:
+        for condition, function in zip(conditions, functions):
+            if condition:
+                return function(*(float(arg) for arg in args))
+        return np.nan
+    values = np.full(args[0].shape, np.nan)
+    for condition, function in zip(conditions, functions):
+        values[condition] = function(*(arg[condition] for arg in args))
+    return values
+
+
+def _newton(f: Callable[[float], float], x0: float, guess: Optional[float] = None) -> float:
+    """
+    Root of f with scipy's Newton method, warm-started from `guess` (e.g. the root of the previous sample of a time
+    series) if it is given.
+    Args:
+        f: Function of one variable.
+        x0: Cold start, used if there is no guess or the iteration from the guess fails.
+        guess: Warm start.
+    Returns:
+        The root.
+    """
+    if guess is not None:
+        try:
+            x = newton(f, guess)
+        except (RuntimeError, ValueError):
+            x = np.nan
+        if np.isfinite(x):
+            return x
+    return newton(f, x0)
+
+
 def _hp_1(s: float) -> float:
     """Define the saturated line boundary between Region 1 and 4.
 
@@ -216,9 +291,14 @@ def _hp_1(s: float) -> float:
     if not -1.545495919e-4 <= s <= 3.77828134:
         raise NotImplementedError(f's should be -1.545495919e-4 <= s <= 3.77828134. {s} provided.')
 
+    return _hp_1_eqn(s)
+
+
+def _hp_1_eqn(s: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Same as `_hp_1` without the range check, so that it can be evaluated over arrays."""
     sigma = s / 3.8
-    return 1700 * sum(entry['n'] * (sigma - 1.09) ** entry['I'] * (sigma + 0.366e-4) ** entry['J'] for entry in
-                      table9_supp_ref2.values())
+    return 1700 * _poly(table9_supp_ref2, sigma - 1.09, sigma + 0.366e-4)
+
 
 def _hp_3a(s: float) -> float:
     """Define the saturated line boundary between Region 4 and 3a.
@@ -238,9 +318,13 @@ def _hp_3a(s: float) -> float:
     if not 3.778281340 <= s <= s_c:
         raise NotImplementedError(f's should be 3.778281340 <= s <= {s_c}. {s} provided.')
 
-    sigma = s/3.8
-    return 1700 * sum(entry['n'] * (sigma - 1.09) ** entry['I'] * (sigma + 0.366e-4) ** entry['J'] for entry in
-                      table10_supp_ref2.values())
+    return _hp_3a_eqn(s)
+
+
+def _hp_3a_eqn(s: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Same as `_hp_3a` without the range check, so that it can be evaluated over arrays."""
+    sigma = s / 3.8
+    return 1700 * _poly(table10_supp_ref2, sigma - 1.09, sigma + 0.366e-4)
 
 
 def _hpp_2ab(s: float) -> float:
@@ -261,11 +345,12 @@ def _hpp_2ab(s: float) -> float:
     if not 5.85 <= s <= 9.155759395:
         raise NotImplementedError(f's should be 5.85 <= s <= 9.155759395. {s} provided.')
 
-    sigma_1 = s / 5.21
-    sigma_2 = s / 9.2
-    return 2800 * np.exp(sum(
-        entry['n'] * (1 / sigma_1 - 0.513) ** entry['I'] * (sigma_2 - 0.524) ** entry['J'] for entry in
-        table16_supp_ref2.values()))
+    return _hpp_2ab_eqn(s)
+
+
+def _hpp_2ab_eqn(s: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Same as `_hpp_2ab` without the range check, so that it can be evaluated over arrays."""
+    return 2800 * np.exp(_poly(table16_supp_ref2, 5.21 / s - 0.513, s / 9.2 - 0.524))
 
 
 def _hpp_2c3b(s: float) -> float:
@@ -286,9 +371,13 @@ def _hpp_2c3b(s: float) -> float:
     if not s_c <= s <= 5.85:
         raise NotImplementedError(f's should be {s_c} <= s <= 5.85. {s} provided.')
 
+    return _hpp_2c3b_eqn(s)
+
+
+def _hpp_2c3b_eqn(s: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Same as `_hpp_2c3b` without the range check, so that it can be evaluated over arrays."""
     sigma = s / 5.9
-    return 2800 * sum(entry['n'] * (sigma - 1.02) ** entry['I'] * (sigma - 0.726) ** entry['J'] for entry in
-                      table17_supp_ref2.values()) ** 4
+    return 2800 * _poly(table17_supp_ref2, sigma - 1.02, sigma - 0.726) ** 4
 
 
 def _h_b13(s: float) -> float:
@@ -309,10 +398,13 @@ def _h_b13(s: float) -> float:
     if not 3.397782955 <= s <= 3.77828134:
         raise NotImplementedError(f's should be 3.77828134 <= s <= 3.397782955. {s} provided.')
 
-    sigma = s / 3.8
+    return _h_b13_eqn(s)
+
 
-    return 1700 * sum(entry['n'] * (sigma - 0.884) ** entry['I'] * (sigma - 0.864) ** entry['J'] for entry in
-                      table23_supp_ref2.values())
+def _h_b13_eqn(s: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Same as `_h_b13` without the range check, so that it can be evaluated over arrays."""
+    sigma = s / 3.8
+    return 1700 * _poly(table23_supp_ref2, sigma - 0.884, sigma - 0.864)
 
 
 def _T_b23(h: float, s: float) -> float:
@@ -336,41 +428,684 @@ def _T_b23(h: float, s: float) -> float:
     elif not 2.563592004e3 <= h <= 2.812942061e3:
         raise NotImplementedError(f'h should be 2.563592004e3 <= h <= 2.812942061e3. {h} provided.')
 
-    nu = h / 3000
-    sigma = s / 5.3
+    return _T_b23_eqn(h, s)
 
-    return 900 * sum(
-        entry['n'] * (nu - 0.727) ** entry['I'] * (sigma - 0.864) ** entry['J'] for entry in table25_supp_ref2.values())
 
+def _T_b23_eqn(h: Union[float, np.ndarray], s: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Same as `_T_b23` without the range check, so that it can be evaluated over arrays."""
+    return 900 * _poly(table25_supp_ref2, h / 3000 - 0.727, s / 5.3 - 0.864)
 
-def region(p: float, T: float) -> int:
+
+def region(p: Union[float, np.ndarray], T: Union[float, np.ndarray]) -> Union[int, np.ndarray]:
     """
-    Implements the equation for the boundary between 2 and 3.
+    Finds the region of a (p, T) pair according to Figure 1 of [1].
+    Points on the saturation line are assigned to Region1, points on the 2-3 boundary and on the 1073.15 K isotherm
+    to Region2.
     Args:
-        p: Pressure (MPa).
-        T: Temperature (K).
+        p: Pressure (MPa). Scalar or array.
+        T: Temperature (K). Scalar or array.
     Returns:
-        The region number.
+        The region number. If arrays are given, an array of region numbers is returned where 0 marks points out of
+        bounds.
     Raises:
-        ValueError is p and T combination are out of bounds.
+        ValueError is p and T combination are out of bounds (scalar inputs only).
+    """
+    if np.ndim(p) == 0 and np.ndim(T) == 0:
+        return _region_scalar(float(p), float(T))
+    p, T = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(T, dtype=float))
+
+    low_T = (273.15 <= T) & (T <= 623.15)
+    mid_T = (623.15 < T) & (T <= 863.15)
+    high_T = (863.15 < T) & (T <= 1073.15)
+    very_high_T = (1073.15 < T) & (T <= 2273.15)
+    with np.errstate(invalid='ignore'):
+        p_sat = _p_s_eqn(np.where(low_T, T, 273.15))
+        p_23 = b23(T=T)
+
+    codes = np.select([low_T & (p_sat <= p) & (p <= 100),
+                       low_T & (0 < p) & (p < p_sat),
+                       mid_T & (0 < p) & (p <= p_23),
+                       mid_T & (p_23 < p) & (p <= 100),
+                       high_T & (0 < p) & (p <= 100),
+                       very_high_T & (0 < p) & (p <= 50)],
+                      [1, 2, 2, 3, 2, 5], default=0).astype(np.int8)
+    return codes
+
+
+def _region_scalar(p: float, T: float) -> int:
+    """Same as `region` for a single (p, T) pair, with plain float comparisons instead of array operations."""
+    if 0 < p <= 100:
+        if 273.15 <= T <= 623.15:
+            return 1 if _p_s_eqn(T) <= p else 2
+        elif 623.15 < T <= 863.15:
+            return 2 if p <= b23(T=T) else 3
+        elif 863.15 < T <= 1073.15:
+            return 2
+        elif 1073.15 < T <= 2273.15 and p <= 50:
+            return 5
+    raise ValueError(f'State out of bounds. p={p}, T={T}.')
+
+
+def region_hs(h: Union[float, np.ndarray], s: Union[float, np.ndarray]) -> np.ndarray:
+    """
+    Finds the region of (h, s) pairs according to Figure 1 of [2], over arrays.
+
+    The region boundaries are evaluated with the equations of [2] as functions of s (saturation line, 1-3 boundary)
+    and of h and s (2-3 boundary), over masks instead of range checks. The outer bounds of the formulation have no such
+    equations: the 100 MPa isobar is solved on the forward equations (see `solvers`), while 273.15 K, 1073.15 K and,
+    in Region2, p_s(273.15 K) are checked on the backward equations p(h, s) and T(p, h), so points closer to them than
+    the accuracy of the backward equations may be misplaced. Points on the saturation line are assigned to the
+    single-phase regions.
+    Args:
+        h: Enthalpy (kJ/kg). Scalar or array.
+        s: Entropy (kJ/kg/K). Scalar or array (broadcast against h).
+    Returns:
+        The region numbers (int8) with the broadcast shape of the inputs, 0 marking points out of bounds.
+    """
+    # The regions import this module, so they can only be imported once all are loaded.
+    from . import solvers
+    from .region1 import Region1
+    from .region2 import Region2
+
+    h, s = np.broadcast_arrays(np.asarray(h, dtype=float), np.asarray(s, dtype=float))
+    p_min = _p_s_eqn(273.15)
+    # Saturated liquid and vapour at 273.15 K: the two-phase region lies above the straight line joining them.
+    s_liquid, s_vapour = -1.545_495_919e-4, 9.155_759_395
+    h_liquid, h_vapour = float(Region1.evaluate(273.15, p_min).h), float(Region2.evaluate(273.15, p_min).h)
+
+    liquid_1 = (s_liquid <= s) & (s <= 3.778_281_34)
+    liquid_3 = (3.778_281_34 < s) & (s <= s_c)
+    vapour_3 = (s_c < s) & (s < 5.85)
+    vapour_2 = (5.85 <= s) & (s <= s_vapour)
+    band_13 = (3.397_782_955 <= s) & (s <= 3.778_281_34)
+    band_23 = (5.048_096_828 <= s) & (s <= 5.260_578_707) & (2.563_592_004e3 <= h) & (h <= 2.812_942_061e3)
+
+    h_sat = np.full(h.shape, -np.inf)
+    h_b13 = np.full(h.shape, np.nan)
+    p_b23, p_2c = np.full(h.shape, np.nan), np.full(h.shape, np.nan)
+    with np.errstate(invalid='ignore', over='ignore'):
+        h_sat[liquid_1] = _hp_1_eqn(s[liquid_1])
+        h_sat[liquid_3] = _hp_3a_eqn(s[liquid_3])
+        h_sat[vapour_3] = _hpp_2c3b_eqn(s[vapour_3])
+        h_sat[vapour_2] = _hpp_2ab_eqn(s[vapour_2])
+        h_b13[band_13] = _h_b13_eqn(s[band_13])
+        p_b23[band_23] = b23(T=_T_b23_eqn(h[band_23], s[band_23]))
+        p_2c[band_23] = Region2._p_hs(h[band_23], s[band_23])
+
+    two_phase = (s_liquid <= s) & (s <= s_vapour) & (h < h_sat) & \
+                (h_liquid + (s - s_liquid) * (h_vapour - h_liquid) / (s_vapour - s_liquid) <= h)
+    region1 = (s < 3.397_782_955) | (band_13 & (h < h_b13))
+    region2 = (s > 5.260_578_707) | ((5.048_096_828 <= s) & (h > 2.812_942_061e3)) | (band_23 & (p_2c <= p_b23))
+    codes = np.select([two_phase, ~(h >= h_sat), region1, region2], [4, 0, 1, 2], default=3).astype(np.int8)
+
+    # Upper bound: the 100 MPa isobar, solved on the forward equations of the regions it crosses.
+    s_23, s_max = float(Region2.evaluate(863.15, 100).s), float(Region2.evaluate(1073.15, 100).s)
+    h_max = np.full(h.shape, np.inf)
+    for code, mask in ((1, s <= 3.397_782_955), (3, (3.397_782_955 < s) & (s <= s_23)), (2, (s_23 < s) & (s <= s_max))):
+        if mask.any():
+            h_max[mask] = solvers.solve_ps(code, np.full(mask.sum(), 100.), s[mask]).state.h
+
+    # Other bounds: 273.15 K in Region1, 1073.15 K and p_s(273.15 K) in Region2, on the backward equations p(h, s) and
+    # T(p, h). Points out of the range of the equations give NaN and are out of bounds.
+    p, T = np.full(h.shape, np.nan), np.full(h.shape, np.nan)
+    with np.errstate(invalid='ignore', over='ignore'):
+        for code, kernel in ((1, Region1), (2, Region2)):
+            mask = (codes == code) & (h <= h_max)
+            p[mask] = kernel._p_hs(h[mask], s[mask])
+            T[mask] = kernel._T_ph(p[mask], h[mask])
+
+    valid = (h <= h_max) & np.select([codes == 1, codes == 2],
+                                     [273.15 <= T, (p_min <= p) & (T <= 1073.15)],
+                                     default=True)
+    return np.where(valid, codes, 0).astype(np.int8)
+
+
+# Evaluation plans of the coefficient tables (see `_plan`), by table id. The table is kept with its plan so that its id
+# cannot be reused by another table.
+_plans: Dict[int, Tuple] = {}
+
+
+def _plan(table: Dict[int, Dict[str, float]]) -> Tuple:
+    """
+    Arranges the terms of a coefficient table for nested Horner evaluation, once per table.
+
+    Fractional exponents (e.g. the quarters of `Region2.table25`) are made integers by counting them in units of 1/d,
+    d being the least common denominator of the exponents of the variable. Tables without I exponents (the ideal-gas
+    parts of `_ideal_gas`) are a single row of I = 0.
+    Returns:
+        The tuple (rows, x_ladder, y_ladder). `rows` holds one (I*d, I, P, Q, R, S) row per I exponent, by decreasing
+        I, where P, Q and R are the (J*d, n), (J*d, J * n) and (J*d, J * (J - 1) * n) pairs of its terms by decreasing
+        J, and S the same terms as (J*d, n, J * n, J * (J - 1) * n) for the scalar path of `_poly_ders`. The ladders
+        are the (k, k / d) pairs of the powers of each variable that `_ladder` builds.
+    """
+    plan = _plans.get(id(table))
+    if plan is None or plan[0] is not table:
+        d_x = _denominator(entry.get('I', 0) for entry in table.values())
+        d_y = _denominator(entry['J'] for entry in table.values())
+        terms = {}
+        for entry in table.values():
+            terms.setdefault(entry.get('I', 0), []).append((entry['J'], entry['n']))
+        rows = []
+        for I in sorted(terms, reverse=True):
+            row = sorted(terms[I], key=lambda term: term[0], reverse=True)
+            rows.append((int(I * d_x), I, tuple((int(J * d_y), n) for J, n in row),
+                         tuple((int(J * d_y), J * n) for J, n in row),
+                         tuple((int(J * d_y), J * (J - 1) * n) for J, n in row),
+                         tuple((int(J * d_y), n, J * n, J * (J - 1) * n) for J, n in row)))
+        y_powers = set().union(*(_powers(tuple(e for e, _ in row[2])) for row in rows))
+        plan = _plans[id(table)] = (table, tuple(rows), _exponents(d_x, _powers(tuple(row[0] for row in rows))),
+                                    _exponents(d_y, y_powers))
+    return plan[1:]
+
+
+def _denominator(exponents) -> int:
+    """Least common denominator of the exponents."""
+    d = 1
+    for exponent in exponents:
+        denominator = Fraction(exponent).limit_denominator(1000).denominator
+        d = d * denominator // gcd(d, denominator)
+    return d
+
+
+def _exponents(d: int, powers: Iterable[int]) -> Tuple[Tuple[int, Union[int, float]], ...]:
+    """The (k, k / d) pairs of a ladder, the exponent being kept an int if d is 1."""
+    return tuple((k, k if d == 1 else k / d) for k in sorted(powers))
+
+
+def _powers(exponents: Tuple[int, ...]) -> frozenset:
+    """Powers of z that `_horner` needs for the given decreasing exponents: their gaps and the lowest exponent."""
+    return frozenset([a - b for a, b in zip(exponents, exponents[1:])] + [exponents[-1]]) - {0}
+
+
+def _ladder(z, ladder: Tuple[Tuple[int, Union[int, float]], ...]) -> Dict[int, Union[float, np.ndarray]]:
+    """
+    The powers of z given by `ladder` (see `_plan`), as {k: z**(k / d)}.
+
+    Every power is raised directly rather than built as a product of other powers: the error of a product of powers
+    adds up along the chain of products (a few ulps for the exponents of up to 58 of `Region2.table11`), and a power
+    of a d-th root of z amplifies the error of the root by the exponent. A ladder holds a few dozen powers at most, so
+    on arrays their cost stays small against that of the Horner polynomials, as long as z is positive: numpy raises
+    negative numbers tens of times slower, so integer powers of arrays are raised on |z| and given the sign of z back
+    when odd.
+    """
+    powers = {0: 1}
+    if isinstance(z, np.ndarray) and ladder and isinstance(ladder[0][1], int):
+        magnitude = np.abs(z)
+        for k, exponent in ladder:
+            power = powers[k] = magnitude ** exponent
+            if k % 2:
+                np.copysign(power, z, out=power)
+        return powers
+    for k, exponent in ladder:
+        powers[k] = z ** exponent
+    return powers
+
+
+def _fma(value, power, c, shape: Tuple[int, ...]):
+    """`value * power + c`, in place if value is an array of the result shape."""
+    if isinstance(value, np.ndarray) and value.shape == shape:
+        value *= power
+        value += c
+        return value
+    return value * power + c
+
+
+def _horner(terms: Iterable[Tuple], powers: Dict[int, Union[float, np.ndarray]], shape: Tuple[int, ...]):
+    """
+    Evaluates `sum(c * z**e)` over (e, c) pairs by decreasing e as a nested Horner polynomial: consecutive terms are
+    joined by the power of z that spans their gap, and the result is scaled by z to the lowest exponent.
+    Args:
+        terms: (e, c) pairs. c can be a scalar or an array, which may be updated in place. Read one at a time, so a
+            generator holds a single term in memory.
+        powers: Powers of z (see `_ladder`).
+        shape: Shape of the result.
+    Returns:
+        The value of the polynomial.
+    """
+    terms = iter(terms)
+    e, value = next(terms)
+    for e_next, c in terms:
+        value = _fma(value, powers[e - e_next], c, shape)
+        e = e_next
+    return _fma(value, powers[e], 0, shape) if e else value
+
+
+def _scalar(z, ladder: Tuple[Tuple[int, Union[int, float]], ...]) -> Union[float, np.float64]:
+    """
+    The variable of a single point as a float. A negative value with fractional exponents is kept as a numpy float, so
+    that its roots are NaN (with a warning) as on arrays instead of complex.
+    """
+    z = float(z) if np.ndim(z) == 0 else float(np.ravel(z)[0])
+    return np.float64(z) if z < 0 and ladder and isinstance(ladder[0][1], float) else z
+
+
+def _scalar(z, ladder: Tuple[Tuple[int, Union[int, float]], ...]) -> Union[float, np.float64]:
+    """
+    A 0-d variable of `_poly` as a float. A negative value with fractional exponents is kept as a numpy float, so that
+    its roots are NaN (with a warning) as on arrays instead of complex.
+    """
+    z = float(z)
+    return np.float64(z) if z < 0 and ladder and isinstance(ladder[0][1], float) else z
+
+
+def _one_point(scalar: Callable, rows: Tuple, x_ladder: Tuple, y_ladder: Tuple, x, y):
+    """
+    Evaluates `_poly` or `_poly_ders` at a single point given as 0-d inputs with their scalar path (`scalar`), which
+    works on floats much faster than the array path on 0-d arrays.
+    """
+    try:
+        return scalar(rows, x_ladder, y_ladder, _scalar(x, x_ladder), _scalar(y, y_ladder))
+    except (ZeroDivisionError, OverflowError):
+        # Python floats raise where numpy gives inf or NaN with a warning.
+        return scalar(rows, x_ladder, y_ladder, np.float64(x), np.float64(y))
+
+
+def _poly_scalar(rows: Tuple, x_ladder: Tuple, y_ladder: Tuple, x: float, y: float) -> float:
+    """
+    `_poly` on scalars, as plain loops over the terms instead of going through `_horner` and `_fma`, whose per-term
+    overhead outweighs the arithmetic of a single point.
+    """
+    xs, ys = _ladder(x, x_ladder), _ladder(y, y_ladder)
+    f, last = 0., None
+    for e, _, P, _, _, _ in rows:
+        terms = iter(P)
+        k, p = next(terms)
+        for k_next, c in terms:
+            p = p * ys[k - k_next] + c
+            k = k_next
+        if k:
+            p *= ys[k]
+        f = p if last is None else f * xs[last - e] + p
+        last = e
+    return f * xs[last] if last else f
+
+
+def _poly(table: Dict[int, Dict[str, float]], x, y):
+    """
+    Evaluates the power series `sum(n * x**I * y**J)` of a coefficient table.
+
+    The series is evaluated as a Horner polynomial in x whose coefficients are Horner polynomials in y (see `_plan`),
+    on powers of x and y built once per call (see `_ladder`), instead of raising x and y to a power for every term.
+    Args:
+        table: Coefficient table where each entry has an 'I', 'J' and 'n' key.
+        x: Variable raised to the 'I' exponents. Scalar or array.
+        y: Variable raised to the 'J' exponents. Scalar or array.
+    Returns:
+        The value of the series.
+    """
+    rows, x_ladder, y_ladder = _plan(table)
+    shape = np.broadcast(x, y).shape
+    if not shape:
+        return _one_point(_poly_scalar, rows, x_ladder, y_ladder, x, y)
+    ys = _ladder(y, y_ladder)
+    return _horner(((e, _horner(P, ys, shape)) for e, _, P, _, _, _ in rows), _ladder(x, x_ladder), shape)
+
+
+def _poly_ders(table: Dict[int, Dict[str, float]], x, y) -> Tuple:
+    """
+    Evaluates the power series `sum(n * x**I * y**J)` of a coefficient table together with its first and second order
+    partial derivatives in a single pass over the table.
+
+    Each row of terms with the same I exponent is reduced to three Horner polynomials in y (see `_poly`), for the
+    series and its first and second derivatives in y, which are accumulated row by row into six Horner polynomials in
+    x. The derivatives are recovered as `sum(I * term) / x`, `sum(J * term) / y`, etc., so x and y must be non-zero.
+    Args:
+        table: Coefficient table where each entry has an 'I', 'J' and 'n' key.
+        x: Variable raised to the 'I' exponents. Scalar or array.
+        y: Variable raised to the 'J' exponents. Scalar or array.
+    Returns:
+        The tuple (f, f_x, f_y, f_xx, f_yy, f_xy).
+    """
+    rows, x_ladder, y_ladder = _plan(table)
+    shape = np.broadcast(x, y).shape
+    if not shape:
+        return _one_point(_poly_ders_scalar, rows, x_ladder, y_ladder, x, y)
+    xs, ys = _ladder(x, x_ladder), _ladder(y, y_ladder)
+    sums, last = None, None
+    for e, I, P, Q, R, _ in rows:
+        p, q = _horner(P, ys, shape), _horner(Q, ys, shape)
+        row = (p, I * p, I * (I - 1) * p, q, I * q, _horner(R, ys, shape))
+        sums = row if sums is None else tuple(_fma(total, xs[last - e], c, shape) for total, c in zip(sums, row))
+        last = e
+    f, f_x, f_xx, f_y, f_xy, f_yy = (_fma(total, xs[last], 0, shape) if last else total for total in sums)
+    return f, f_x / x, f_y / y, f_xx / x ** 2, f_yy / y ** 2, f_xy / (x * y)
+
+
+def _poly_ders_scalar(rows: Tuple, x_ladder: Tuple, y_ladder: Tuple, x: float, y: float) -> Tuple:
+    """
+    `_poly_ders` on scalars, as plain loops over the terms with the sums kept in locals, instead of going through
+    `_horner` and `_fma`, whose per-term overhead outweighs the arithmetic of a single point. The three polynomials in
+    y of a row are evaluated together, on its S terms (see `_plan`).
+    """
+    xs, ys = _ladder(x, x_ladder), _ladder(y, y_ladder)
+    f = f_x = f_xx = f_y = f_xy = f_yy = 0.
+    last = None
+    for e, I, _, _, _, S in rows:
+        terms = iter(S)
+        k, p, q, r = next(terms)
+        for k_next, a, b, c in terms:
+            z = ys[k - k_next]
+            p, q, r = p * z + a, q * z + b, r * z + c
+            k = k_next
+        if k:
+            z = ys[k]
+            p, q, r = p * z, q * z, r * z
+        z = 0. if last is None else xs[last - e]
+        f, f_x, f_xx = f * z + p, f_x * z + I * p, f_xx * z + I * (I - 1) * p
+        f_y, f_xy, f_yy = f_y * z + q, f_xy * z + I * q, f_yy * z + r
+        last = e
+    if last:
+        z = xs[last]
+        f, f_x, f_xx, f_y, f_xy, f_yy = f * z, f_x * z, f_xx * z, f_y * z, f_xy * z, f_yy * z
+    return f, f_x / x, f_y / y, f_xx / x ** 2, f_yy / y ** 2, f_xy / (x * y)
+
+
+class Derivatives(object):
+    """
+    Fixed-layout storage of the reduced variables and the derivatives of the base equation of a region.
+
+    Every known derivative is a slot, so an instance holds no `__dict__` and no hash table. It reads like the
+    `defaultdict(float)` it replaces: `ders['gamma_pi']`, `'gamma_pi' in ders`, `ders.items()`... and a derivative
+    that has not been set reads as 0. Attribute access (`ders.gamma_pi`) is the fastest way to read a derivative that
+    is known to be set.
     """
-    pass
+    __slots__ = ('pi', 'tau', 'delta',
+                 'gamma', 'gamma_pi', 'gamma_tau', 'gamma_pipi', 'gamma_tautau', 'gamma_pitau',
+                 'gammaO', 'gammaO_pi', 'gammaO_tau', 'gammaO_pipi', 'gammaO_tautau', 'gammaO_pitau',
+                 'gammaR', 'gammaR_pi', 'gammaR_tau', 'gammaR_pipi', 'gammaR_tautau', 'gammaR_pitau',
+                 'phi', 'phi_delta', 'phi_tau', 'phi_deltadelta', 'phi_tautau', 'phi_deltatau')
+    _keys = frozenset(__slots__)
+
+    def __init__(self, *args, **kwargs):
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key: str) -> float:
+        return getattr(self, key, 0.0) if key in Derivatives._keys else 0.0
+
+    def __setitem__(self, key: str, value: float):
+        if key not in Derivatives._keys:
+            raise KeyError(f'Unknown derivative {key}. Derivatives are one of {Derivatives.__slots__}.')
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in Derivatives._keys and hasattr(self, key)
+
+    def __iter__(self):
+        return (key for key in Derivatives.__slots__ if hasattr(self, key))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Derivatives) and dict(self.items()) == dict(other.items())
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'Derivatives({", ".join(f"{key}={value}" for key, value in self.items())})'
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [getattr(self, key) for key in self]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self]
+
+    def get(self, key: str, default: Optional[float] = None) -> Optional[float]:
+        return self[key] if key in self else default
+
+    def update(self, *args, **kwargs):
+        """Sets derivatives from a mapping, an iterable of (key, value) pairs and/or keyword arguments."""
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        for key in list(self):
+            delattr(self, key)
+
+
+# Properties derived from the isobaric cubic expansion coefficient and the isothermal compressibility: alpha_v (1/K),
+# kappa_T (1/MPa), the Joule-Thomson coefficient mu_JT (K/MPa), the isentropic exponent kappa and dpdT_v = (dp/dT)_v
+# (MPa/K). See `_derived_properties`.
+DERIVED = ('alpha_v', 'kappa_T', 'mu_JT', 'kappa', 'dpdT_v')
 
 
-@dataclass
 class State(object):
-    T: float = None
-    p: float = None
-    v: float = None
-    rho: float = None
-    u: float = None
-    s: float = None
-    h: float = None
-    cp: float = None
-    cv: float = None
-    w: float = None
-    ders: Dict[str, float] = None
-    x: float = None
+    """
+    Properties of a single point. Slotted, so that large numbers of scalar states stay compact in memory.
+    """
+    __slots__ = ('T', 'p', 'v', 'rho', 'u', 's', 'h', 'cp', 'cv', 'w', 'ders', 'x', 'alpha_v', 'kappa_T', 'mu_JT', 'kappa',
+                 'dpdT_v')
+
+    def __init__(self, T: float = None, p: float = None, v: float = None, rho: float = None, u: float = None,
+                 s: float = None, h: float = None, cp: float = None, cv: float = None, w: float = None,
+                 ders: Optional[Derivatives] = None, x: float = None, alpha_v: float = None, kappa_T: float = None,
+                 mu_JT: float = None, kappa: float = None, dpdT_v: float = None):
+        self.T = T
+        self.p = p
+        self.v = v
+        self.rho = rho
+        self.u = u
+        self.s = s
+        self.h = h
+        self.cp = cp
+        self.cv = cv
+        self.w = w
+        self.ders = ders
+        self.x = x
+        self.alpha_v = alpha_v
+        self.kappa_T = kappa_T
+        self.mu_JT = mu_JT
+        self.kappa = kappa
+        self.dpdT_v = dpdT_v
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in State.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'State({", ".join(f"{name}={getattr(self, name)!r}" for name in State.__slots__)})'
+
+
+@dataclass(eq=False)
+class StateArray(object):
+    """
+    Columnar counterpart of `State`: every property is a numpy array with one entry per point.
+
+    The numeric columns can live in a single `(len(StateArray.columns), n)` float buffer (see `from_buffer`), which is
+    what allows batch evaluators to share results between processes without copying. `ders` is only filled by the
+    region kernels and is never part of the buffer.
+    """
+    T: np.ndarray = None
+    p: np.ndarray = None
+    v: np.ndarray = None
+    rho: np.ndarray = None
+    u: np.ndarray = None
+    s: np.ndarray = None
+    h: np.ndarray = None
+    cp: np.ndarray = None
+    cv: np.ndarray = None
+    w: np.ndarray = None
+    ders: Dict[str, np.ndarray] = None
+    x: np.ndarray = None
+    alpha_v: np.ndarray = None
+    kappa_T: np.ndarray = None
+    mu_JT: np.ndarray = None
+    kappa: np.ndarray = None
+    dpdT_v: np.ndarray = None
+
+    columns = ('T', 'p', 'v', 'rho', 'u', 's', 'h', 'cp', 'cv', 'w', 'x') + DERIVED
+
+    @staticmethod
+    def empty(n: int) -> 'StateArray':
+        """Creates a StateArray of n points filled with NaN."""
+        return StateArray.from_buffer(np.full((len(StateArray.columns), n), np.nan))
+
+    @staticmethod
+    def from_buffer(buffer: np.ndarray) -> 'StateArray':
+        """
+        Creates a StateArray whose columns are views on the rows of a `(len(StateArray.columns), n)` buffer.
+        Writing to the StateArray writes to the buffer.
+        """
+        return StateArray(**{name: buffer[i] for i, name in enumerate(StateArray.columns)})
+
+    def __len__(self) -> int:
+        return len(self.T)
+
+    def __getitem__(self, item) -> 'StateArray':
+        """Gathers the points selected by `item` (index, slice or mask) into a new StateArray."""
+        ders = None if self.ders is None else {key: val[item] for key, val in self.ders.items()}
+        return StateArray(ders=ders, **{name: getattr(self, name)[item] for name in StateArray.columns
+                                        if getattr(self, name) is not None})
+
+    def point(self, index=(), out: Optional[State] = None) -> State:
+        """
+        Extracts one point as a State of floats, with the derivatives in `ders`.
+        Args:
+            index: Index of the point. The default extracts the only point of a StateArray of 0-d arrays.
+            out: State to overwrite in place instead of allocating a new one. Its `ders` dict is reused too.
+        Returns:
+            The State (`out` if given).
+        """
+        if out is None:
+            out = State()
+        for name in StateArray.columns:
+            values = getattr(self, name)
+            setattr(out, name, None if values is None else float(np.asarray(values)[index]))
+
+        if self.ders is None:
+            out.ders = None
+        else:
+            if out.ders is None:
+                out.ders = Derivatives()
+            else:
+                out.ders.clear()
+            for key, values in self.ders.items():
+                out.ders[key] = float(np.asarray(values)[index])
+        return out
+
+    def __setitem__(self, item, other: 'StateArray'):
+        """Scatters the columns of `other` into the points selected by `item`. Missing columns are left untouched."""
+        for name in StateArray.columns:
+            values = getattr(other, name)
+            if values is not None:
+                getattr(self, name)[item] = values
+
+
+def _derived_properties(state: StateArray, alpha_v, kappa_T) -> StateArray:
+    """
+    Completes the properties of a kernel with those derived from its isobaric cubic expansion coefficient and isothermal
+    compressibility, which the kernels compute from the derivatives of their free energy.
+    Args:
+        state: Properties of the kernel.
+        alpha_v: Isobaric cubic expansion coefficient (1/K).
+        kappa_T: Isothermal compressibility (1/MPa).
+    Returns:
+        The state, with `alpha_v`, `kappa_T`, `dpdT_v` (MPa/K), the Joule-Thomson coefficient `mu_JT` (K/MPa) and the
+        isentropic exponent `kappa` filled in.
+    """
+    state.alpha_v, state.kappa_T = alpha_v, kappa_T
+    state.dpdT_v = alpha_v / kappa_T
+    # v * p is in m^3/kg * MPa = MJ/kg = 1000 kJ/kg = 1e6 m^2/s^2.
+    state.mu_JT = 1000 * state.v * (state.T * alpha_v - 1) / state.cp
+    state.kappa = state.w ** 2 / (1e6 * state.p * state.v)
+    return state
+
+
+def _ideal_gas(table: Dict[int, Dict[str, float]], _pi, tau) -> Tuple:
+    """
+    Ideal gas part `gammaO = ln(pi) + sum(n * tau**J)` of a dimensionless Gibbs free energy (eqs. 16 and 33 of [1]),
+    shared by the Region2 (stable and metastable) and Region5 kernels.
+    Args:
+        table: Coefficients {k: {'J', 'n'}} of the series.
+        _pi: Reduced pressure.
+        tau: Inverse reduced temperature.
+    Returns:
+        gammaO and its derivatives with respect to pi and tau: (g, gp, gt, gpp, gtt, gpt).
+    """
+    # The series is a single row of I = 0 of `_plan`, so x is a dummy 1.
+    g, _, gt, _, gtt, _ = _poly_ders(table, 1., tau)
+    return (log(_pi) if isinstance(_pi, float) else np.log(_pi)) + g, 1 / _pi, gt, -1 / _pi ** 2, gtt, 0 * tau
+
+
+def _set_ders(state: Union[StateArray, State], ders: Dict[str, Union[float, np.ndarray]]) -> Union[StateArray, State]:
+    """
+    Sets the reduced variables and the derivatives of a kernel on its result: as a dict on a StateArray, or written
+    into the Derivatives of the State given to the kernel as `out`, which keeps those it already holds.
+    """
+    if isinstance(state, StateArray):
+        state.ders = ders
+        return state
+    if state.ders is None:
+        state.ders = Derivatives()
+    for key, value in ders.items():
+        setattr(state.ders, key, value)
+    return state
+
+
+def _gibbs_properties(T, p, tau, _pi, g, gp, gt, gpp, gtt, gpt,
+                      out: Optional[State] = None) -> Union[StateArray, State]:
+    """
+    Properties of a region described by a dimensionless Gibbs free energy `gamma(pi, tau)` (Table 3 of [1]).
+    Args:
+        T: Temperature (K).
+        p: Pressure (MPa).
+        tau: Inverse reduced temperature.
+        _pi: Reduced pressure.
+        g, gp, gt, gpp, gtt, gpt: gamma and its derivatives with respect to pi and tau.
+        out: State to overwrite in place instead of building a StateArray, when all the inputs are floats.
+    Returns:
+        The properties as a StateArray (`out` if given, its `ders` untouched), the `DERIVED` ones included.
+    """
+    state = StateArray() if out is None else out
+    state.T, state.p = T, p
+    state.v = _pi * gp * R * T / p / 1000  # R*T/p has units of 1000 m^3/kg.
+    state.rho = p / (_pi * gp * R * T) * 1000
+    state.u = R * T * (tau * gt - _pi * gp)
+    state.s = R * (tau * gt - g)
+    state.h = R * T * tau * gt
+    state.cp = R * -tau ** 2 * gtt
+    state.cv = R * (-tau ** 2 * gtt + (gp - tau * gpt) ** 2 / gpp)
+    # 1000 is a conversion factor: sqrt(kJ/kg) = sqrt(1000 m/s) -> sqrt(1000) m/s
+    w2 = 1000 * R * T * gp ** 2 / ((gp - tau * gpt) ** 2 / (tau ** 2 * gtt) - gpp)
+    state.w = np.sqrt(w2) if out is None else sqrt(w2)
+    return _derived_properties(state, alpha_v=(1 - tau * gpt / gp) / T, kappa_T=-_pi * gpp / gp / p)
+
+
+def _helmholtz_properties(T, rho, delta, tau, f, fd, ft, fdd, ftt, fdt,
+                          out: Optional[State] = None) -> Union[StateArray, State]:
+    """
+    Properties of a region described by a dimensionless Helmholtz free energy `phi(delta, tau)` (Table 31 of [1]).
+    Args:
+        T: Temperature (K).
+        rho: Density (kg/m^3).
+        delta: Reduced density.
+        tau: Inverse reduced temperature.
+        f, fd, ft, fdd, ftt, fdt: phi and its derivatives with respect to delta and tau.
+        out: State to overwrite in place instead of building a StateArray, when all the inputs are floats.
+    Returns:
+        The properties as a StateArray (`out` if given, its `ders` untouched), the `DERIVED` ones included.
+    """
+    state = StateArray() if out is None else out
+    state.T, state.rho = T, rho
+    state.p = rho * R * T * delta * fd / 1000  # kPa -> MPa.
+    state.v = 1 / rho
+    state.u = R * T * tau * ft
+    state.s = R * (tau * ft - f)
+    state.h = R * T * (tau * ft + delta * fd)
+    state.cp = R * (-tau ** 2 * ftt + (delta * fd - delta * tau * fdt) ** 2 / (2 * delta * fd + delta ** 2 * fdd))
+    state.cv = R * -tau ** 2 * ftt
+    # 1000 is a conversion factor: sqrt(kJ/kg) = sqrt(1000 m/s) -> sqrt(1000) m/s
+    w2 = 1000 * R * T * (2 * delta * fd + delta ** 2 * fdd - (delta * fd - delta * tau * fdt) ** 2 / (tau ** 2 * ftt))
+    state.w = np.sqrt(w2) if out is None else sqrt(w2)
+    # rho * R * T is in kPa: 1000 converts kappa_T to 1/MPa.
+    return _derived_properties(state, alpha_v=(fd - tau * fdt) / (2 * fd + delta * fdd) / T,
+                               kappa_T=1000 / (rho * R * T * delta * (2 * fd + delta * fdd)))
 
 
 class Region(ABC):
@@ -400,6 +1135,18 @@ class Region(ABC):
         Overrides the behaviour of the `in` operator to facilitate a `State in Region` query.
         """
 
+    @staticmethod
+    def _from_kernel(state: StateArray, given: State) -> State:
+        """
+        Builds the State of a constructor from the result of a vectorized kernel. The properties in `given` (the inputs
+        of the constructor) are kept as they were given, since backward equations only reproduce them approximately.
+        """
+        out = state.point()
+        for name in StateArray.columns:
+            if getattr(given, name) is not None:
+                setattr(out, name, getattr(given, name))
+        return out
+
     @staticmethod
     @abstractmethod
     def base_eqn(T: float, p: float) -> float:
@@ -412,5 +1159,12 @@ class Region(ABC):
         return ''
 
 
-class IAPWS97(object):
-    pass
+def __getattr__(name: str):
+    """
+    `IAPWS97` lives in `handle`, which imports the region kernels and thus this module, so it is only imported from
+    there when it is first looked up here.
+    """
+    if name == 'IAPWS97':
+        from .handle import IAPWS97
+        return IAPWS97
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,396 @@
+"""
+Batch evaluation of large (p, T) and (p, h) arrays.
+
+The inputs are split in chunks that are evaluated by a pool of workers:
+    - 'process' backend: worker processes. Inputs and results are exchanged through `multiprocessing.shared_memory`
+      blocks: only the block names and the chunk bounds are pickled, workers read their slice of the inputs and write
+      their results directly into a shared `StateArray` buffer.
+    - 'thread' backend: worker threads of the current process. The region kernels spend their time in numpy ufuncs,
+      which release the GIL, so chunks run in parallel without forking. Kernels share no mutable state and every
+      thread writes to its own points of the output, which also makes this backend safe on free-threaded builds.
+
+Every chunk is classified by region, the points of each region are gathered into contiguous arrays, evaluated with
+the vectorized kernel of the region and scattered back in their original order. Region1, Region2, Region3 and Region5
+points are evaluated. Points in the two-phase region or out of bounds come out as NaN.
+
+(p, h) inputs, and (p, T) inputs in Region3, are evaluated from the backward equations T(p, h), v(p, h) and v(p, T) by
+default. With `consistent=True`, the backward result is refined with Newton steps on the forward equations (see
+`solvers`), so that the inputs of every state are matched to machine precision, at roughly the cost of a second
+evaluation. Points whose refinement does not converge come out as NaN.
+
+Callers that evaluate many batches in a row (e.g. `stream`) can create the workers once with `executor` and pass them to
+every call as `pool`, instead of paying for the start-up of a new pool per call.
+
+Inputs that repeat (stuck sensors, setpoints) can be evaluated once with `dedup=True`: the unique pairs are evaluated
+and the results expanded back to every input. The ratio of input to unique points is reported by `instrumentation`
+under 'dedup'.
+"""
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ._utils import State, StateArray, region, b23, p_c, _p_s_eqn, _T_s_eqn
+from .region1 import Region1
+from .region2 import Region2
+from .region3 import Region3
+from .region4 import Region4
+from .region5 import Region5
+from . import instrumentation, solvers
+
+DEFAULT_CHUNK_SIZE = 2 ** 16
+BACKENDS = ('process', 'thread')
+INPUT_PAIRS = ('pT', 'ph')
+
+# Region number -> class exposing the vectorized kernels. Region1, Region2 and Region5 expose `evaluate(T, p)`,
+# `_T_ph(p, h)` and `_T_ps(p, s)`, Region3 exposes `evaluate(T, rho)`, `_v_pT(p, T)`, `_T_ph(p, h)`, `_v_ph(p, h)`,
+# `_T_ps(p, s)` and `_v_ps(p, s)`.
+_KERNELS = {1: Region1, 2: Region2, 3: Region3, 5: Region5}
+
+
+def _unique(p: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Unique (p, y) pairs and the indices that expand them back to the inputs. The pairs are packed in complex numbers,
+    which sort lexicographically, so that a 1-D `np.unique` does the work.
+    """
+    z = np.empty(p.size, dtype=complex)
+    z.real, z.imag = p, y
+    unique, inverse = np.unique(z, return_inverse=True)
+    return unique.real.copy(), unique.imag.copy(), inverse.ravel()
+
+
+def _input_pair(T, h) -> Tuple[str, np.ndarray]:
+    """Returns the name of the input pair and the second input variable."""
+    if T is not None and h is None:
+        return 'pT', T
+    elif h is not None and T is None:
+        return 'ph', h
+    else:
+        raise ValueError('Pass only T or h together with p, not both.')
+
+
+def _region_p(p: np.ndarray, name: str, z: np.ndarray) -> np.ndarray:
+    """
+    Region numbers of (p, h) or (p, s) pairs, `name` being 'h' or 's'. Region1 and Region2 are bounded by the saturation
+    line below p_s(623.15 K) and by the 623.15 K isotherm and the 2-3 boundary above it. Region3 lies in between, except
+    for the part of the two-phase region above 623.15 K, below the critical pressure. Region5 lies between the 1073.15 K
+    and the 2273.15 K isotherms, up to 50 MPa. 0 marks points out of bounds.
+    """
+    p_s_623 = _p_s_eqn(623.15)
+    valid = (0 < p) & (p <= 100)
+    low_p = valid & (p <= p_s_623)
+    high_p = valid & (p_s_623 < p)
+
+    _p = np.where(valid, p, 1)
+    # Points out of bounds are evaluated at placeholder states, which may be out of the range of the equations.
+    with np.errstate(invalid='ignore'):
+        T_sat = Region4.T_sat(p=np.where(low_p, _p, 1))
+        T_23 = b23(p=np.where(high_p, _p, 50))
+        T_1 = np.where(low_p, T_sat, 623.15)
+        T_2 = np.where(low_p, T_sat, T_23)
+
+        z_min = getattr(Region1.evaluate(273.15, _p), name)
+        z_1 = getattr(Region1.evaluate(T_1, _p), name)
+        z_2 = getattr(Region2.evaluate(T_2, _p), name)
+        z_max = getattr(Region2.evaluate(1073.15, _p), name)
+        z_5 = getattr(Region5.evaluate(2273.15, _p), name)
+
+    # Saturated liquid and vapour of the part of the two-phase region that is surrounded by Region3.
+    dome = high_p & (p < p_c)
+    z_liquid, z_vapour = np.full(p.shape, np.nan), np.full(p.shape, np.nan)
+    if dome.any():
+        liquid, vapour = Region4._saturated(p[dome])
+        z_liquid[dome], z_vapour[dome] = getattr(liquid, name), getattr(vapour, name)
+
+    return np.select([valid & (z_min <= z) & (z <= z_1),
+                      valid & (z_2 <= z) & (z <= z_max),
+                      low_p & (z_1 < z) & (z < z_2),
+                      dome & (z_liquid < z) & (z < z_vapour),
+                      high_p & (z_1 < z) & (z < z_2),
+                      valid & (p <= 50) & (z_max < z) & (z <= z_5)],
+                     [1, 2, 4, 4, 3, 5], default=0).astype(np.int8)
+
+
+def _region_p_scalar(p: float, name: str, z: float) -> int:
+    """
+    Same as `_region_p` for a single point, with plain float comparisons. The boundaries are evaluated one at a time
+    on the scalar path of the kernels, only as far as needed to place the point.
+    """
+    if not 0 < p <= 100:
+        return 0
+    low_p = p <= _p_s_eqn(623.15)
+    T_1, T_2 = (float(_T_s_eqn(p)),) * 2 if low_p else (623.15, float(b23(p=p)))
+    state = State()
+    if z <= getattr(Region1.evaluate(T_1, p, out=state), name):
+        return 1 if getattr(Region1.evaluate(273.15, p, out=state), name) <= z else 0
+    if z < getattr(Region2.evaluate(T_2, p, out=state), name):
+        if low_p:
+            return 4
+        if p < p_c:
+            liquid, vapour = Region4._saturated(p)
+            if getattr(liquid, name) < z < getattr(vapour, name):
+                return 4
+        return 3
+    if z <= getattr(Region2.evaluate(1073.15, p, out=state), name):
+        return 2
+    return 5 if p <= 50 and z <= getattr(Region5.evaluate(2273.15, p, out=state), name) else 0
+
+
+def _classify(pair: str, p: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Region numbers of the given input pair."""
+    return region(p, y) if pair == 'pT' else _region_p(p, pair[1], y)
+
+
+def _evaluate_region(code: int, pair: str, p: np.ndarray, y: np.ndarray, consistent: bool = False,
+                     out: Optional[State] = None) -> StateArray:
+    """
+    Evaluates points that all belong to the region `code`. The inputs are kept as given in the result. With
+    `consistent`, the backward equations are refined on the forward equations, and the points whose refinement does
+    not converge are NaN: writing the inputs over them would make them look consistent.
+
+    With `out`, p and y are the floats of a single point, which is written into `out` (see `IAPWS97.update`). Without
+    `consistent`, the kernels run on their scalar path and write into `out` directly, without building any array.
+    """
+    kernel = _KERNELS[code]
+    converged = None
+    if pair != 'pT' and consistent:
+        result = (solvers.solve_ph if pair == 'ph' else solvers.solve_ps)(code, p, y)
+        state, converged = result.state, result.converged
+        state.p = p
+    elif code == 3 and consistent:
+        result = solvers.solve_pT(p, y)
+        state, converged = result.state, result.converged
+        state.p = p
+    elif code == 3:
+        if pair == 'pT':
+            T, v = y, Region3._v_pT(p, y)
+        elif pair == 'ph':
+            T, v = Region3._T_ph(p, y), Region3._v_ph(p, y)
+        else:
+            T, v = Region3._T_ps(p, y), Region3._v_ps(p, y)
+        if out is not None:
+            T, v = float(T), float(v)
+        state = Region3.evaluate(T, 1 / v, out=out)
+        state.p = p
+    elif pair == 'pT':
+        state = kernel.evaluate(y, p, out=out)
+    else:
+        T = kernel._T_ph(p, y) if pair == 'ph' else kernel._T_ps(p, y)
+        state = kernel.evaluate(T if out is None else float(T), p, out=out)
+    if pair != 'pT':
+        setattr(state, pair[1], y)
+    if converged is not None and not converged.all():
+        # New arrays: p and y are the arrays of the caller.
+        for column in StateArray.columns:
+            values = getattr(state, column)
+            if values is not None:
+                setattr(state, column, np.where(converged, values, np.nan))
+    if out is not None and state is not out:
+        # The refinements of `solvers` work on arrays.
+        state = state.point(out=out)
+    return state
+
+
+def _evaluate(pair: str, p: np.ndarray, y: np.ndarray, codes: Optional[np.ndarray] = None,
+              out: Optional[StateArray] = None, consistent: bool = False) -> StateArray:
+    """
+    Evaluates one chunk in the current process. Points are gathered per region, evaluated with the region kernel and
+    scattered back in their original order, into `out` if given.
+    """
+    if codes is None:
+        codes = _classify(pair, p, y)
+
+    if out is None:
+        out = StateArray.empty(len(p))
+    else:
+        _fill_nan(out)
+    for code in _KERNELS:
+        mask = codes == code
+        if mask.any():
+            out[mask] = _evaluate_region(code, pair, p[mask], y[mask], consistent)
+    return out
+
+
+def _evaluate_chunk(job: tuple):
+    """Worker entry point: attaches to the shared blocks, evaluates `order[start:stop]` and writes the results."""
+    names, n, pair, consistent, start, stop = job
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, name in names.items()}
+    try:
+        _evaluate_shared(blocks, n, pair, consistent, start, stop)
+    finally:
+        for block in blocks.values():
+            block.close()
+
+
+def _evaluate_shared(blocks: dict, n: int, pair: str, consistent: bool, start: int, stop: int):
+    """Body of `_evaluate_chunk`. Kept apart so that every view on the shared buffers is released before closing them."""
+    inputs = np.ndarray((2, n), dtype=float, buffer=blocks['inputs'].buf)
+    order = np.ndarray((n,), dtype=np.int64, buffer=blocks['order'].buf)
+    output = np.ndarray((len(StateArray.columns), n), dtype=float, buffer=blocks['output'].buf)
+    codes = np.ndarray((n,), dtype=np.int8, buffer=blocks['codes'].buf) if 'codes' in blocks else None
+
+    idx = order[start:stop]
+    result = _evaluate(pair, inputs[0, idx], inputs[1, idx], None if codes is None else codes[idx],
+                       consistent=consistent)
+    StateArray.from_buffer(output)[idx] = result
+
+
+def executor(backend: str = 'process', workers: Optional[int] = None) -> Executor:
+    """
+    Pool of workers of a backend, to be passed to several `evaluate` calls as `pool`. Use it as a context manager, so
+    that its workers are shut down after the last call.
+    Args:
+        backend: 'process' or 'thread'.
+        workers: Number of workers. Defaults to `os.cpu_count()`.
+    Returns:
+        A ProcessPoolExecutor or a ThreadPoolExecutor.
+    Raises:
+        ValueError if the backend is unknown.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'backend must be one of {BACKENDS}. {backend} given.')
+    workers = workers or os.cpu_count() or 1
+    return ThreadPoolExecutor(max_workers=workers) if backend == 'thread' else ProcessPoolExecutor(max_workers=workers)
+
+
+def _map(backend: str, pool: Optional[Executor], workers: int, function, jobs: list):
+    """
+    Runs `function` on every job in `pool`, or in a pool of `workers` created for the call. The results are consumed so
+    that exceptions raised in the workers propagate.
+    """
+    if pool is not None:
+        return list(pool.map(function, jobs))
+    with executor(backend, workers) as pool:
+        return list(pool.map(function, jobs))
+
+
+def _fill_nan(out: StateArray):
+    """Resets every column of a StateArray to NaN in place."""
+    for name in StateArray.columns:
+        getattr(out, name)[...] = np.nan
+
+
+def evaluate(p, T=None, h=None, workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+             sort_regions: bool = True, backend: str = 'process', out: Optional[StateArray] = None,
+             consistent: bool = False, dedup: bool = False, pool: Optional[Executor] = None) -> StateArray:
+    """
+    Evaluates the properties of every (p, T) or (p, h) pair in a pool of workers.
+    Args:
+        p: Pressure (MPa). Array or scalar (broadcast against the other input).
+        T: Temperature (K). Pass either T or h.
+        h: Enthalpy (kJ/kg). Pass either T or h.
+        workers: Number of workers. Defaults to `os.cpu_count()`. With 1 worker, or when everything fits in a single
+            chunk, the inputs are evaluated in the calling thread.
+        chunk_size: Number of points handed to a worker at a time. With the 'thread' backend, chunks should be large
+            enough (thousands of points) for the time spent in numpy to dominate the time spent holding the GIL.
+        sort_regions: Classify all points up front and hand them out sorted by region, so that every chunk runs as few
+            region kernels as possible. Otherwise each worker classifies its own chunk.
+        backend: 'process' for worker processes sharing memory blocks or 'thread' for worker threads.
+        out: StateArray with one float entry per point (e.g. `StateArray.empty(n)`) to write the results into, so that
+            repeated calls do not allocate a new output.
+        consistent: Refine the backward equations on the forward equations, so that the enthalpy of every (p, h)
+            state and the pressure of every Region3 (p, T) state match their inputs to machine precision instead of
+            within the tolerance of the backward equations. Points whose refinement does not converge are NaN.
+        dedup: Evaluate every distinct (p, T) or (p, h) pair once and copy its properties to its repetitions. Pays off
+            when inputs repeat often. The input and unique points are recorded in `instrumentation` under 'dedup'.
+        pool: Pool of workers of the backend (see `executor`) to evaluate the chunks in, instead of a pool of `workers`
+            created and shut down in this call. It is left running.
+    Returns:
+        The properties as a flat StateArray in the order of the inputs (`out` if given). Points out of the supported
+        regions are NaN.
+    Raises:
+        ValueError if both or none of T and h are given, if the backend is unknown, if `out` has the wrong length or if
+        `pool` is not a pool of the backend.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'backend must be one of {BACKENDS}. {backend} given.')
+    if pool is not None and not isinstance(pool, ThreadPoolExecutor if backend == 'thread' else ProcessPoolExecutor):
+        raise ValueError(f'pool must be an executor of the {backend} backend. {type(pool).__name__} given.')
+    pair, y = _input_pair(T, h)
+    p, y = (np.ravel(a) for a in np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(y, dtype=float)))
+    n = p.size
+    workers = workers or os.cpu_count() or 1
+    if out is not None and len(out) != n:
+        raise ValueError(f'out must have one entry per point. {len(out)} entries for {n} points given.')
+
+    if dedup:
+        p_unique, y_unique, inverse = _unique(p, y)
+        instrumentation.record('dedup', n, p_unique.size, 0)
+        state = evaluate(p_unique, workers=workers, chunk_size=chunk_size, sort_regions=sort_regions, backend=backend,
+                         consistent=consistent, pool=pool, **{pair[1]: y_unique})
+        if out is None:
+            return state[inverse]
+        out[:] = state[inverse]
+        return out
+
+    if workers == 1 or n <= chunk_size:
+        return _evaluate(pair, p, y, out=out, consistent=consistent)
+
+    if sort_regions:
+        codes = _classify(pair, p, y)
+        order = np.argsort(codes, kind='stable').astype(np.int64)
+    else:
+        codes = None
+        order = np.arange(n, dtype=np.int64)
+    bounds = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+    if backend == 'thread':
+        return _evaluate_threads(pair, p, y, codes, order, bounds, workers, out, consistent, pool)
+    return _evaluate_processes(pair, p, y, codes, order, bounds, workers, out, consistent, pool)
+
+
+def _evaluate_threads(pair: str, p: np.ndarray, y: np.ndarray, codes: Optional[np.ndarray], order: np.ndarray,
+                      bounds: list, workers: int, out: Optional[StateArray] = None,
+                      consistent: bool = False, pool: Optional[Executor] = None) -> StateArray:
+    """Evaluates the chunks given by `bounds` in a thread pool, each thread scattering into the same output."""
+    if out is None:
+        out = StateArray.empty(len(p))
+    else:
+        _fill_nan(out)
+
+    def work(start: int, stop: int):
+        idx = order[start:stop]
+        out[idx] = _evaluate(pair, p[idx], y[idx], None if codes is None else codes[idx], consistent=consistent)
+
+    _map('thread', pool, workers, lambda bound: work(*bound), bounds)
+    return out
+
+
+def _evaluate_processes(pair: str, p: np.ndarray, y: np.ndarray, codes: Optional[np.ndarray], order: np.ndarray,
+                        bounds: list, workers: int, out: Optional[StateArray] = None,
+                        consistent: bool = False, pool: Optional[Executor] = None) -> StateArray:
+    """Evaluates the chunks given by `bounds` in a process pool, exchanging data through shared memory blocks."""
+    n = len(p)
+    arrays = {'inputs': np.stack([p, y]), 'order': order}
+    if codes is not None:
+        arrays['codes'] = codes
+
+    blocks = {}
+    try:
+        for key, array in arrays.items():
+            blocks[key] = _share(array)
+        blocks['output'] = _share(np.full((len(StateArray.columns), n), np.nan))
+
+        names = {key: block.name for key, block in blocks.items()}
+        jobs = [(names, n, pair, consistent, start, stop) for start, stop in bounds]
+        _map('process', pool, workers, _evaluate_chunk, jobs)
+
+        output = np.ndarray((len(StateArray.columns), n), dtype=float, buffer=blocks['output'].buf)
+        if out is None:
+            return StateArray.from_buffer(output.copy())
+        out[:] = StateArray.from_buffer(output)
+        return out
+    finally:
+        output = None
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+
+def _share(array: np.ndarray) -> shared_memory.SharedMemory:
+    """Copies an array into a new shared memory block."""
+    block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block
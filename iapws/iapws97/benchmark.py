@@ -0,0 +1,218 @@
+"""
+Benchmarks of the evaluation of the coefficient tables and of single states.
+
+`_poly` and `_poly_ders` evaluate the tables as nested Horner polynomials on ladders of powers (see `_utils._plan`).
+This module measures them against the direct evaluation they replaced, which raises the variables to a power for
+every term, on the tables of the basic equations and of some backward equations, over the range of their variables:
+- speed: points evaluated per second by each evaluation, over arrays, and seconds per call of each on a single point
+  given as floats, as the kernels of single states (`IAPWS97`, the region constructors) call them.
+- accuracy: error of each evaluation against the value of the series at the same (floating point) inputs in 50 digit
+  decimal arithmetic, in units in the last place (ulp) of that value. For `_poly_ders`, the worst of the six outputs.
+  The largest and mean errors come from the few points where an output is close to zero, so the median is reported
+  too.
+
+`run_handle` measures the cost of a single state: `IAPWS97.update` on a reused handle, which classifies the point and
+evaluates the kernels on floats, against the constructor and against the classification and the vectorized kernel of
+the region on 0-d arrays, which `update` used to run.
+
+Command line usage:
+    python -m iapws.iapws97.benchmark --points 65536 --samples 500
+"""
+import argparse
+import gc
+import time
+from decimal import Decimal, localcontext
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .batch import DEFAULT_CHUNK_SIZE, _classify, _evaluate_region
+from .handle import IAPWS97
+from ._utils import _poly, _poly_ders
+from .region1 import Region1
+from .region2 import Region2
+from .region3 import Region3
+
+# Name -> (table, whether its derivatives are evaluated, function drawing (x, y) arrays of n points from a generator).
+# The variables are those the kernels pass to `_poly` or `_poly_ders`.
+CASES = {
+    'Region1 gibbs': (Region1.table2, True,
+                      lambda rng, n: (7.1 - rng.uniform(0.001, 100, n) / 16.53,
+                                      1386 / rng.uniform(273.15, 623.15, n) - 1.222)),
+    'Region2 gibbs residual': (Region2.table11, True,
+                               lambda rng, n: (rng.uniform(0.001, 100, n),
+                                               540 / rng.uniform(273.15, 1073.15, n) - 0.5)),
+    'Region3 helmholtz': (Region3._table30_series, True,
+                          lambda rng, n: (rng.uniform(100, 800, n) / 322, 647.096 / rng.uniform(623.15, 863.15, n))),
+    'Region1 T(p, h)': (Region1.table6, False,
+                        lambda rng, n: (rng.uniform(0.001, 100, n), rng.uniform(0, 1600, n) / 2500 + 1)),
+    'Region2 T(p, h) a': (Region2.table20, False,
+                          lambda rng, n: (rng.uniform(0.001, 4, n), rng.uniform(2600, 4100, n) / 2000 - 2.1)),
+    'Region2 T(p, s) a': (Region2.table25, False,
+                          lambda rng, n: (rng.uniform(0.001, 4, n), rng.uniform(6.5, 11.9, n) / 2 - 2)),
+}
+
+# (input pair, p, T or h) points of `run_handle`, one per region and input pair.
+HANDLE_POINTS = {'pT Region1': ('pT', 3, 300), 'pT Region2': ('pT', 0.0035, 700), 'pT Region3': ('pT', 25, 650),
+                 'pT Region5': ('pT', 30, 2000), 'ph Region1': ('ph', 3, 500), 'ph Region2': ('ph', 0.0035, 3000),
+                 'ph Region3': ('ph', 25, 1800), 'ph Region5': ('ph', 30, 5500)}
+
+
+def _poly_direct(table, x, y):
+    """The direct evaluation of `_poly`: every term raises x and y to its exponents."""
+    return sum(entry['n'] * x ** entry['I'] * y ** entry['J'] for entry in table.values())
+
+
+def _poly_ders_direct(table, x, y) -> Tuple:
+    """The direct evaluation of `_poly_ders`: every term raises x and y to its exponents."""
+    f = f_x = f_y = f_xx = f_yy = f_xy = 0
+    for entry in table.values():
+        I, J = entry['I'], entry['J']
+        term = entry['n'] * x ** I * y ** J
+        f = f + term
+        f_x = f_x + I * term
+        f_y = f_y + J * term
+        f_xx = f_xx + I * (I - 1) * term
+        f_yy = f_yy + J * (J - 1) * term
+        f_xy = f_xy + I * J * term
+    return f, f_x / x, f_y / y, f_xx / x ** 2, f_yy / y ** 2, f_xy / (x * y)
+
+
+def _exact(table, x: float, y: float, ders: bool) -> Tuple[Decimal, ...]:
+    """The series (and its derivatives) at one point, in 50 digit decimal arithmetic."""
+    with localcontext() as context:
+        context.prec = 50
+        x, y = Decimal(x), Decimal(y)
+        sums = [Decimal(0)] * 6
+        for entry in table.values():
+            I, J = Decimal(entry['I']), Decimal(entry['J'])
+            term = Decimal(entry['n']) * x ** I * y ** J
+            for k, weight in enumerate((1, I, J, I * (I - 1), J * (J - 1), I * J)):
+                sums[k] += weight * term
+        if not ders:
+            return sums[0],
+        return sums[0], sums[1] / x, sums[2] / y, sums[3] / x ** 2, sums[4] / y ** 2, sums[5] / (x * y)
+
+
+def _ulps(values: Tuple, exact: Tuple[Decimal, ...]) -> float:
+    """Largest error of the values against the exact ones, in ulps of the exact ones."""
+    return max(float(abs(Decimal(float(value)) - reference)) / np.spacing(abs(float(reference)))
+               for value, reference in zip(values, exact))
+
+
+def _rate(function: Callable, table, x, y, repeats: int) -> float:
+    """Points per second of the best of `repeats` evaluations."""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(table, x, y)
+        best = min(best, time.perf_counter() - start)
+    return len(x) / best
+
+
+def run(points: int = DEFAULT_CHUNK_SIZE, samples: int = 500, repeats: int = 5,
+        seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Benchmarks the direct and the Horner evaluation of every case of `CASES`.
+    Args:
+        points: Number of points of the speed measurements. Defaults to the chunks `batch.evaluate` hands to the
+            kernels.
+        samples: Number of points of the accuracy measurements, which are slow.
+        repeats: The speed is the best of this number of evaluations.
+        seed: Seed of the random points.
+    Returns:
+        For every case, the points per second, the seconds per call on a single point and the largest, mean and
+        median error in ulps of both evaluations, and the speedups of the Horner evaluation.
+    """
+    rng = np.random.default_rng(seed)
+    stats = {}
+    for name, (table, ders, draw) in CASES.items():
+        direct, horner = (_poly_ders_direct, _poly_ders) if ders else (_poly_direct, _poly)
+        x, y = draw(rng, points)
+        case = dict(direct_points_per_s=_rate(direct, table, x, y, repeats),
+                    horner_points_per_s=_rate(horner, table, x, y, repeats))
+        case['speedup'] = case['horner_points_per_s'] / case['direct_points_per_s']
+        x_0, y_0 = float(x[0]), float(y[0])
+        for method, function in (('direct', direct), ('horner', horner)):
+            case[f'{method}_scalar_s_per_call'] = _seconds_per_call(lambda: function(table, x_0, y_0), 100, repeats)
+        case['scalar_speedup'] = case['direct_scalar_s_per_call'] / case['horner_scalar_s_per_call']
+
+        x, y = draw(rng, samples)
+        values = {'direct': direct(table, x, y), 'horner': horner(table, x, y)}
+        if not ders:
+            values = {method: (value,) for method, value in values.items()}
+        for method, value in values.items():
+            ulps = [_ulps([column[i] for column in value], _exact(table, x[i], y[i], ders)) for i in range(samples)]
+            case[f'{method}_max_ulp'], case[f'{method}_mean_ulp'] = max(ulps), float(np.mean(ulps))
+            case[f'{method}_median_ulp'] = float(np.median(ulps))
+        stats[name] = case
+    return stats
+
+
+def _seconds_per_call(function: Callable, calls: int, repeats: int) -> float:
+    """Seconds per call of the best of `repeats` runs of `calls` calls."""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / calls
+
+
+def run_handle(calls: int = 1000, repeats: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    Benchmarks `IAPWS97.update` on a reused handle against the constructor and against the classification and the
+    vectorized kernel of the region on 0-d arrays, at every point of `HANDLE_POINTS`.
+    Args:
+        calls: Number of calls of every run.
+        repeats: The speed is the best of this number of runs.
+    Returns:
+        For every point, the seconds per call of each, the speedup of `update` over the constructor and the number of
+        collections of the youngest generation of the garbage collector over `calls` updates.
+    """
+    handle = IAPWS97()
+    stats = {}
+    for name, (pair, p, y) in HANDLE_POINTS.items():
+        p_array, y_array = np.asarray(p, dtype=float), np.asarray(y, dtype=float)
+        functions = dict(update=lambda: handle.update(pair, p, y),
+                         constructor=lambda: IAPWS97(**{'p': p, pair[1]: y}),
+                         kernel=lambda: _evaluate_region(int(_classify(pair, p_array, y_array)), pair, p_array,
+                                                         y_array).point())
+        case = {f'{key}_s_per_call': _seconds_per_call(function, calls, repeats) for key, function in functions.items()}
+        case['speedup'] = case['constructor_s_per_call'] / case['update_s_per_call']
+
+        collections = gc.get_stats()[0]['collections']
+        for _ in range(calls):
+            functions['update']()
+        case['update_gc_collections'] = gc.get_stats()[0]['collections'] - collections
+        stats[name] = case
+    return stats
+
+
+def main(argv: Optional[list] = None):
+    """Command line entry point. See the module docstring."""
+    parser = argparse.ArgumentParser(description='Benchmark the evaluation of the IAPWS-IF97 coefficient tables and of '
+                                                 'single states.')
+    parser.add_argument('--points', type=int, default=DEFAULT_CHUNK_SIZE, help='Points of the speed measurements.')
+    parser.add_argument('--samples', type=int, default=500, help='Points of the accuracy measurements.')
+    parser.add_argument('--repeats', type=int, default=5, help='Evaluations of which the best is kept.')
+    parser.add_argument('--calls', type=int, default=1000, help='Calls of every run of the single-state measurements.')
+    args = parser.parse_args(argv)
+
+    for name, case in run(args.points, args.samples, args.repeats).items():
+        print(f"{name}: {case['speedup']:.2f}x faster "
+              f"({case['direct_points_per_s']:.3g} -> {case['horner_points_per_s']:.3g} points/s), "
+              f"{case['scalar_speedup']:.2f}x on a single point ({1e6 * case['direct_scalar_s_per_call']:.1f} -> "
+              f"{1e6 * case['horner_scalar_s_per_call']:.1f} us). Error (max/mean/median ulp): direct "
+              f"{case['direct_max_ulp']:.1f}/{case['direct_mean_ulp']:.2f}/{case['direct_median_ulp']:.2f}, Horner "
+              f"{case['horner_max_ulp']:.1f}/{case['horner_mean_ulp']:.2f}/{case['horner_median_ulp']:.2f}.")
+    for name, case in run_handle(args.calls, args.repeats).items():
+        print(f"IAPWS97 {name}: update {1e6 * case['update_s_per_call']:.1f} us, "
+              f"constructor {1e6 * case['constructor_s_per_call']:.1f} us ({case['speedup']:.2f}x), "
+              f"kernel {1e6 * case['kernel_s_per_call']:.1f} us. "
+              f"{case['update_gc_collections']} gen0 collections over {args.calls} updates.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Analytic thermodynamic partial derivatives such as (dh/dp)_T, (drho/dh)_p or (ds/dp)_T.
+
+Every derivative is computed from the gamma (Regions 1, 2 and 5) or phi (Region3) derivatives stored in `ders` by the
+region kernels (`Region1.evaluate`, `Region2.evaluate`, `Region3.evaluate`, `Region5.evaluate`), so no extra table
+pass is needed. They work elementwise on the StateArrays returned by the kernels.
+
+The partial derivatives of every property with respect to the natural variables of the region, (p, T) for the Gibbs
+regions and (rho, T) for Region3, are computed first. Any other derivative follows from the Jacobian identity
+    (dz/dx)_y = (z_a * y_b - z_b * y_a) / (x_a * y_b - x_b * y_a)
+where a and b are the natural variables.
+
+Units follow the properties: p in MPa, T in K, v in m^3/kg, rho in kg/m^3, u and h in kJ/kg, s in kJ/kg/K.
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+
+from ._utils import R
+
+PROPERTIES = ('T', 'p', 'v', 'rho', 'u', 's', 'h')
+
+
+def _gibbs_natural(state) -> Dict[str, Tuple]:
+    """Derivatives of every property with respect to p (at constant T) and T (at constant p)."""
+    d = state.ders
+    T, p, v, rho = state.T, state.p, state.v, state.rho
+    _pi, tau = d['pi'], d['tau']
+    alpha_v = (1 - tau * d['gamma_pitau'] / d['gamma_pi']) / T
+    kappa_T = -_pi * d['gamma_pipi'] / d['gamma_pi'] / p
+    cp = R * -tau ** 2 * d['gamma_tautau']
+
+    v_p, v_T = -v * kappa_T, v * alpha_v
+    # p * v is in MPa * m^3/kg = MJ/kg: the factor 1000 converts it to kJ/kg.
+    h_p, h_T = 1000 * v * (1 - T * alpha_v), cp
+    return dict(T=(0, 1), p=(1, 0), v=(v_p, v_T), rho=(-rho ** 2 * v_p, -rho ** 2 * v_T),
+                s=(-1000 * v * alpha_v, cp / T), h=(h_p, h_T),
+                u=(h_p - 1000 * (v + p * v_p), h_T - 1000 * p * v_T))
+
+
+def _helmholtz_natural(state) -> Dict[str, Tuple]:
+    """Derivatives of every property with respect to rho (at constant T) and T (at constant rho)."""
+    d = state.ders
+    T, p, rho = state.T, state.p, state.rho
+    delta, tau = d['delta'], d['tau']
+    cv = R * -tau ** 2 * d['phi_tautau']
+
+    # kPa -> MPa.
+    p_rho = R * T * (2 * delta * d['phi_delta'] + delta ** 2 * d['phi_deltadelta']) / 1000
+    p_T = rho * R * (delta * d['phi_delta'] - delta * tau * d['phi_deltatau']) / 1000
+    u_rho = -1000 * (T * p_T - p) / rho ** 2
+    return dict(T=(0, 1), p=(p_rho, p_T), v=(-1 / rho ** 2, 0), rho=(1, 0),
+                s=(-1000 * p_T / rho ** 2, cv / T),
+                u=(u_rho, cv), h=(u_rho + 1000 * (p_rho / rho - p / rho ** 2), cv + 1000 * p_T / rho))
+
+
+def natural(state) -> Dict[str, Tuple]:
+    """
+    Derivatives of every property with respect to the natural variables of the region of the state.
+    Args:
+        state: StateArray returned by a region kernel.
+    Returns:
+        Dict of property name to (dz/da, dz/db), where (a, b) is (p, T) in Regions 1, 2 and 5 and (rho, T) in Region3.
+    Raises:
+        ValueError if the state has no gamma or phi derivatives.
+    """
+    if state.ders is not None and 'gamma_pi' in state.ders:
+        return _gibbs_natural(state)
+    elif state.ders is not None and 'phi_delta' in state.ders:
+        return _helmholtz_natural(state)
+    raise ValueError('The state has no gamma or phi derivatives. Use a StateArray returned by a region kernel.')
+
+
+def partial(state, z: str, x: str, y: str):
+    """
+    Partial derivative (dz/dx)_y.
+    Args:
+        state: StateArray returned by a region kernel.
+        z: Differentiated property. One of `PROPERTIES`.
+        x: Property to differentiate with respect to. One of `PROPERTIES`.
+        y: Property held constant. One of `PROPERTIES`.
+    Returns:
+        The derivative, with one entry per point of the state.
+    Raises:
+        ValueError if a property is not supported or the state has no gamma or phi derivatives.
+    """
+    for name in (z, x, y):
+        if name not in PROPERTIES:
+            raise ValueError(f'Properties must be one of {PROPERTIES}. {name} given.')
+    ders = natural(state)
+    (z_a, z_b), (x_a, x_b), (y_a, y_b) = ders[z], ders[x], ders[y]
+    return np.asarray((z_a * y_b - z_b * y_a) / (x_a * y_b - x_b * y_a))
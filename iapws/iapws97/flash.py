@@ -0,0 +1,93 @@
+"""
+Flash calculations: the state of any (p, h) or (p, s) pair, whatever its region, the two-phase region included.
+
+Points are classified against the saturation line, the 623.15 K and 1073.15 K isotherms and the 2-3 boundary
+(`batch._region_p`). Single-phase points are evaluated with the backward equations of their region, which pick their
+own subregions (`Region2.b2bc`, `Region3.h_3ab`, ...), or with the Newton iterations of Region5, which has none, and
+optionally refined on the forward equations (see `solvers`). Two-phase points are mixtures of the saturated liquid and
+vapour at their pressure, in the proportion given by the quality x.
+
+Instead of raising, every point gets a status code: its region number (1 to 5), or 0 if it is out of bounds, in which
+case its properties are NaN.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from . import batch
+from ._utils import StateArray
+from .region4 import Region4
+
+
+class Flash(NamedTuple):
+    """
+    Outcome of a flash calculation.
+    Attributes:
+        state: StateArray of the points. `x` is the quality of the two-phase points and NaN elsewhere. cp, cv, w and
+            the `_utils.DERIVED` properties are not defined in the two-phase region and are NaN there.
+        region: Region number of every point (int8), 0 for points out of bounds.
+    """
+    state: StateArray
+    region: np.ndarray
+
+
+def _mix(liquid: StateArray, vapour: StateArray, x: np.ndarray) -> StateArray:
+    """Two-phase states of quality x: the specific properties are averaged with weights 1 - x and x."""
+    state = StateArray(T=liquid.T, p=liquid.p, x=x,
+                       **{name: (1 - x) * getattr(liquid, name) + x * getattr(vapour, name) for name in 'vush'})
+    state.rho = 1 / state.v
+    return state
+
+
+def _flash(p, name: str, z, consistent: bool) -> Flash:
+    """Flash of (p, h) or (p, s) pairs, `name` being 'h' or 's'."""
+    p, z = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(z, dtype=float))
+    shape = p.shape
+    p, z = p.ravel(), z.ravel()
+    pair = 'p' + name
+
+    codes = batch._region_p(p, name, z)
+    out = StateArray.empty(p.size)
+    for code in (1, 2, 3, 5):
+        mask = codes == code
+        if mask.any():
+            out[mask] = batch._evaluate_region(code, pair, p[mask], z[mask], consistent)
+
+    mask = codes == 4
+    if mask.any():
+        liquid, vapour = Region4._saturated(p[mask])
+        z_liquid, z_vapour = getattr(liquid, name), getattr(vapour, name)
+        state = _mix(liquid, vapour, (z[mask] - z_liquid) / (z_vapour - z_liquid))
+        # The lever rule reproduces z up to rounding: keep the input as given.
+        setattr(state, name, z[mask])
+        out[mask] = state
+
+    state = StateArray(**{column: getattr(out, column).reshape(shape) for column in StateArray.columns})
+    return Flash(state, codes.reshape(shape))
+
+
+def flash_ph(p, h, consistent: bool = False) -> Flash:
+    """
+    State of (p, h) pairs in any region, the two-phase region included.
+    Args:
+        p: Pressure (MPa). Array or scalar (broadcast against h).
+        h: Enthalpy (kJ/kg).
+        consistent: Refine the backward equations of the single-phase points on the forward equations.
+    Returns:
+        The Flash, with arrays of the broadcast shape of the inputs.
+    """
+    return _flash(p, 'h', h, consistent)
+
+
+def flash_ps(p, s, consistent: bool = False) -> Flash:
+    """
+    State of (p, s) pairs in any region, the two-phase region included, e.g. the isentropic end states of turbines and
+    pumps.
+    Args:
+        p: Pressure (MPa). Array or scalar (broadcast against s).
+        s: Entropy (kJ/kg/K).
+        consistent: Refine the backward equations of the single-phase points on the forward equations.
+    Returns:
+        The Flash, with arrays of the broadcast shape of the inputs.
+    """
+    return _flash(p, 's', s, consistent)
@@ -0,0 +1,157 @@
+"""
+Evaluation on (p, T) meshes, isobars and isotherms.
+
+The Gibbs tables of Region1 (`table2`) and of the residual part of Region2 (`table11`) are sums of separable monomials
+`n * x**I * y**J`, where x only depends on p and y only on T. On an N x M mesh, gamma is therefore the matrix product
+`X @ diag(n) @ Y.T` of the N x K matrix of pressure powers `X = x**I` and the M x K matrix of temperature powers
+`Y = y**J`, K being the number of terms. The derivatives only change the per-term weights (`n * I`, `n * J`, ...), so
+the power matrices are built once and every derivative is a single BLAS matrix product. Along an isobar or an isotherm
+one of the power matrices is a single row, computed once, and the products reduce to matrix-vector products.
+
+Points outside Regions 1 and 2 are returned as NaN.
+"""
+import numpy as np
+
+from ._utils import StateArray, region, _gibbs_properties
+from .region1 import Region1
+from .region2 import Region2
+
+
+def _table_arrays(table: dict) -> tuple:
+    """Exponents and coefficients of a table as numpy arrays (I, J, n)."""
+    return tuple(np.array([entry[key] for entry in table.values()], dtype=float) for key in ('I', 'J', 'n'))
+
+
+_TABLE2 = _table_arrays(Region1.table2)
+_TABLE10 = np.array([entry['J'] for entry in Region2.table10.values()], dtype=float), \
+           np.array([entry['n'] for entry in Region2.table10.values()])
+_TABLE11 = _table_arrays(Region2.table11)
+
+
+def _powers(z: np.ndarray, E: np.ndarray, fold: bool) -> tuple:
+    """
+    Power matrices `z**E`, `z**(E - 1)` and `z**(E - 2)` of a 1-D array. When `fold` is False, the same `z**E` matrix
+    is returned three times and the caller divides the results by z instead.
+    """
+    Z0 = z[:, None] ** E
+    if not fold:
+        return Z0, Z0, Z0
+    Z1 = Z0 / z[:, None]
+    return Z0, Z1, Z1 / z[:, None]
+
+
+def _series_ders(table: tuple, x: np.ndarray, y: np.ndarray) -> tuple:
+    """
+    Evaluates `sum(n * x**I * y**J)` and its first and second order derivatives for every combination of x and y.
+
+    The coefficients and the exponent factors of the derivatives are weights on the terms, folded into the power matrix
+    of the shorter variable, so that every derivative costs one matrix product. The divisions by x and y of the
+    derivatives are folded into the power matrices too, unless the other variable is so short (a single row along an
+    isobar or an isotherm) that dividing the result is cheaper.
+    Args:
+        table: (I, J, n) arrays.
+        x: 1-D array.
+        y: 1-D array.
+    Returns:
+        The tuple (f, f_x, f_y, f_xx, f_yy, f_xy) of `(len(x), len(y))` arrays.
+    """
+    I, J, n = table
+    fold_x, fold_y = 2 * len(I) < 3 * len(y), 2 * len(I) < 3 * len(x)
+    X0, X1, X2 = _powers(x, I, fold_x)
+    Y0, Y1, Y2 = _powers(y, J, fold_y)
+
+    terms = ((n, X0, Y0), (n * I, X1, Y0), (n * J, X0, Y1),
+             (n * I * (I - 1), X2, Y0), (n * J * (J - 1), X0, Y2), (n * I * J, X1, Y1))
+    if len(x) <= len(y):
+        f, f_x, f_y, f_xx, f_yy, f_xy = ((X * w) @ Y.T for w, X, Y in terms)
+    else:
+        f, f_x, f_y, f_xx, f_yy, f_xy = (X @ (Y * w).T for w, X, Y in terms)
+
+    x, y = x[:, None], y[None, :]
+    if not fold_x:
+        f_x, f_xx, f_xy = f_x / x, f_xx / x ** 2, f_xy / x
+    if not fold_y:
+        f_y, f_yy, f_xy = f_y / y, f_yy / y ** 2, f_xy / y
+    return f, f_x, f_y, f_xx, f_yy, f_xy
+
+
+def _gamma1(p: np.ndarray, T: np.ndarray) -> tuple:
+    """Region1 (pi, tau, gamma and its derivatives) on the `(len(p), len(T))` grid of the given 1-D arrays."""
+    _pi, tau = p / 16.53, 1386 / T
+    gg, ga, gt, gaa, gtt, gat = _series_ders(_TABLE2, 7.1 - _pi, tau - 1.222)
+    return _pi[:, None], tau[None, :], gg, -ga, gt, gaa, gtt, -gat
+
+
+def _gamma2(p: np.ndarray, T: np.ndarray) -> tuple:
+    """Region2 (pi, tau, gamma and its derivatives) on the `(len(p), len(T))` grid of the given 1-D arrays."""
+    _pi, tau = p / 1, 540 / T
+    ggR, gpR, gtR, gppR, gttR, gptR = _series_ders(_TABLE11, _pi, tau - 0.5)
+
+    J, n = _TABLE10
+    tauJ = n * tau[:, None] ** J
+    ggO = np.log(_pi)[:, None] + (tauJ @ np.ones_like(J))[None, :]
+    gtO = (tauJ @ J / tau)[None, :]
+    gttO = (tauJ @ (J * (J - 1)) / tau ** 2)[None, :]
+    _pi, tau = _pi[:, None], tau[None, :]
+    return _pi, tau, ggO + ggR, 1 / _pi + gpR, gtO + gtR, -1 / _pi ** 2 + gppR, gttO + gttR, gptR
+
+
+# Keys of the gamma derivatives in the `ders` of `evaluate_grid`, in the order returned by `_gamma1` and `_gamma2`.
+_DERS = ('pi', 'tau', 'gamma', 'gamma_pi', 'gamma_tau', 'gamma_pipi', 'gamma_tautau', 'gamma_pitau')
+
+
+def evaluate_grid(p, T) -> StateArray:
+    """
+    Evaluates the properties on every point of the (p, T) mesh spanned by two vectors.
+    Args:
+        p: Pressures (MPa). 1-D array of N entries.
+        T: Temperatures (K). 1-D array of M entries.
+    Returns:
+        StateArray of `(N, M)` arrays, where `[i, j]` is the point `(p[i], T[j])`. `ders` holds the gamma derivatives,
+        so `derivatives.partial` can be used on the result. Points out of Regions 1 and 2 are NaN.
+    """
+    p = np.ravel(np.asarray(p, dtype=float))
+    T = np.ravel(np.asarray(T, dtype=float))
+    codes = region(*np.meshgrid(p, T, indexing='ij'))
+
+    out = StateArray(ders={key: np.full(codes.shape, np.nan) for key in _DERS},
+                     **{name: np.full(codes.shape, np.nan) for name in StateArray.columns})
+    for code, kernel in ((1, _gamma1), (2, _gamma2)):
+        mask = codes == code
+        if not mask.any():
+            continue
+        # The power series are evaluated on the smallest block of the mesh holding every point of the region, the
+        # properties only on the points of the region.
+        rows, cols = mask.any(axis=1), mask.any(axis=0)
+        block = mask[np.ix_(rows, cols)]
+        ders = [np.broadcast_to(values, block.shape)[block] for values in kernel(p[rows], T[cols])]
+        T_block, p_block = np.meshgrid(T[cols], p[rows])
+        _pi, tau = ders[:2]
+        out[mask] = _gibbs_properties(T_block[block], p_block[block], tau, _pi, *ders[2:])
+        for key, values in zip(_DERS, ders):
+            out.ders[key][mask] = values
+    return out
+
+
+def sweep_isobar(p: float, T) -> StateArray:
+    """
+    Evaluates the properties along an isobar.
+    Args:
+        p: Pressure (MPa).
+        T: Temperatures (K).
+    Returns:
+        The properties at every temperature as a flat StateArray. Points out of Regions 1 and 2 are NaN.
+    """
+    return evaluate_grid([p], T)[0]
+
+
+def sweep_isotherm(T: float, p) -> StateArray:
+    """
+    Evaluates the properties along an isotherm.
+    Args:
+        T: Temperature (K).
+        p: Pressures (MPa).
+    Returns:
+        The properties at every pressure as a flat StateArray. Points out of Regions 1 and 2 are NaN.
+    """
+    return evaluate_grid(p, [T])[:, 0]
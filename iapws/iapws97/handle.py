@@ -0,0 +1,268 @@
+"""
+`IAPWS97`, the entry point of the formulation for single states, which doubles as a reusable handle.
+
+`IAPWS97.update` overwrites the State of the handle in place. Single points take a scalar path: they are classified
+with plain float comparisons (see `_utils._region_scalar` and `batch._region_p_scalar`), and the kernels of the regions
+evaluate their series on floats (see `_utils._poly_ders`) and write the properties straight into the State and its
+`Derivatives`, so no StateArray and no 0-d array is built per call. Only the refinements of a consistent handle, which
+iterate on arrays, go through the vectorized path, as in `batch`.
+
+(T, h), (T, s) and (h, s) pairs are not classified that way: (T, h) and (T, s) have no backward equations and are solved
+on the forward equations of the regions their isotherm crosses (see `solvers.solve_Th`), and (h, s) pairs are
+classified with `_utils.region_hs` and evaluated from the backward equations p(h, s) (see `solvers.solve_hs`).
+
+`benchmark.run_handle` measures both against the constructor.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ._utils import State, StateArray, Derivatives, region_hs, b23, _p_s_eqn, _region_scalar
+from .batch import evaluate, _evaluate_region, _region_p_scalar, _KERNELS
+from . import solvers
+
+# Input pairs of `IAPWS97`, named by their variables in the order p, T, h, s. `batch.evaluate` takes the first two.
+INPUT_PAIRS = ('pT', 'ph', 'ps', 'Th', 'Ts', 'hs')
+
+
+def _region_T(name: str, T: float, z: float) -> int:
+    """
+    Region of the state of temperature T and property `name` (h or s) equal to z. Up to 863.15 K the isotherm crosses
+    Region2 and, at higher pressures, Region1 (below the saturation line) or Region3 (below the 2-3 boundary). h and s
+    of steam decrease with pressure along isotherms, so the state is in Region2 if z is not below its value on that
+    boundary. 0 marks temperatures out of bounds.
+    """
+    if 273.15 <= T <= 863.15:
+        low, p = (1, _p_s_eqn(T)) if T <= 623.15 else (3, b23(T=T))
+        return 2 if getattr(_KERNELS[2].evaluate(T, float(p), out=State()), name) <= z else low
+    if 863.15 < T <= 1073.15:
+        return 2
+    return 5 if 1073.15 < T <= 2273.15 else 0
+
+
+def _solve_point(pair: str, v1: float, v2: float, consistent: bool) -> Tuple[int, Optional[StateArray]]:
+    """
+    Region number and state of a (T, h), (T, s) or (h, s) pair. (T, h) and (T, s) pairs are solved in their region
+    (see `_region_T`), on the forward equations whatever `consistent`. (h, s) pairs are evaluated from the backward
+    equations of their region (see `_utils.region_hs`) in Regions 1 and 2, refined on the forward equations if
+    `consistent`, and solved on them in Region3.
+    Returns:
+        The region number (0 or 4 out of bounds or in the two-phase region, where the state is None) and the state, with
+        the inputs kept as given, or NaN if the iteration of an (h, s) pair does not converge.
+    """
+    if pair == 'hs':
+        code = int(region_hs(v1, v2))
+        if code not in (1, 2, 3):
+            return code, None
+        if code == 3 or consistent:
+            state = solvers.solve_hs(v1, v2, code).state
+        else:
+            kernel = _KERNELS[code]
+            p = kernel._p_hs(v1, v2)
+            state = kernel.evaluate(kernel._T_ph(p, v1), p)
+    else:
+        code = _region_T(pair[1], v1, v2)
+        if not code:
+            return code, None
+        result = (solvers.solve_Th if pair == 'Th' else solvers.solve_Ts)(v1, v2, code)
+        if not result.converged:
+            # The iteration is bracketed by the bounds of the isotherm in the region: z is not within them.
+            return 0, None
+        state = result.state
+    if not np.isnan(state.T):
+        setattr(state, pair[0], v1)
+        setattr(state, pair[1], v2)
+    return code, state
+
+
+class IAPWS97(object):
+    """
+    Entry point of the IAPWS-IF97 formulation, which dispatches every input to the region it belongs to.
+
+    Instantiate it with any two of p, T, h and s to get a single state whatever its region, or use `IAPWS97.evaluate`
+    for (p, T) or (p, h) batches. The region is found with the scalar classifiers (or the solvers, see the module
+    docstring) and the properties are computed by the stateless kernel of that region, so no Region instance is built,
+    neither to check membership nor to evaluate.
+
+    An instance can also be used as a reusable handle: instantiate it empty once and call `update` with every new input
+    pair. The State and the Derivatives of the handle are then overwritten in place instead of being allocated again,
+    and the kernels skip the arrays altogether (see the module docstring), which keeps the cost and the allocations of
+    a call down in tight loops such as ODE right-hand sides.
+    """
+
+    def __init__(self, p: Optional[float] = None, T: Optional[float] = None, h: Optional[float] = None,
+                 s: Optional[float] = None, consistent: bool = False):
+        """
+        Pass two of p, T, h and s. If all of them are None (their default), an empty handle is instantiated, to be
+        filled with `update`.
+        Args:
+            p: Pressure (MPa).
+            T: Temperature (K).
+            h: Enthalpy (kJ/kg).
+            s: Entropy (kJ/kg/K).
+            consistent: Refine the backward equations on the forward equations (see `batch.evaluate`), in this call
+                and in every `update` of the instance.
+        Raises:
+            ValueError if the input pair is not supported, if the state is out of bounds or in the two-phase region, or
+                if the iteration on the forward equations does not converge.
+        """
+        self.region = None
+        self.consistent = consistent
+        self._state = State()
+        given = {name: value for name, value in zip('pThs', (p, T, h, s)) if value is not None}
+        if not given:
+            return
+        pair = ''.join(given)
+        if pair not in INPUT_PAIRS:
+            raise ValueError('You should pass one of the following combinations to determine a state: (p, T), (p, h), '
+                             '(p, s), (T, h), (T, s), (h, s).')
+        self.update(pair, *given.values())
+
+    def update(self, input_pair: str, v1: float, v2: float):
+        """
+        Recomputes the state from a new input pair, overwriting the State and the derivatives of the instance in place.
+        Args:
+            input_pair: One of `INPUT_PAIRS`.
+            v1: First variable of the pair: pressure (MPa), temperature (K) or enthalpy (kJ/kg).
+            v2: Second variable of the pair: temperature (K), enthalpy (kJ/kg) or entropy (kJ/kg/K).
+        Raises:
+            ValueError if the input pair is not supported, if the state is out of bounds or in the two-phase region, or
+                if the iteration on the forward equations does not converge. The instance is left unchanged.
+        """
+        if input_pair not in INPUT_PAIRS:
+            raise ValueError(f'input_pair must be one of {INPUT_PAIRS}. {input_pair} given.')
+        p, y = float(v1), float(v2)
+        state = None
+        if input_pair[0] != 'p':
+            code, state = _solve_point(input_pair, p, y, self.consistent)
+        else:
+            # Plain float comparisons instead of the array classifiers. States out of bounds raise here for 'pT'.
+            code = _region_scalar(p, y) if input_pair == 'pT' else _region_p_scalar(p, input_pair[1], y)
+        if code not in (1, 2, 3, 5):
+            raise ValueError(f'State out of bounds or in the two-phase region. {input_pair}=({v1}, {v2}).')
+
+        if state is None and self.consistent and (input_pair != 'pT' or code == 3):
+            state = _evaluate_region(code, input_pair, np.asarray(p), np.asarray(y), consistent=True)
+        if state is not None:
+            if np.isnan(state.T):
+                raise ValueError(f'The iteration on the forward equations did not converge. '
+                                 f'{input_pair}=({v1}, {v2}).')
+            state.point(out=self._state)
+        else:
+            ders = self._state.ders
+            if ders is None:
+                self._state.ders = Derivatives()
+            elif code != self.region:
+                # The kernels only overwrite the derivatives of their own equation.
+                ders.clear()
+            _evaluate_region(code, input_pair, p, y, out=self._state)
+        self.region = code
+
+    def __repr__(self) -> str:
+        return f'IAPWS97(p={self.p}, T={self.T}, region={self.region})'
+
+    @property
+    def state(self) -> State:
+        """State with all the properties and the derivatives of the base equation of the region."""
+        return self._state
+
+    @property
+    def T(self) -> float:
+        """Temperature of state (K)"""
+        return self._state.T
+
+    @property
+    def p(self) -> float:
+        """Pressure of state (MPa)"""
+        return self._state.p
+
+    @property
+    def P(self) -> float:
+        """Pressure of state (MPa)"""
+        return self._state.p
+
+    @property
+    def v(self) -> float:
+        """Specific volume in m^3/kg"""
+        return self._state.v
+
+    @property
+    def rho(self) -> float:
+        """Density in kg/m^3"""
+        return self._state.rho
+
+    @property
+    def u(self) -> float:
+        """Specific internal energy in kJ/kg"""
+        return self._state.u
+
+    @property
+    def s(self) -> float:
+        """Specific entropy in kJ/kg/K"""
+        return self._state.s
+
+    @property
+    def h(self) -> float:
+        """Specific enthalpy in kJ/kg"""
+        return self._state.h
+
+    @property
+    def cp(self) -> float:
+        """Specific isobaric heat capacity kJ/kg/K"""
+        return self._state.cp
+
+    @property
+    def cv(self) -> float:
+        """Specific isochoric heat capacity kJ/kg/K"""
+        return self._state.cv
+
+    @property
+    def w(self) -> float:
+        """Speed of sound in m/s"""
+        return self._state.w
+
+    @property
+    def alpha_v(self) -> float:
+        """Isobaric cubic expansion coefficient in 1/K"""
+        return self._state.alpha_v
+
+    @property
+    def kappa_T(self) -> float:
+        """Isothermal compressibility in 1/MPa"""
+        return self._state.kappa_T
+
+    @property
+    def mu_JT(self) -> float:
+        """Joule-Thomson coefficient in K/MPa"""
+        return self._state.mu_JT
+
+    @property
+    def kappa(self) -> float:
+        """Isentropic exponent"""
+        return self._state.kappa
+
+    @property
+    def dpdT_v(self) -> float:
+        """Derivative of pressure with respect to temperature at constant specific volume, in MPa/K"""
+        return self._state.dpdT_v
+
+    @staticmethod
+    def evaluate(p, T=None, h=None, **kwargs) -> StateArray:
+        """
+        Evaluates a batch of (p, T) or (p, h) pairs that may mix any of the supported regions. All points are
+        classified, the points of every region are gathered into contiguous arrays and evaluated with the vectorized
+        kernel of the region, and the results are scattered back in the order of the inputs.
+        Args:
+            p: Pressure (MPa). Array or scalar (broadcast against the other input).
+            T: Temperature (K). Pass either T or h.
+            h: Enthalpy (kJ/kg). Pass either T or h.
+            kwargs: Passed to `batch.evaluate` (workers, chunk_size, sort_regions, backend, out, consistent). Defaults
+                to a single worker, so that the batch is evaluated in the calling thread.
+        Returns:
+            The properties as a flat StateArray (`out` if given). Points in the two-phase region or out of bounds are
+            NaN.
+        Raises:
+            ValueError if both or none of T and h are given.
+        """
+        kwargs.setdefault('workers', 1)
+        return evaluate(p, T=T, h=h, **kwargs)
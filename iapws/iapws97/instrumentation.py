@@ -0,0 +1,60 @@
+"""
+Counters of the work done by the iterative solvers.
+
+Every call of `solvers.newton` records, under the name of the solver ('pT', 'ph', ...), the number of points it solved,
+the forward evaluations they needed and the points that did not converge. The counters are shared by the whole process
+and updated under a lock, so the threads of `batch.evaluate` can record concurrently. Worker processes have counters of
+their own, which are not reported back.
+
+`batch.evaluate(..., dedup=True)` records its deduplication under 'dedup', with the input points as points and the
+unique points it evaluated as evaluations, so that points / evaluations is the dedup ratio (see `ratio`).
+`taylor.Reference.update` records its updates under 'taylor' in the same way, with the points it had to evaluate
+instead of expanding as evaluations.
+
+    instrumentation.reset()
+    batch.evaluate(p, T=T, consistent=True, workers=1)
+    instrumentation.snapshot()['pT']  # {'calls': 1, 'points': ..., 'evaluations': ..., 'failures': 0}
+"""
+import threading
+from typing import Dict
+
+FIELDS = ('calls', 'points', 'evaluations', 'failures')
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[str, int]] = {}
+
+
+def record(solver: str, points: int, evaluations: int, failures: int):
+    """
+    Adds one call of a solver to its counters.
+    Args:
+        solver: Name of the solver.
+        points: Number of points solved in the call.
+        evaluations: Total number of forward evaluations of those points.
+        failures: Number of points that did not converge.
+    """
+    with _lock:
+        counters = _counters.setdefault(solver, dict.fromkeys(FIELDS, 0))
+        counters['calls'] += 1
+        counters['points'] += points
+        counters['evaluations'] += evaluations
+        counters['failures'] += failures
+
+
+def snapshot() -> Dict[str, Dict[str, int]]:
+    """Copy of the counters of every solver called since the last `reset`, as {solver: {field: value}}."""
+    with _lock:
+        return {solver: dict(counters) for solver, counters in _counters.items()}
+
+
+def ratio(solver: str) -> float:
+    """Points per evaluation of a solver since the last `reset` (the dedup ratio for 'dedup'), NaN if never called."""
+    with _lock:
+        counters = _counters.get(solver)
+        return counters['points'] / counters['evaluations'] if counters and counters['evaluations'] else float('nan')
+
+
+def reset():
+    """Clears the counters of every solver."""
+    with _lock:
+        _counters.clear()
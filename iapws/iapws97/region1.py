@@ -2,10 +2,9 @@ import warnings
 
 import numpy as np
 from typing import Optional
-from collections import defaultdict
-from scipy.optimize import newton
 
-from ._utils import State, Region, R, _p_s
+from ._utils import State, StateArray, Region, R, _p_s, _newton, _poly, _poly_ders, _gibbs_properties, \
+    _set_ders
 
 class Region1(Region):
     """
@@ -186,7 +185,7 @@ class Region1(Region):
             self._state.s = s
         elif h and s:
             self._state.p = self.p_hs(h, s)
-            self._state.T = self.T_ph(p, h)
+            self._state.T = self.T_ph(self._state.p, h)
             self._state.s = s
             self._state.h = h
         else:
@@ -194,30 +193,7 @@ class Region1(Region):
 
 
         if calc:
-            tau = 1386 / T
-            _pi = p / 16.53
-
-            if not self._state in self:
-                # Find region number and return it.
-                pass
-
-            gg = Region1.base_eqn(T=T, p=p)
-            gp = Region1.base_der_pi_const_tau(T=T, p=p)
-            gt = Region1.base_der_tau_const_pi(T=T, p=p)
-            gpp = Region1.base_der2_pipi_const_tau(T=T, p=p)
-            gtt = Region1.base_der2_tautau_const_pi(T=T, p=p)
-            gpt = Region1.base_der2_pitau(T=T, p=p)
-
-            self._state.ders = defaultdict(float, gamma=gg, gamma_pi=gp, gamma_tau=gt, gamma_pipi=gpp, gamma_tautau=gtt, gamma_pitau=gpt)
-
-            self._state.v = _pi * gp * R * T / p / 1000  # R*T/p has units of 1000 m^3/kg.
-            self._state.rho = 1 / self._state.v
-            self._state.u = R * T * (tau*gt - _pi*gp)
-            self._state.s = self._state.s if self._state.s is not None else R * (tau*gt - gg)
-            self._state.h = self._state.h if self._state.h is not None else R * T * tau * gt
-            self._state.cp = R * -tau**2 * gtt
-            self._state.cv = R * (-tau**2 * gtt + (gp-tau*gpt)**2 / gpp)
-            self._state.w = np.sqrt(1000 * R * T * gp**2 / ((gp-tau*gpt)**2 / (tau**2 * gtt) - gpp))  # 1000 is a conversion factor: sqrt(kJ/kg) = sqrt(1000 m/s) -> sqrt(1000) m/s
+            self._state = Region._from_kernel(Region1.evaluate(self._state.T, self._state.p), self._state)
         else:
             self._state = State()
 
@@ -252,6 +228,31 @@ class Region1(Region):
         """Alias for `self.base_eqn`"""
         return Region1.base_eqn(T, p) * R * T
 
+    @staticmethod
+    def evaluate(T, p, out: Optional[State] = None) -> StateArray:
+        """
+        Fused kernel: evaluates gamma, its derivatives and all properties in a single pass over table 2.
+        Works on scalars and on numpy arrays alike. No range check is performed.
+        Args:
+            T: Temperature (K).
+            p: Pressure (MPa).
+            out: State to overwrite in place, its `ders` included, when T and p are floats (see `IAPWS97.update`).
+        Returns:
+            The properties as a StateArray (`out` if given), with the reduced variables and the derivatives in `ders`.
+        """
+        if out is None:
+            T, p = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(p, dtype=float))
+        tau = 1386 / T
+        _pi = p / 16.53
+
+        # Derivatives with respect to (7.1 - pi) change sign once for every derivative in pi.
+        gg, ga, gt, gaa, gtt, gat = _poly_ders(Region1.table2, 7.1 - _pi, tau - 1.222)
+        gp, gpp, gpt = -ga, gaa, -gat
+
+        state = _gibbs_properties(T, p, tau, _pi, gg, gp, gt, gpp, gtt, gpt, out=out)
+        return _set_ders(state, dict(pi=_pi, tau=tau, gamma=gg, gamma_pi=gp, gamma_tau=gt, gamma_pipi=gpp,
+                                     gamma_tautau=gtt, gamma_pitau=gpt))
+
     #############################################################
     ################## FIRST ORDER DERIVATIVES ##################
     #############################################################
@@ -413,40 +414,83 @@ class Region1(Region):
         """Speed of sound in m/s"""
         return self._state.w
 
+    @property
+    def alpha_v(self) -> float:
+        """Isobaric cubic expansion coefficient in 1/K"""
+        return self._state.alpha_v
+
+    @property
+    def kappa_T(self) -> float:
+        """Isothermal compressibility in 1/MPa"""
+        return self._state.kappa_T
+
+    @property
+    def mu_JT(self) -> float:
+        """Joule-Thomson coefficient in K/MPa"""
+        return self._state.mu_JT
+
+    @property
+    def kappa(self) -> float:
+        """Isentropic exponent"""
+        return self._state.kappa
+
+    @property
+    def dpdT_v(self) -> float:
+        """Derivative of pressure with respect to temperature at constant specific volume, in MPa/K"""
+        return self._state.dpdT_v
+
     #############################################################
     ####################### Backwards ###########################
     #############################################################
-    def T_ph(self, p: float, h: float) -> float:
+    def T_ph(self, p: float, h: float, consistent: bool = False) -> float:
         """
         Backwards equation 11 for calculating Temperature as a function of pressure and enthalpy.
         Args:
             p: Pressure (MPa).
             h: Enthalpy (kJ/kg).
+            consistent: Refine the result on the forward equations (see `solvers`).
         Returns:
             Temperature (K).
         """
         eta = h/2500
         T = sum(entry['n'] * p**entry['I']*(eta + 1)**entry['J'] for entry in Region1.table6.values())
+        if consistent:
+            T = float(solvers.newton_point(1, p, T, [('h', h)]).T)
         if not State(p=p, T=T) in self:
             # TODO: Suggest a region,
             warnings.warn(f'State out of bounds. {T}', RuntimeWarning)
         return T
 
-    def T_ps(self, p: float, s: float) -> float:
+    @staticmethod
+    def _T_ph(p, h):
+        """Equation 11 without the region check, so that it can be evaluated over arrays."""
+        p, h = np.asarray(p, dtype=float), np.asarray(h, dtype=float)
+        return _poly(Region1.table6, p, h / 2500 + 1)
+
+    def T_ps(self, p: float, s: float, consistent: bool = False) -> float:
         """
         Backwards equation 13 for calculating Temperature as a function of pressure and entropy.
         Args:
             p: Pressure (MPa).
             s: Entropy (kJ/kg/K).
+            consistent: Refine the result on the forward equations (see `solvers`).
         Returns:
             Temperature (K).
         """
         T = sum(entry['n'] * p**entry['I'] * (s + 2)**entry['J'] for entry in Region1.table8.values())
+        if consistent:
+            T = float(solvers.newton_point(1, p, T, [('s', s)]).T)
         if not State(p=p, T=T) in self:
             # TODO: Suggest a region,
             warnings.warn(f'State out of bounds. {T}', RuntimeWarning)
         return T
 
+    @staticmethod
+    def _T_ps(p, s):
+        """Equation 13 without the region check, so that it can be evaluated over arrays."""
+        p, s = np.asarray(p, dtype=float), np.asarray(s, dtype=float)
+        return _poly(Region1.table8, p, s + 2)
+
     def T_hs(self, h: float, s: float) -> float:
         """
         Backwards equation for calculating Temperature as a function of enthalpy and entropy.
@@ -482,13 +526,21 @@ class Region1(Region):
             warnings.warn(f'State out of bounds. {T}', RuntimeWarning)
         return p
 
-    def p_Th(self, T: float, h: float) -> float:
+    @staticmethod
+    def _p_hs(h, s):
+        """Equation of `p_hs` without the region check, so that it can be evaluated over arrays."""
+        h, s = np.asarray(h, dtype=float), np.asarray(s, dtype=float)
+        return 100 * _poly(Region1.table2_supp, h / 3400 + 0.05, s / 7.6 + 0.05)
+
+    def p_Th(self, T: float, h: float, guess: Optional[float] = None) -> float:
         """
         Backwards equation for calculating pressure as a function of Temperature and enthalpy.
         Beware that this calculation might be time consuming as it is performing iteration (no backwards equation is provided by IAPWS).
         Args:
             T: Temperature (K).
             h: Enthalpy (kJ/kg).
+            guess: Initial pressure, e.g. the solution of the previous sample of a time series. The cold start is
+                used if it is not given or if the iteration from it fails.
         Returns:
             Pressure (MPa).
         """
@@ -498,20 +550,22 @@ class Region1(Region):
 
         p0 = (_p_s(T=T) + 100) / 2
         with warnings.catch_warnings():
-            p = newton(f, p0)  # initial p guess from region boundaries (see __contains__).
+            p = _newton(f, p0, guess)  # initial p guess from region boundaries (see __contains__).
 
         if not State(p=p, T=T) in self:
             # TODO: Suggest a region,
             warnings.warn(f'State out of bounds. {T}', RuntimeWarning)
         return p
 
-    def p_Ts(self, T: float, s: float) -> float:
+    def p_Ts(self, T: float, s: float, guess: Optional[float] = None) -> float:
         """
         Backwards equation for calculating pressure as a function of Temperature and Entropy.
         Beware that this calculation might be time consuming as it is performing iteration (no backwards equation is provided by IAPWS).
         Args:
             T: Temperature (K).
             s: Entropy (kJ/kg/K).
+            guess: Initial pressure, e.g. the solution of the previous sample of a time series. The cold start is
+                used if it is not given or if the iteration from it fails.
         Returns:
             Pressure (MPa).
         """
@@ -521,9 +575,13 @@ class Region1(Region):
 
         p0 = (_p_s(T=T) + 100) / 2
         with warnings.catch_warnings():
-            p = newton(f, p0)  # initial p guess from region boundaries (see __contains__).
+            p = _newton(f, p0, guess)  # initial p guess from region boundaries (see __contains__).
 
         if not State(p=p, T=T) in self:
             # TODO: Suggest a region,
             warnings.warn(f'State out of bounds. {T}', RuntimeWarning)
         return p
+
+
+# solvers imports this module, so it is imported once the module is loaded, and only looked up when called.
+from . import solvers  # noqa: E402
@@ -2,11 +2,11 @@ import warnings
 
 import numpy as np
 from typing import Optional, Dict
-from collections import defaultdict
 
-from scipy.optimize import fsolve, newton, bisect
+from scipy.optimize import fsolve, bisect
 
-from ._utils import State, Region, R, _p_s
+from ._utils import State, StateArray, Region, R, _p_s, _newton, _poly, _poly_ders, _gibbs_properties, _ideal_gas, \
+    _set_ders, _piecewise
 
 
 class Region2(Region):
@@ -37,8 +37,6 @@ class Region2(Region):
         cv
         w
     """
-    # ROADMAP:
-    # TODO: Metastable region.
 
     table10 = {1: {'J': 0, 'n': -0.96927686500217e1},
                2: {'J': 1, 'n': 0.10086655968018e2},
@@ -451,9 +449,11 @@ class Region2(Region):
                    31: {'I': 16, 'J': 10, 'n': -0.111754907323424e16}}
 
     def __init__(self, T: Optional[float] = None, p: Optional[float] = None, h: Optional[float] = None,
-                 s: Optional[float] = None, state: Optional[State] = None):
+                 s: Optional[float] = None, state: Optional[State] = None, metastable: bool = False):
         """
         If all parameters are None (their default), then an empty instance is instanciated. This is to that a `State in Region3` check can be performed easily.
+        With `metastable`, a (p, T) state is evaluated with the supplementary equation of the metastable-vapour region
+        (see `evaluate`).
         """
         params = [p, T, h, s]
         if state is not None and all(param is None for param in params):
@@ -473,6 +473,8 @@ class Region2(Region):
         if all(param is None for param in params) and state is None:
             calc = False
             # Let the class instantiate so that someone can perform a `State in Region2()` check.
+        elif metastable and not (p and T):
+            raise ValueError('The metastable-vapour equation has no backward equations: pass a (p, T) pair.')
         elif p and T:
             self._state.T = T
             self._state.p = p
@@ -495,7 +497,7 @@ class Region2(Region):
             # self._state.s = sk
         elif h and s:
             self._state.p = self.p_hs(h, s)
-            self._state.T = self.T_ph(p, h)
+            self._state.T = self.T_ph(self._state.p, h)
             self._state.s = s
             self._state.h = h
         else:
@@ -503,50 +505,7 @@ class Region2(Region):
                 'You should only pass one of the following combinations to determine a state in Reg2: (p,T) (p, h), (p, s), (T, h), (T,s), (h, s).')
 
         if calc:
-            tau = 540 / T
-            _pi = p / 1
-
-            if not self._state in self:
-                # Find region number and return it.
-                pass
-
-            ggO, ggR = Region2.base_eqn_id_gas(T=T, p=p), Region2.base_eqn_residual(T=T, p=p)
-            gg = ggO + ggR
-
-            gpO, gpR = Region2.base_id_gas_der_pi_const_tau(T=T, p=p), Region2.base_residual_der_pi_const_tau(T=T, p=p)
-            gp = gpO + gpR
-
-            gtO, gtR = Region2.base_id_gas_der_tau_const_pi(T=T, p=p), Region2.base_residual_der_tau_const_pi(T=T, p=p)
-            gt = gtO + gtR
-
-            gppO, gppR = Region2.base_id_gas_der2_pipi_const_tau(T=T, p=p), Region2.base_residual_der2_pipi_const_tau(
-                T=T, p=p)
-            gpp = gppO + gppR
-
-            gttO, gttR = Region2.base_id_gas_der2_tautau_const_pi(T=T, p=p), Region2.base_residual_der2_tautau_const_pi(
-                T=T, p=p)
-            gtt = gttO + gttR
-
-            gptO, gptR = Region2.base_id_gas_der2_pitau(T=T, p=p), Region2.base_residual_der2_pitau(T=T, p=p)
-            gpt = gptO + gptR
-
-            self._state.ders = defaultdict(float,
-                                           gammaO=ggO, gammaR=ggR, gamma=gg,
-                                           gammaO_pi=gpO, gammaR_pi=gpO, gamma_pi=gp,
-                                           gammaO_tau=gtO, gammaR_tau=gtR, gamma_tau=gt,
-                                           gammaO_pipi=gppO, gammaR_pipi=gppR, gamma_pipi=gpp,
-                                           gammaO_tautau=gttO, gammaR_tautau=gttR, gamma_tautau=gtt,
-                                           gammaO_pitau=gptO, gammaR_pitau=gptR, gamma_pitau=gpt)
-
-            self._state.v = _pi * gp * R * T / p / 1000  # R*T/p has units of 1000 m^3/kg.
-            self._state.rho = 1 / self._state.v
-            self._state.u = R * T * (tau * gt - _pi * gp)
-            self._state.s = self._state.s if self._state.s is not None else R * (tau * gt - gg)
-            self._state.h = self._state.h if self._state.h is not None else R * T * tau * gt
-            self._state.cp = R * -tau ** 2 * gtt
-            self._state.cv = R * (-tau ** 2 * gtt - (1 + _pi * gpR - tau * _pi * gptR) ** 2 / (1 - _pi ** 2 * gppR))
-            self._state.w = np.sqrt(1000 * R * T * gp ** 2 / ((gp - tau * gpt) ** 2 / (
-                        tau ** 2 * gtt) - gpp))  # 1000 is a conversion factor: sqrt(kJ/kg) = sqrt(1000 m/s) -> sqrt(1000) m/s
+            self._state = Region._from_kernel(Region2.evaluate(self._state.T, self._state.p, metastable), self._state)
         else:
             self._state = State()
 
@@ -690,6 +649,39 @@ class Region2(Region):
         """Alias for `self.base_eqn`"""
         return Region2.base_eqn(T, p) * R * T
 
+    @staticmethod
+    def evaluate(T, p, metastable: bool = False, out: Optional[State] = None) -> StateArray:
+        """
+        Fused kernel: evaluates gamma, its derivatives and all properties in a single pass over tables 10 and 11.
+        Works on scalars and on numpy arrays alike. No range check is performed.
+        Args:
+            T: Temperature (K).
+            p: Pressure (MPa).
+            metastable: Use the supplementary equation of the metastable-vapour region (eqs. 18 and 19), tables 10 (with
+                the `table_10_meta` values of n1 and n2) and 16, instead. It is valid from the saturated-vapour line to
+                the 5 % equilibrium moisture line, up to 10 MPa.
+            out: State to overwrite in place, its `ders` included, when T and p are floats (see `IAPWS97.update`).
+        Returns:
+            The properties as a StateArray (`out` if given), with the reduced variables and the derivatives in `ders`.
+        """
+        if out is None:
+            T, p = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(p, dtype=float))
+        tau = 540 / T
+        _pi = p / 1
+
+        ideal, residual = (Region2.table_10_meta, Region2.table16) if metastable else (Region2.table10, Region2.table11)
+        ggO, gpO, gtO, gppO, gttO, gptO = _ideal_gas(ideal, _pi, tau)
+        ggR, gpR, gtR, gppR, gttR, gptR = _poly_ders(residual, _pi, tau - 0.5)
+
+        state = _gibbs_properties(T, p, tau, _pi, ggO + ggR, gpO + gpR, gtO + gtR, gppO + gppR, gttO + gttR,
+                                  gptO + gptR, out=out)
+        return _set_ders(state, dict(pi=_pi, tau=tau, gammaO=ggO, gammaR=ggR, gamma=ggO + ggR,
+                                     gammaO_pi=gpO, gammaR_pi=gpR, gamma_pi=gpO + gpR,
+                                     gammaO_tau=gtO, gammaR_tau=gtR, gamma_tau=gtO + gtR,
+                                     gammaO_pipi=gppO, gammaR_pipi=gppR, gamma_pipi=gppO + gppR,
+                                     gammaO_tautau=gttO, gammaR_tautau=gttR, gamma_tautau=gttO + gttR,
+                                     gammaO_pitau=gptO, gammaR_pitau=gptR, gamma_pitau=gptO + gptR))
+
     @staticmethod
     def base_eqn_id_gas(T: float, p: float) -> float:
         """
@@ -1000,15 +992,41 @@ class Region2(Region):
         """Speed of sound in m/s"""
         return self._state.w
 
+    @property
+    def alpha_v(self) -> float:
+        """Isobaric cubic expansion coefficient in 1/K"""
+        return self._state.alpha_v
+
+    @property
+    def kappa_T(self) -> float:
+        """Isothermal compressibility in 1/MPa"""
+        return self._state.kappa_T
+
+    @property
+    def mu_JT(self) -> float:
+        """Joule-Thomson coefficient in K/MPa"""
+        return self._state.mu_JT
+
+    @property
+    def kappa(self) -> float:
+        """Isentropic exponent"""
+        return self._state.kappa
+
+    @property
+    def dpdT_v(self) -> float:
+        """Derivative of pressure with respect to temperature at constant specific volume, in MPa/K"""
+        return self._state.dpdT_v
+
     #############################################################
     ####################### Backwards ###########################
     #############################################################
-    def T_ph(self, p: float, h: float) -> float:
+    def T_ph(self, p: float, h: float, consistent: bool = False) -> float:
         """
         Backwards equations 22, 23 and 23 for calculating Temperature as a function of pressure and enthalpy.
         Args:
             p: Pressure (MPa).
             h: Enthalpy (kJ/kg).
+            consistent: Refine the result on the forward equations (see `solvers`).
         Returns:
             Temperature (K).
         """
@@ -1023,17 +1041,31 @@ class Region2(Region):
             T = sum(
                 entry['n'] * (p + 25) ** entry['I'] * (eta - 1.8) ** entry['J'] for entry in Region2.table22.values())
 
+        if consistent:
+            T = float(solvers.newton_point(2, p, T, [('h', h)]).T)
         if not State(p=p, T=T) in self:
             # TODO: Suggest a region,
             warnings.warn(f'State out of bounds. {T}', RuntimeWarning)
         return T
 
-    def T_ps(self, p: float, s: float) -> float:
+    @staticmethod
+    def _T_ph(p, h):
+        """Equations 22, 23 and 24 without the region check, so that they can be evaluated over arrays."""
+        p, h = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(h, dtype=float))
+        a = p <= 4
+        c = ~a & (p > Region2.b2bc(h=h))
+        b = ~a & ~c
+        return _piecewise((p, h / 2000), (a, b, c), (lambda p, eta: _poly(Region2.table20, p, eta - 2.1),
+                                                     lambda p, eta: _poly(Region2.table21, p - 2, eta - 2.6),
+                                                     lambda p, eta: _poly(Region2.table22, p + 25, eta - 1.8)))
+
+    def T_ps(self, p: float, s: float, consistent: bool = False) -> float:
         """
         Backwards equations 25, 26 and 27 for calculating Temperature as a function of pressure and entropy.
         Args:
             p: Pressure (MPa).
             s: Entropy (kJ/kg/K).
+            consistent: Refine the result on the forward equations (see `solvers`).
         Returns:
             Temperature (K).
         """
@@ -1048,11 +1080,24 @@ class Region2(Region):
             sigma = s / 2.9251
             T = sum(entry['n'] * p ** entry['I'] * (2 - sigma) ** entry['J'] for entry in Region2.table27.values())
 
+        if consistent:
+            T = float(solvers.newton_point(2, p, T, [('s', s)]).T)
         if not State(p=p, T=T) in self:
             # TODO: Suggest a region,
             warnings.warn(f'State out of bounds. {T}', RuntimeWarning)
         return T
 
+    @staticmethod
+    def _T_ps(p, s):
+        """Equations 25, 26 and 27 without the region check, so that they can be evaluated over arrays."""
+        p, s = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(s, dtype=float))
+        a = p <= 4
+        b = ~a & (s >= 5.85)
+        c = ~a & ~b
+        return _piecewise((p, s), (a, b, c), (lambda p, s: _poly(Region2.table25, p, s / 2 - 2),
+                                              lambda p, s: _poly(Region2.table26, p, 10 - s / 0.7853),
+                                              lambda p, s: _poly(Region2.table27, p, 2 - s / 2.9251)))
+
     def T_hs(self, h: float, s: float) -> float:
         """
         Backwards equation for calculating Temperature as a function of enthalpy and entropy.
@@ -1104,13 +1149,27 @@ class Region2(Region):
             warnings.warn(f'State out of bounds. {T}', RuntimeWarning)
         return p
 
-    def p_Th(self, T: float, h: float) -> float:
+    @staticmethod
+    def _p_hs(h, s):
+        """Equations of `p_hs` (subregions a, b and c) without the region check, so that they can be evaluated over arrays."""
+        h, s = np.broadcast_arrays(np.asarray(h, dtype=float), np.asarray(s, dtype=float))
+        c = s < 5.85
+        a = ~c & (h <= Region2.h_2ab(s))
+        b = ~c & ~a
+        return _piecewise((h, s), (a, b, c),
+                          (lambda h, s: 4 * _poly(Region2.table6_supp, h / 4200 - 0.5, s / 12 - 1.2) ** 4,
+                           lambda h, s: 100 * _poly(Region2.table7_supp, h / 4100 - 0.6, s / 7.9 - 1.01) ** 4,
+                           lambda h, s: 100 * _poly(Region2.table8_supp, h / 3500 - 0.7, s / 5.9 - 1.1) ** 4))
+
+    def p_Th(self, T: float, h: float, guess: Optional[float] = None) -> float:
         """
         Backwards equation for calculating pressure as a function of Temperature and enthalpy.
         Beware that this calculation might be time consuming as it is performing iteration (no backwards equation is provided by IAPWS).
         Args:
             T: Temperature (K).
             h: Enthalpy (kJ/kg).
+            guess: Initial pressure, e.g. the solution of the previous sample of a time series. The cold start is
+                used if it is not given or if the iteration from it fails.
         Returns:
             Pressure (MPa).
         """
@@ -1125,7 +1184,7 @@ class Region2(Region):
         else:
             p0 = 50.
         with warnings.catch_warnings():
-            p = newton(f, p0)  # initial p guess from region boundaries (see __contains__).
+            p = _newton(f, p0, guess)  # initial p guess from region boundaries (see __contains__).
 
         if not State(p=p, T=T) in self:
             # TODO: Suggest a region,
@@ -1164,3 +1223,7 @@ class Region2(Region):
         #     # TODO: Suggest a region,
         #     warnings.warn(f'State out of bounds. {T}', RuntimeWarning)
         # return p
+
+
+# solvers imports this module, so it is imported once the module is loaded, and only looked up when called.
+from . import solvers  # noqa: E402
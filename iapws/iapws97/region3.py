@@ -2,9 +2,9 @@ import warnings
 
 import numpy as np
 from typing import Optional, Dict
-from collections import defaultdict
 
-from ._utils import State, Region, R, _p_s, rho_c, T_c, s_c
+from ._utils import State, StateArray, Region, R, b23, _p_s, _p_s_eqn, _T_s_eqn, rho_c, T_c, s_c, _poly, _poly_ders, \
+    _helmholtz_properties, _set_ders, _piecewise
 
 
 class Region3(Region):
@@ -71,6 +71,9 @@ class Region3(Region):
                39: {'I': 10, 'J': 1, 'n': -0.16557679795037e-3},
                40: {'I': 11, 'J': 26, 'n': -0.44923899061815e-4}}
 
+    # Table 30 without the logarithmic term, i.e. the power series part of phi.
+    _table30_series = {key: entry for key, entry in table30.items() if entry['I'] is not None}
+
     table1_supp = {1: 0.201_464_004_206_875e4, 2: 0.374_696_550_136_983e1, 3: -0.219_921_901_054_187e-1,
                    4: 0.875_131_686_009_950e-4}
 
@@ -1336,9 +1339,13 @@ class Region3(Region):
     }
 
     def __init__(self, T: Optional[float] = None, rho: Optional[float] = None, h: Optional[float] = None,
-                 s: Optional[float] = None, p: Optional[float] = None, state: Optional[State] = None):
+                 s: Optional[float] = None, p: Optional[float] = None, state: Optional[State] = None,
+                 consistent: bool = False):
         """
         If all parameters are None (their default), then an empty instance is instanciated. This is to that a `State in Region3` check can be performed easily.
+
+        With `consistent`, the density of the backward equations for (p, T), (p, h) and (p, s) is refined on the
+        Helmholtz equation (see `solvers`), so that the state matches its inputs to machine precision.
         """
         params = [rho, T, h, s, p]
         if state is not None and all(param is None for param in params):
@@ -1364,69 +1371,72 @@ class Region3(Region):
             self._state.rho = rho
             self._state.v = 1 / self._state.rho
         elif p and h:
-            self._state.T = self.T_ph(p, h)
-
-            self._state.v = self.v_ph(p, h)
-            self._state.rho = 1 / self._state.v
+            if consistent:
+                self._state.T, self._state.rho = Region3._solve('ph', p, h)
+            else:
+                self._state.T = self.T_ph(p, h)
+                self._state.rho = 1 / self.v_ph(p, h)
+            self._state.v = 1 / self._state.rho
 
             self._state.p = p
             self._state.h = h
         elif p and s:
-            self._state.T = self.T_ps(p, s)
-
-            self._state.v = self.v_ps(p, s)
-            self._state.rho = 1 / self._state.v
+            if consistent:
+                self._state.T, self._state.rho = Region3._solve('ps', p, s)
+            else:
+                self._state.T = self.T_ps(p, s)
+                self._state.rho = 1 / self.v_ps(p, s)
+            self._state.v = 1 / self._state.rho
 
             self._state.p = p
             self._state.s = s
         elif T and h:
-            pass
+            self._state.T, self._state.rho = Region3._solve('Th', T, h)
+            self._state.v = 1 / self._state.rho
+            self._state.h = h
         elif T and s:
-            pass
+            self._state.T, self._state.rho = Region3._solve('Ts', T, s)
+            self._state.v = 1 / self._state.rho
+            self._state.s = s
         elif h and s:
-            pass
-            # self._state.p = self.p_hs(h, s)
-            # self._state.T = self.T_ph(p, h)
-            # self._state.s = s
-            #self._state.h = h
+            self._state.T, self._state.rho = Region3._solve('hs', h, s)
+            self._state.v = 1 / self._state.rho
+            self._state.h = h
+            self._state.s = s
         elif p and T:
             self._state.T = T
-            self._state.v = self.v_pT(p, T)
-            self._state.rho = 1 / self._state.v
+            if consistent:
+                self._state.p = p
+                _, self._state.rho = Region3._solve('pT', p, T)
+            else:
+                self._state.rho = 1 / self.v_pT(p, T)
+            self._state.v = 1 / self._state.rho
         else:
             raise ValueError(
                 'You should only pass one of the following combinations to determine a state in Reg3: (T, rho) (p, h), (p, s), (h, s), (T, p), (T, h) or (T, s).')
 
         if calc:
-            delta = rho / rho_c
-            tau = T_c / T
-
-            if self._state not in self:
-                # Find region number and return it.
-                pass
-
-            phi = Region3.base_eqn(T=T, rho=rho)
-            phid = Region3.base_der_delta_const_tau(T=T, rho=rho)
-            phit = Region3.base_der_tau_const_delta(T=T, rho=rho)
-            phidd = Region3.base_der2_deltadelta_const_tau_const_tau(T=T, rho=rho)
-            phitt = Region3.base_der2_tautau_const_delta(T=T, rho=rho)
-            phidt = Region3.base_der2_deltatau(T=T, rho=rho)
-
-            self._state.ders = defaultdict(float,
-                                           phi=phi,
-                                           phi_pi=phid, phi_tau=phit,
-                                           phi_pipi=phidd, phi_tautau=phitt, phi_pitau=phidt)
-
-            self._state.p = delta * phid * self._state.rho
-            self._state.u = tau * phit * self._state.rho * self._state.T
-            self._state.s = self._state.s if self._state.s is not None else R * (tau * phit - phi)
-            self._state.h = self._state.h if self._state.h is not None else R * T * (tau * phit + delta * phid)
-            self._state.cp = R * (-tau ** 2 * phitt - (delta * phid - delta * tau * phidt) ** 2 / (2 * delta * phid + delta**2 * phidd))
-            self._state.cv = R * -tau ** 2 * phitt
-            self._state.w = np.sqrt(1000 * R * T * (2 * delta * phid + delta**2 * phidd - (delta * phid - delta * tau * phidt) ** 2 / (tau**2 * phitt)))  # 1000 is a conversion factor: sqrt(kJ/kg) = sqrt(1000 m/s) -> sqrt(1000) m/s
+            self._state = Region._from_kernel(Region3.evaluate(self._state.T, self._state.rho), self._state)
         else:
             self._state = State()
 
+    @staticmethod
+    def _solve(pair: str, v1: float, v2: float) -> tuple:
+        """
+        (T, rho) of an input pair from `solvers`: the backward equations refined on the Helmholtz equation for (p, T),
+        (p, h) and (p, s), and the density (and temperature) iterations for (T, h), (T, s) and (h, s).
+        Raises:
+            ValueError if the iteration does not converge to a Region3 state.
+        """
+        if pair in ('ph', 'ps'):
+            result = {'ph': solvers.solve_ph, 'ps': solvers.solve_ps}[pair](3, v1, v2)
+        else:
+            result = {'pT': solvers.solve_pT, 'Th': solvers.solve_Th, 'Ts': solvers.solve_Ts,
+                      'hs': solvers.solve_hs}[pair](v1, v2)
+        if not result.converged:
+            raise ValueError(f'State out of Region3 or in the two-phase region. {pair}=({v1}, {v2}).')
+        return float(result.state.T), float(result.state.rho)
+
     @staticmethod
     def p_b23(T: float) -> float:
         """
@@ -1531,6 +1541,31 @@ class Region3(Region):
         """Alias for `self.base_eqn`"""
         return Region3.base_eqn(T, rho) * R * T
 
+    @staticmethod
+    def evaluate(T, rho, out: Optional[State] = None) -> StateArray:
+        """
+        Fused kernel: evaluates phi, its derivatives and all properties in a single pass over table 30.
+        Works on scalars and on numpy arrays alike. No range check is performed.
+        Args:
+            T: Temperature (K).
+            rho: Density (kg/m^3).
+            out: State to overwrite in place, its `ders` included, when T and rho are floats (see `IAPWS97.update`).
+        Returns:
+            The properties as a StateArray (`out` if given), with the reduced variables and the derivatives in `ders`.
+        """
+        if out is None:
+            T, rho = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(rho, dtype=float))
+        delta = rho / rho_c
+        tau = T_c / T
+
+        phi, phid, phit, phidd, phitt, phidt = _poly_ders(Region3._table30_series, delta, tau)
+        n1 = Region3.table30[1]['n']
+        phi, phid, phidd = phi + n1 * np.log(delta), phid + n1 / delta, phidd - n1 / delta ** 2
+
+        state = _helmholtz_properties(T, rho, delta, tau, phi, phid, phit, phidd, phitt, phidt, out=out)
+        return _set_ders(state, dict(delta=delta, tau=tau, phi=phi, phi_delta=phid, phi_tau=phit,
+                                     phi_deltadelta=phidd, phi_tautau=phitt, phi_deltatau=phidt))
+
     #############################################################
     ################## FIRST ORDER DERIVATIVES ##################
     #############################################################
@@ -1707,6 +1742,31 @@ class Region3(Region):
         """Speed of sound in m/s"""
         return self._state.w
 
+    @property
+    def alpha_v(self) -> float:
+        """Isobaric cubic expansion coefficient in 1/K"""
+        return self._state.alpha_v
+
+    @property
+    def kappa_T(self) -> float:
+        """Isothermal compressibility in 1/MPa"""
+        return self._state.kappa_T
+
+    @property
+    def mu_JT(self) -> float:
+        """Joule-Thomson coefficient in K/MPa"""
+        return self._state.mu_JT
+
+    @property
+    def kappa(self) -> float:
+        """Isentropic exponent"""
+        return self._state.kappa
+
+    @property
+    def dpdT_v(self) -> float:
+        """Derivative of pressure with respect to temperature at constant specific volume, in MPa/K"""
+        return self._state.dpdT_v
+
     #############################################################
     ####################### v(p,T) aux ##########################
     #############################################################
@@ -1732,15 +1792,92 @@ class Region3(Region):
         else:
             raise ValueError(f'Specified subregion is invalid. {xy} given and you can only chose from: {list({**Region3.table1_supp_ref3, **Region3.table9_supp_ref3}.keys())}')
 
-        if xy in 'cd gh ij jk mn qu rx'.split(' '):
-            return sum(entry['n'] * p**entry['I'] for entry in Region3.table1_supp_ref3[xy].values())
-        elif xy in 'ab op'.split(' '):
-            return sum(entry['n'] * np.log(p)**entry['I'] for entry in Region3.table1_supp_ref3[xy].values())
+        table = {**Region3.table1_supp_ref3, **Region3.table9_supp_ref3}.get(xy)
+        if xy in 'cd gh ij jk mn qu rx uv'.split(' '):
+            return sum(entry['n'] * p**entry['I'] for entry in table.values())
+        elif xy in 'ab op wx'.split(' '):
+            return sum(entry['n'] * np.log(p)**entry['I'] for entry in table.values())
         elif xy == 'ef':
             return 3.727888004 * (p - 22.064) + 647.096
 
     @staticmethod
-    def subregion_for_v_pt(p: float, T: float) -> str:
+    def _bands(p, T, near_critical, T_sat, t) -> list:
+        """
+        Bands of tables 2 and 10 of [3], as (condition, boundaries, subregions) triples in the order in which they are
+        checked: a point lies in the subregion of the first boundary of its band that its temperature does not exceed,
+        or in the last subregion. Works on scalars and on numpy arrays alike.
+        Args:
+            p: Pressure (MPa).
+            T: Temperature (K).
+            near_critical: Whether the points lie between the qu and rx boundaries near the critical point.
+            T_sat: Saturation temperature, NaN above the critical pressure.
+            t: Function of a boundary name giving the temperature of the boundary (see `_T_xx`).
+        """
+        return [(p > 40, ('ab',), 'ab'),
+                (p > 25, ('cd', 'ab', 'ef'), 'cdef'),
+                (p > 23.5, ('cd', 'gh', 'ef', 'ij', 'jk'), 'cghijk'),
+                (p > 23, ('cd', 'gh', 'ef', 'ij', 'jk'), 'clhijk'),
+                (p > 22.5, ('cd', 'gh', 'mn', 'ef', 'op', 'ij', 'jk'), 'clmnopjk'),
+                (near_critical & (p > 22.11), ('uv', 'ef', 'wx'), 'uvwx'),
+                (near_critical & (p > 22.064), ('uv', 'ef', 'wx'), 'uyzx'),
+                (near_critical & (T <= T_sat) & ((p <= 21.93161551) | (T <= t('uv'))), (), 'u'),
+                (near_critical & (T <= T_sat), (), 'y'),
+                (near_critical & (p <= 21.90096265), (), 'x'),
+                (near_critical, ('wx',), 'zx'),
+                (p > _p_s_eqn(643.15), ('cd', 'qu', 'jk'), 'cqrk'),
+                (p > 20.5, ('cd', 'sat', 'jk'), 'csrk'),
+                (p > 1.900_881_189_173_929e1, ('cd', 'sat'), 'cst'),
+                (True, ('sat',), 'ct')]
+
+    @staticmethod
+    def _subregions_v_pT(p, T) -> np.ndarray:
+        """
+        Vectorized subregion selection of tables 2 and 10 of [3].
+        Args:
+            p: Pressure (MPa). Scalar or array.
+            T: Temperature (K). Scalar or array.
+        Returns:
+            Array of subregion codes, where '' marks points that are not in Region3.
+        """
+        p, T = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(T, dtype=float))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = {xy: Region3._T_xx(p, xy) for xy in ('ab', 'cd', 'ef', 'gh', 'ij', 'jk', 'mn', 'op', 'qu', 'rx', 'uv', 'wx')}
+            T_sat = np.where(p <= 22.064, _T_s_eqn(np.minimum(p, 22.064)), np.nan)
+            T_23 = b23(p=p)
+        valid = (_p_s_eqn(623.15) < p) & (p <= 100) & (623.15 <= T) & (T <= T_23)
+        near_critical = valid & (_p_s_eqn(643.15) < p) & (p <= 22.5) & (t['qu'] < T) & (T <= t['rx'])
+        t['sat'] = T_sat
+
+        conditions, choices = [], []
+        for band, bounds, names in Region3._bands(p, T, near_critical, T_sat, t.get):
+            for bound, name in zip(bounds + (None,), names):
+                conditions.append(valid & band & (T <= t[bound]) if bound else valid & band)
+                choices.append(name)
+        return np.select(conditions, choices, default='')
+
+    @staticmethod
+    def _subregion_v_pT(p: float, T: float) -> str:
+        """
+        Same as `_subregions_v_pT` for a single point, with plain float comparisons, evaluating only the boundaries
+        that its band checks.
+        """
+        if not (_p_s_eqn(623.15) < p <= 100 and 623.15 <= T <= b23(p=p)):
+            return ''
+        near_critical = _p_s_eqn(643.15) < p <= 22.5 and Region3._T_xx(p, 'qu') < T <= Region3._T_xx(p, 'rx')
+        T_sat = float(_T_s_eqn(p)) if p <= 22.064 else np.nan
+
+        def t(xy: str) -> float:
+            return T_sat if xy == 'sat' else Region3._T_xx(p, xy)
+
+        for band, bounds, names in Region3._bands(p, T, near_critical, T_sat, t):
+            if band:
+                for bound, name in zip(bounds, names):
+                    if T <= t(bound):
+                        return name
+                return names[-1]
+
+    @staticmethod
+    def subregion_for_v_pt(p: float, T: float) -> Optional[str]:
         """
         Returns a subregion code for a given pressure and Temperature.
         Args:
@@ -1748,237 +1885,68 @@ class Region3(Region):
             T: Temperature (K).
 
         Returns:
-            Subregion code.
+            Subregion code, or None if (p, T) is not in Region3.
         """
-        # Near critical point to be checked first so that we use best approximation:
-        if 22.11 < p <= 22.5:
-            t_qu = Region3._T_xx(p, 'qu')
-            t_uv = Region3._T_xx(p, 'uv')
-            t_ef = Region3._T_xx(p, 'ef')
-            t_wx = Region3._T_xx(p, 'wx')
-            t_rx = Region3._T_xx(p, 'rx')
-
-            if t_qu < T <= t_uv:
-                return 'u'
-            elif t_uv < T <= t_ef:
-                return 'v'
-            elif t_ef < T <= t_wx:
-                return 'w'
-            elif t_wx < T <= t_rx:
-                return 'x'
-        elif 22.064 < T <= 22.11:
-            t_qu = Region3._T_xx(p, 'qu')
-            t_uv = Region3._T_xx(p, 'uv')
-            t_ef = Region3._T_xx(p, 'ef')
-            t_wx = Region3._T_xx(p, 'wx')
-            t_rx = Region3._T_xx(p, 'rx')
-
-            if t_qu < T <= t_uv:
-                return 'u'
-            elif t_uv < T <= t_ef:
-                return 'y'
-            elif t_ef < T <= t_wx:
-                return 'w'
-            elif t_wx < T <= t_rx:
-                return 'x'
-
-        # T_sat and p_sat
-
-
-
-
-
-        elif 40 < p <= 100:
-            if T <= Region3._T_xx(p, 'ab'):
-                return 'a'
-            else:
-                return 'b'
-        elif 25 < p <= 40:
-            t_cd = Region3._T_xx(p, 'cd')
-            t_ab = Region3._T_xx(p, 'ab')
-            t_ef = Region3._T_xx(p, 'ef')
-            if T <= t_cd:
-                return 'c'
-            elif t_cd < T <= t_ab:
-                return 'd'
-            elif t_ab < T <= t_ef:
-                return 'e'
-            else:
-                return 'f'
-        elif 23.5 < p <= 25:
-            t_cd = Region3._T_xx(p, 'cd')
-            t_gh = Region3._T_xx(p, 'gh')
-            t_ef = Region3._T_xx(p, 'ef')
-            t_ij = Region3._T_xx(p, 'ij')
-            t_jk = Region3._T_xx(p, 'jk')
-            if T <= t_cd:
-                return 'c'
-            elif t_cd < T <= t_gh:
-                return 'g'
-            elif t_gh < T <= t_ef:
-                return 'h'
-            elif t_ef < T <= t_ij:
-                return 'i'
-            elif t_ij < T <= t_jk:
-                return 'j'
-            else:
-                return 'k'
-        elif 23 < p <= 23.5:
-            t_cd = Region3._T_xx(p, 'cd')
-            t_gh = Region3._T_xx(p, 'gh')
-            t_ef = Region3._T_xx(p, 'ef')
-            t_ij = Region3._T_xx(p, 'ij')
-            t_jk = Region3._T_xx(p, 'jk')
-            if T <= t_cd:
-                return 'c'
-            elif t_cd < T <= t_gh:
-                return 'l'
-            elif t_gh < T <= t_ef:
-                return 'h'
-            elif t_ef < T <= t_ij:
-                return 'i'
-            elif t_ij < T <= t_jk:
-                return 'j'
-            else:
-                return 'k'
-        elif 22.5 < p <= 23:
-            t_cd = Region3._T_xx(p, 'cd')
-            t_gh = Region3._T_xx(p, 'gh')
-            t_mn = Region3._T_xx(p, 'mn')
-            t_ef = Region3._T_xx(p, 'ef')
-            t_op = Region3._T_xx(p, 'op')
-            t_ij = Region3._T_xx(p, 'ij')
-            t_jk = Region3._T_xx(p, 'jk')
-            if T <= t_cd:
-                return 'c'
-            elif t_cd < T <= t_gh:
-                return 'l'
-            elif t_gh < T <= t_mn:
-                return 'm'
-            elif t_mn < T <= t_ef:
-                return 'n'
-            elif t_ef < T <= t_op:
-                return 'o'
-            elif t_op < T <= t_ij:
-                return 'p'
-            elif t_ij < T <= t_jk:
-                return 'j'
-            else:
-                return 'k'
-        elif Region3.p_b23(643.15) < p <= 22.5:
-            t_cd = Region3._T_xx(p, 'cd')
-            t_qu = Region3._T_xx(p, 'qu')
-            t_rx = Region3._T_xx(p, 'rx')
-            t_jk = Region3._T_xx(p, 'jk')
-            if T <= t_cd:
-                return 'c'
-            elif t_cd < T <= t_qu:
-                return 'q'
-            elif t_rx < T <= t_jk:
-                return 'r'
-            else:
-                return 'k'
-        elif 20.5 < p <= Region3.p_b23(643.15):
-            t_cd = Region3._T_xx(p, 'cd')
-            t_sat = Region3.T_b23(p)
-            t_jk = Region3._T_xx(p, 'jk')
-            if T <= t_cd:
-                return 'c'
-            elif t_cd < T <= t_sat:
-                return 's'
-            elif t_sat < T <= t_jk:
-                return 'r'
-            else:
-                return 'k'
-        elif 1.900_881_189_173_929e1 < p <= 20.5:
-            t_cd = Region3._T_xx(p, 'cd')
-            t_sat = Region3.T_b23(p)
-            if T <= t_cd:
-                return 'c'
-            elif t_cd < T <= t_sat:
-                return 's'
-            else:
-                return 't'
-        elif Region3.p_b23(623.15) < p <= 1.900_881_189_173_929e1:
-            t_sat = Region3.T_b23(p)
-            if T <= t_sat:
-                return 'c'
+        return Region3._subregion_v_pT(float(p), float(T)) or None
+
+    @staticmethod
+    def _v_pT(p, T) -> np.ndarray:
+        """
+        Vectorized backward equations v(p, T) of [3]. Points are grouped by subregion and every group is evaluated with
+        the equation of its subregion.
+        Args:
+            p: Pressure (MPa). Scalar or array.
+            T: Temperature (K). Scalar or array.
+        Returns:
+            Specific volume (m^3/kg), as a float if p and T are scalars. NaN for points that are not in Region3.
+        """
+        if np.ndim(p) == 0 and np.ndim(T) == 0:
+            p, T = float(p), float(T)
+            reg = Region3._subregion_v_pT(p, T)
+            if not reg:
+                return np.nan
+            v_aster, p_aster, t_aster, a, b, c, d, e = Region3.table4_and_12_supp_ref3[reg]
+            # numpy floats, which give NaN as on arrays where Python floats would give complex roots.
+            _pi, theta = np.float64(p / p_aster), np.float64(T / t_aster)
+            if reg != 'n':
+                return float(v_aster * _poly(Region3.table_appendix_ref3[reg], (_pi - a) ** c, (theta - b) ** d) ** e)
+            return float(v_aster * np.exp(_poly(Region3.table_appendix_ref3[reg], _pi - a, theta - b)))
+        p, T = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(T, dtype=float))
+        subregions = Region3._subregions_v_pT(p, T)
+        v = np.full(p.shape, np.nan)
+        for reg in np.unique(subregions[subregions != '']):
+            mask = subregions == reg
+            v_aster, p_aster, t_aster, a, b, c, d, e = Region3.table4_and_12_supp_ref3[reg]
+            _pi, theta = p[mask] / p_aster, T[mask] / t_aster
+            if reg != 'n':
+                v[mask] = v_aster * _poly(Region3.table_appendix_ref3[reg], (_pi - a) ** c, (theta - b) ** d) ** e
             else:
-                return 't'
-            # elif t_qu < T <= t_rx:
-            #     # Table 10
-            #     tef = _tef_p(p)
-            #     twx = _twx_p(p)
-            #     tuv = Region3._T_xx(p, 'uv')
-            #     if 22.11 < p <= 22.5:
-            #         if T <= tuv:
-            #             return 'u'
-            #         elif tuv <= T <= tef:
-            #             return 'v'
-            #         elif tef <= T <= twx:
-            #             return 'w'
-            #         else:
-            #             return 'x'
-            #     elif 22.064 < p <= 22.11:
-            #         if T <= tuv:
-            #             return 'u'
-            #         elif tuv <= T <= tef:
-            #             return 'y'
-            #         elif tef <= T <= twx:
-            #             return 'z'
-            #         else:
-            #             return 'x'
-            #     elif T > _TSat_p(p):
-            #         if _pSat_T(643.15) < p <= 21.90096265:
-            #             return 'x'
-            #         elif 21.90096265 < p <= 22.064:
-            #             if T <= twx:
-            #                 return 'z'
-            #             else:
-            #                 return 'x'
-            #     elif T <= _TSat_p(p):
-            #         if _pSat_T(643.15) < p <= 21.93161551:
-            #             return 'u'
-            #         elif 21.93161551 < p <= 22.064:
-            #             if T <= tuv:
-            #                 return 'u'
-            #             else:
-            #                 return 'y'
+                v[mask] = v_aster * np.exp(_poly(Region3.table_appendix_ref3[reg], _pi - a, theta - b))
+        return v
+
     #############################################################
     ####################### Backwards ###########################
     #############################################################
     def v_pT(self, p: float, T: float) -> float:
         """
-        Backwards equations 22, 23 and 23 for calculating Temperature as a function of pressure and enthalpy.
+        Backwards equations for calculating Specific Volume as a function of pressure and temperature.
         Args:
             p: Pressure (MPa).
-            h: Enthalpy (kJ/kg).
+            T: Temperature (K).
         Returns:
-            Temperature (K).
+            Specific Volume (m^3/kg).
         References:
             [3]
         """
-        reg = Region3.subregion_for_v_pt(p, T)
-        v_aster, p_aster, t_aster, a, b, c, d, e = Region3.table4_and_12_supp_ref3[reg]
-        eqn_coefs = Region3.table_appendix_ref3[reg]
-
-        _pi = p / p_aster
-        theta = T / t_aster
-
-        if reg != 'n':
-            return v_aster * sum(entry['n'] * (_pi - a)**(c * entry['I']) * (theta - b)**(d * entry['J']) for entry in eqn_coefs.values()) ** e
-        else:
-            return v_aster * np.exp(sum(entry['n'] * (_pi - a)**entry['I'] * (theta - b)**entry['J'] for entry in eqn_coefs.values()))
-
+        return float(Region3._v_pT(p, T))
 
-
-
-    def v_ph(self, p: float, h: float) -> float:
+    def v_ph(self, p: float, h: float, consistent: bool = False) -> float:
         """
         Backwards equations 2 and 3 for calculating Specific Volume as a function of pressure and enthalpy (supplementary release 2014).
         Args:
             p: Pressure (MPa).
             h: Enthalpy (kJ/kg).
+            consistent: Refine the result on the forward equations (see `solvers`).
         Returns:
             Specific Volume (m^3/kg).
         """
@@ -1994,6 +1962,10 @@ class Region3(Region):
             v = 0.0088 * sum(entry['n'] * (_pi + 0.0661) ** entry['I'] * (eta - 0.72) ** entry['J'] for entry in
                              Region3.table7_supp.values())
 
+        if consistent:
+            # Same starting point as `T_ph`, so that both return the same state.
+            v = float(solvers.newton_point(3, 1 / Region3._v_ph(p, h), Region3._T_ph(p, h), [('p', p), ('h', h)],
+                                           unknowns='ab').v)
         return v
         # TODO: Check if state is in region:
         # if State(p=p, T=T) in self:
@@ -2012,12 +1984,31 @@ class Region3(Region):
         """
         return 1 / self.v_ph(p, h)
 
-    def T_ph(self, p: float, h: float) -> float:
+    @staticmethod
+    def _T_ph(p, h):
+        """Equations 2 and 3 of [4] for T(p, h) without the region check, so that they can be evaluated over arrays."""
+        p, h = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(h, dtype=float))
+        a = h <= Region3.h_3ab(p)
+        return _piecewise((p, h), (a, ~a),
+                          (lambda p, h: 760 * _poly(Region3.table3_supp, p / 100 + 0.24, h / 2300 - 0.615),
+                           lambda p, h: 860 * _poly(Region3.table4_supp, p / 100 + 0.298, h / 2800 - 0.72)))
+
+    @staticmethod
+    def _v_ph(p, h):
+        """Equations 4 and 5 of [4] for v(p, h) without the region check, so that they can be evaluated over arrays."""
+        p, h = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(h, dtype=float))
+        a = h <= Region3.h_3ab(p)
+        return _piecewise((p, h), (a, ~a),
+                          (lambda p, h: 0.0028 * _poly(Region3.table6_supp, p / 100 + 0.128, h / 2100 - 0.727),
+                           lambda p, h: 0.0088 * _poly(Region3.table7_supp, p / 100 + 0.0661, h / 2800 - 0.72)))
+
+    def T_ph(self, p: float, h: float, consistent: bool = False) -> float:
         """
         Backwards equations 2 and 3 for calculating Temperature as a function of pressure and enthalpy (supplementary release 2014).
         Args:
             p: Pressure (MPa).
             h: Enthalpy (kJ/kg).
+            consistent: Refine the result on the forward equations (see `solvers`).
         Returns:
             Temperature (K).
         """
@@ -2033,17 +2024,22 @@ class Region3(Region):
             T = 860 * sum(entry['n'] * (_pi + 0.298) ** entry['I'] * (eta - 0.72) ** entry['J'] for entry in
                           Region3.table4_supp.values())
 
+        if consistent:
+            # Same starting point as `v_ph`, so that both return the same state.
+            T = float(solvers.newton_point(3, 1 / Region3._v_ph(p, h), Region3._T_ph(p, h), [('p', p), ('h', h)],
+                                           unknowns='ab').T)
         if State(p=p, T=T) in self:
             return T
         else:
             raise ValueError(f'State out of bounds. {T}')
 
-    def v_ps(self, p: float, s: float) -> float:
+    def v_ps(self, p: float, s: float, consistent: bool = False) -> float:
         """
         Backwards equations 2 and 3 for calculating Specific Volume as a function of pressure and Entropy (supplementary release 2014).
         Args:
             p: Pressure (MPa).
             s: Entropy (kJ/kg/K).
+            consistent: Refine the result on the forward equations (see `solvers`).
         Returns:
             Specific Volume (m^3/kg).
         """
@@ -2058,6 +2054,10 @@ class Region3(Region):
             sigma = s / 5.3
             v = 0.0088 * sum(entry['n'] * (_pi + 0.298)** entry['I'] * (sigma - 0.816) ** entry['J'] for entry in
                              Region3.table14_supp.values())
+        if consistent:
+            # Same starting point as `T_ps`, so that both return the same state.
+            v = float(solvers.newton_point(3, 1 / Region3._v_ps(p, s), Region3._T_ps(p, s), [('p', p), ('s', s)],
+                                           unknowns='ab').v)
         return v
         # TODO: Check if state is in region:
         # if State(p=p, T=T) in self:
@@ -2065,6 +2065,24 @@ class Region3(Region):
         # else:
         #    raise ValueError(f'State out of bounds. {T}')
 
+    @staticmethod
+    def _T_ps(p, s):
+        """Equations 6 and 7 of [4] for T(p, s) without the region check, so that they can be evaluated over arrays."""
+        p, s = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(s, dtype=float))
+        a = s < s_c
+        return _piecewise((p, s), (a, ~a),
+                          (lambda p, s: 760 * _poly(Region3.table10_supp, p / 100 + 0.240, s / 4.4 - 0.703),
+                           lambda p, s: 860 * _poly(Region3.table11_supp, p / 100 + 0.760, s / 5.3 - 0.818)))
+
+    @staticmethod
+    def _v_ps(p, s):
+        """Equations 8 and 9 of [4] for v(p, s) without the region check, so that they can be evaluated over arrays."""
+        p, s = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(s, dtype=float))
+        a = s < s_c
+        return _piecewise((p, s), (a, ~a),
+                          (lambda p, s: 0.0028 * _poly(Region3.table13_supp, p / 100 + 0.187, s / 4.4 - 0.755),
+                           lambda p, s: 0.0088 * _poly(Region3.table14_supp, p / 100 + 0.298, s / 5.3 - 0.816)))
+
     def rho_ps(self, p: float, s: float) -> float:
         """
         Backwards equations 2 and 3 for calculating density as a function of pressure and entropy (supplementary release 2014).
@@ -2076,12 +2094,13 @@ class Region3(Region):
         """
         return 1 / self.v_ps(p, s)
 
-    def T_ps(self, p: float, s: float) -> float:
+    def T_ps(self, p: float, s: float, consistent: bool = False) -> float:
         """
         Backwards equations 6 and 6 for calculating Temperature as a function of pressure and entropy.
         Args:
             p: Pressure (MPa).
             s: Entropy (kJ/kg/K).
+            consistent: Refine the result on the forward equations (see `solvers`).
         Returns:
             Temperature (K).
         """
@@ -2095,6 +2114,10 @@ class Region3(Region):
             sigma = s / 5.3
             T = 860 * sum(entry['n'] * (_pi + 0.760)**entry['I'] * (sigma - 0.818)**entry['J'] for entry in Region3.table11_supp.values())
 
+        if consistent:
+            # Same starting point as `v_ps`, so that both return the same state.
+            T = float(solvers.newton_point(3, 1 / Region3._v_ps(p, s), Region3._T_ps(p, s), [('p', p), ('s', s)],
+                                           unknowns='ab').T)
         if State(p=p, T=T) in self:
             return T
         else:
@@ -2127,6 +2150,15 @@ class Region3(Region):
             warnings.warn(f'State out of bounds. {T}', RuntimeWarning)
         return p
 
+    @staticmethod
+    def _p_hs(h, s):
+        """Equations 1 and 2 of [2] for p(h, s) without the region check, so that they can be evaluated over arrays."""
+        h, s = np.broadcast_arrays(np.asarray(h, dtype=float), np.asarray(s, dtype=float))
+        a = s <= s_c
+        return _piecewise((h, s), (a, ~a),
+                          (lambda h, s: 99 * _poly(Region3.table3_supp_ref2, h / 2300 - 1.01, s / 4.4 - 0.750),
+                           lambda h, s: 16.6 / _poly(Region3.table4_supp_ref2, h / 2800 - 0.681, s / 5.3 - 0.792)))
+
     def T_hs(self, h: float, s: float) -> float:
         """
         Backwards equation for calculating Temperature as a function of enthalpy and entropy.
@@ -2154,3 +2186,7 @@ class Region3(Region):
         """
         p = self.p_hs(h, s)
         return self.v_ps(p, s)
+
+
+# solvers imports this module, so it is imported once the module is loaded, and only looked up when called.
+from . import solvers  # noqa: E402
@@ -1,11 +1,10 @@
 import warnings
 
 import numpy as np
-from typing import Optional
-from scipy.optimize import newton
+from typing import Optional, Tuple
 import math
 
-from ._utils import State, Region, R, s_c
+from ._utils import State, StateArray, Region, R, s_c, _newton, _p_s_eqn, _T_s_eqn
 from iapws.iapws97.region1 import Region1
 from iapws.iapws97.region2 import Region2
 from iapws.iapws97.region3 import Region3
@@ -190,6 +189,7 @@ class Region4(Region):
     def base_eqn(T: Optional[float] = None, h: Optional[float] = None, s: Optional[float] = None) -> float:
         """
         Equation for saturation pressure as a function of temperature (equation 30), enthalpy (eqn.10 [4]), entropy (eqn 11 [4]) or enthalpy and entropy (eqn 9 [2]).
+        For arrays of temperatures, see `saturation.p_sat`.
         Args:
             T: Temperature (K).
             h: Enthalpy (kJ/kg).
@@ -202,12 +202,7 @@ class Region4(Region):
         if T is not None and h is None and s is None:
             if not 273.15 <= T <= 647.096:
                 warnings.warn(f'T must be in the range [273.15, 647.096]. {T} given.', RuntimeWarning)
-            z = T + Region4.table34[9] / (T - Region4.table34[10])
-            A = z ** 2 + Region4.table34[1] * z + Region4.table34[2]
-            B = Region4.table34[3] * z ** 2 + Region4.table34[4] * z + Region4.table34[5]
-            C = Region4.table34[6] * z ** 2 + Region4.table34[7] * z + Region4.table34[8]
-            p = 2 * C / (-B + np.sqrt(B ** 2 - 4 * A * C))
-            return p ** 4
+            return _p_s_eqn(T)
         elif h is not None and T is None and s is None:
             if hp <= h <= hpp:
                 eta = h / 2600
@@ -295,6 +290,7 @@ class Region4(Region):
     def T_sat(p: Optional[float] = None, h: Optional[float] = None, s: Optional[float] = None) -> float:
         """
         Backwards equation for calculating Saturation Temperature as a function of pressure or enthalpy and entropy.
+        For arrays of pressures with a status per point instead of exceptions, see `saturation.T_sat`.
         Args:
             p: Pressure (MPa).
             h: Enthalpy (kJ/kg).
@@ -305,12 +301,7 @@ class Region4(Region):
             [1], [2].
         """
         if p is not None and (h is None and s is None):
-            beta = p**(1/4)
-            g = Region4.table34[2] * beta**2 + Region4.table34[5] * beta + Region4.table34[8]
-            f = Region4.table34[1] * beta**2 + Region4.table34[4] * beta + Region4.table34[7]
-            e = beta ** 2 + Region4.table34[3] * beta + Region4.table34[6]
-            d = 2 * g / (-f - np.sqrt(f**2 - 4*e*g))
-            ts = 1/2 * (Region4.table34[10] + d - np.sqrt( (Region4.table34[10] + d)**2 - 4*(Region4.table34[9] + Region4.table34[10]*d) ))
+            ts = _T_s_eqn(p)
         elif (h is not None and s is not None) and p is None:
             # Eqn 9 [2].
             if s >= spp:
@@ -321,13 +312,55 @@ class Region4(Region):
                 raise NotImplementedError(f's should be >= {spp}. {s} given.')
         return ts
 
-    def h_sat(self, x: int = 0, p: Optional[float] = None, T: Optional[float] = None) -> float:
+    @staticmethod
+    def _saturated(p) -> Tuple[StateArray, StateArray]:
+        """
+        Saturated liquid and vapour states at the given pressures, so that they can be evaluated over arrays.
+
+        Up to p_s(623.15 K), they are the Region1 and Region2 states at the saturation temperature. Above it, they are
+        Region3 states whose densities come from the backward equations v(p, T) of [3] at the saturation temperature,
+        which selects the subregions of the liquid side (c, s, u and y), and just above it, which selects the ones of
+        the vapour side (t, r, x and z).
+        Args:
+            p: Pressure (MPa), up to the critical pressure. 1-D array, or a scalar.
+        Returns:
+            The (liquid, vapour) StateArrays, or States of floats for a scalar pressure.
+        """
+        if np.ndim(p) == 0:
+            p = float(p)
+            T = float(_T_s_eqn(p))
+            if p <= _p_s_eqn(623.15):
+                return Region1.evaluate(T, p, out=State()), Region2.evaluate(T, p, out=State())
+            T_vapour = float(np.nextafter(T, np.inf))
+            liquid = Region3.evaluate(T, 1 / Region3._v_pT(p, T), out=State())
+            vapour = Region3.evaluate(T_vapour, 1 / Region3._v_pT(p, T_vapour), out=State())
+            liquid.p, vapour.p = p, p
+            return liquid, vapour
+        p = np.asarray(p, dtype=float)
+        T = _T_s_eqn(p)
+        liquid, vapour = StateArray.empty(p.size), StateArray.empty(p.size)
+
+        low = p <= _p_s_eqn(623.15)
+        liquid[low] = Region1.evaluate(T[low], p[low])
+        vapour[low] = Region2.evaluate(T[low], p[low])
+
+        high = ~low
+        T_high, T_vapour = T[high], np.nextafter(T[high], np.inf)
+        liquid[high] = Region3.evaluate(T_high, 1 / Region3._v_pT(p[high], T_high))
+        vapour[high] = Region3.evaluate(T_vapour, 1 / Region3._v_pT(p[high], T_vapour))
+        liquid.p[:], vapour.p[:] = p, p
+        return liquid, vapour
+
+    def h_sat(self, x: int = 0, p: Optional[float] = None, T: Optional[float] = None,
+              guess: Optional[float] = None) -> float:
         """
         Calculate the saturation enthalpy from either pressure or Temperature.
         Args:
             x: Specify if the saturation enthalpy of 'liquid' (x=0) or 'steam' (x=1) should be calculated.
             p: Pressure (MPa).
             T: Temperature (K).
+            guess: Initial enthalpy, e.g. the solution of the previous sample of a time series. The cold start is
+                used if it is not given or if the iteration from it fails.
         Returns:
             Enthalpy of saturation in kJ/kg.
         References:
@@ -351,15 +384,18 @@ class Region4(Region):
             h0 = (2.084e3 + hpp) / 2
         else:
             warnings.warn('Quality (x) should only be 0 or 1. Otherwise, water is not saturated.', RuntimeWarning)
-        return newton(f, h0)
+        return _newton(f, h0, guess)
 
-    def s_sat(self, x: int = 0, p: Optional[float] = None, T: Optional[float] = None) -> float:
+    def s_sat(self, x: int = 0, p: Optional[float] = None, T: Optional[float] = None,
+              guess: Optional[float] = None) -> float:
         """
         Calculate the saturation entropy from either pressure or Temperature.
         Args:
             x: Specify if the saturation enthalpy of 'liquid' (x=0) or 'steam' (x=1) should be calculated.
             p: Pressure (MPa).
             T: Temperature (K).
+            guess: Initial entropy, e.g. the solution of the previous sample of a time series. The cold start is
+                used if it is not given or if the iteration from it fails.
         Returns:
             Entropy of saturation in kJ/kg/K.
         References:
@@ -382,4 +418,4 @@ class Region4(Region):
             s0 = (s_c + spp) / 2
         else:
             warnings.warn('Quality (x) should only be 0 or 1. Otherwise, water is not saturated.', RuntimeWarning)
-        return newton(f, s0)
+        return _newton(f, s0, guess)
@@ -0,0 +1,343 @@
+from typing import Optional
+
+import numpy as np
+
+from ._utils import State, StateArray, Region, _poly, _poly_ders, _gibbs_properties, _ideal_gas, _set_ders
+
+
+class Region5(Region):
+    """
+    Region5 implements Region5 (high-temperature steam, 1073.15 K <= T <= 2273.15 K and p <= 50 MPa) of the IAPWS97
+    standard.
+
+    As in the other regions, every property comes from a single fused kernel (`evaluate`) that works on scalars and on
+    numpy arrays alike. The standard gives no backward equations for this region: `_T_ph` and `_T_ps` are Newton
+    iterations on the kernel, from which T(p, h) and T(p, s) are exact to machine precision.
+
+    Methods:
+        __init__
+        __contains__
+        base_eqn
+        evaluate
+        T_ph
+        T_ps
+
+    Class attributes:
+        table37
+        table38
+
+        gamma
+        gamma_pi
+        gamma_tau
+        gamma_pipi
+        gamma_tautau
+        gamma_pitau
+        T
+        p
+        P
+        v
+        rho
+        u
+        s
+        h
+        cp
+        cv
+        w
+    """
+
+    table37 = {1: {'J': 0, 'n': -0.13179983674201e2},
+               2: {'J': 1, 'n': 0.68540841634434e1},
+               3: {'J': -3, 'n': -0.24805148933466e-1},
+               4: {'J': -2, 'n': 0.36901534980333},
+               5: {'J': -1, 'n': -0.31161318213925e1},
+               6: {'J': 2, 'n': -0.32961626538917}}
+
+    table38 = {1: {'I': 1, 'J': 1, 'n': 0.15736404855259e-2},
+               2: {'I': 1, 'J': 2, 'n': 0.90153761673944e-3},
+               3: {'I': 1, 'J': 3, 'n': -0.50270077677648e-2},
+               4: {'I': 2, 'J': 3, 'n': 0.22440037409485e-5},
+               5: {'I': 2, 'J': 9, 'n': -0.41163275453471e-5},
+               6: {'I': 3, 'J': 7, 'n': 0.37919454822955e-7}}
+
+    # Iterations of `_T_ph` and `_T_ps`, which stop once every step is below TOLERANCE relative to T.
+    MAX_ITERATIONS = 20
+    TOLERANCE = 1e-12
+
+    def __init__(self, T: Optional[float] = None, p: Optional[float] = None, h: Optional[float] = None,
+                 s: Optional[float] = None, state: Optional[State] = None):
+        """
+        If all parameters are None (their default), then an empty instance is instanciated, so that a
+        `State in Region5()` check can be performed easily.
+        """
+        params = [p, T, h, s]
+        if state is not None and all(param is None for param in params):
+            p, T, h, s = state.p, state.T, state.h, state.s
+        elif state is not None and any(param is None for param in params):
+            raise ValueError('If state is given, no values for p, t, h and s can be given.')
+
+        params = [p, T, h, s]
+        self._state = State()
+        if all(param is None for param in params):
+            # Let the class instantiate so that someone can perform a `State in Region5()` check.
+            return
+        elif p and T:
+            self._state.T = T
+            self._state.p = p
+        elif p and h:
+            self._state.T = self.T_ph(p, h)
+            self._state.p = p
+            self._state.h = h
+        elif p and s:
+            self._state.T = self.T_ps(p, s)
+            self._state.p = p
+            self._state.s = s
+        else:
+            raise ValueError('You should only pass one of the following combinations to determine a state in Reg5: '
+                             '(p,T) (p, h), (p, s).')
+
+        self._state = Region._from_kernel(Region5.evaluate(self._state.T, self._state.p), self._state)
+
+    def __contains__(self, other: State) -> bool:
+        """
+        Overrides the behaviour of the `in` operator to facilitate a `State in Region` query.
+        """
+        if not isinstance(other, State):
+            return False
+        return 1073.15 <= other.T <= 2273.15 and 0 < other.p <= 50
+
+    def __repr__(self) -> str:
+        return f'Region5(p={self.p}, T={self.T})'
+
+    @staticmethod
+    def base_eqn(T: float, p: float) -> float:
+        """
+        Dimensionless specific Gibbs free energy (eq. 32).
+        Args:
+            T: Temperature (K)
+            p: Pressure (MPa)
+        Returns:
+            Dimensionless specific Gibbs free energy.
+        """
+        tau = 1000 / T
+        return np.log(p) + sum(entry['n'] * tau ** entry['J'] for entry in Region5.table37.values()) \
+            + _poly(Region5.table38, p, tau)
+
+    @staticmethod
+    def evaluate(T, p, out: Optional[State] = None) -> StateArray:
+        """
+        Fused kernel: evaluates gamma, its derivatives and all properties in a single pass over tables 37 and 38.
+        Works on scalars and on numpy arrays alike. No range check is performed.
+        Args:
+            T: Temperature (K).
+            p: Pressure (MPa).
+            out: State to overwrite in place, its `ders` included, when T and p are floats (see `IAPWS97.update`).
+        Returns:
+            The properties as a StateArray (`out` if given), with the reduced variables and the derivatives in `ders`.
+        """
+        if out is None:
+            T, p = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(p, dtype=float))
+        tau = 1000 / T
+        _pi = p / 1
+
+        ggO, gpO, gtO, gppO, gttO, gptO = _ideal_gas(Region5.table37, _pi, tau)
+
+        ggR, gpR, gtR, gppR, gttR, gptR = _poly_ders(Region5.table38, _pi, tau)
+
+        state = _gibbs_properties(T, p, tau, _pi, ggO + ggR, gpO + gpR, gtO + gtR, gppO + gppR, gttO + gttR,
+                                  gptO + gptR, out=out)
+        return _set_ders(state, dict(pi=_pi, tau=tau, gammaO=ggO, gammaR=ggR, gamma=ggO + ggR,
+                                     gammaO_pi=gpO, gammaR_pi=gpR, gamma_pi=gpO + gpR,
+                                     gammaO_tau=gtO, gammaR_tau=gtR, gamma_tau=gtO + gtR,
+                                     gammaO_pipi=gppO, gammaR_pipi=gppR, gamma_pipi=gppO + gppR,
+                                     gammaO_tautau=gttO, gammaR_tautau=gttR, gamma_tautau=gttO + gttR,
+                                     gammaO_pitau=gptO, gammaR_pitau=gptR, gamma_pitau=gptO + gptR))
+
+    #############################################################
+    ####################### Properties ##########################
+    #############################################################
+    @property
+    def gamma(self) -> float:
+        """Dimensionless specific Gibbs free energy (eq. 32)."""
+        return self._state.ders['gamma']
+
+    @property
+    def gammaO(self) -> float:
+        """Ideal gas part of the dimensionless specific Gibbs free energy (eq. 33)."""
+        return self._state.ders['gammaO']
+
+    @property
+    def gammaR(self) -> float:
+        """Residual part of the dimensionless specific Gibbs free energy (eq. 34)."""
+        return self._state.ders['gammaR']
+
+    @property
+    def gamma_pi(self) -> float:
+        """Derivative of gamma with respect to pi at constant tau."""
+        return self._state.ders['gamma_pi']
+
+    @property
+    def gamma_tau(self) -> float:
+        """Derivative of gamma with respect to tau at constant pi."""
+        return self._state.ders['gamma_tau']
+
+    @property
+    def gamma_pipi(self) -> float:
+        """Second order derivative of gamma with respect to pi at constant tau."""
+        return self._state.ders['gamma_pipi']
+
+    @property
+    def gamma_tautau(self) -> float:
+        """Second order derivative of gamma with respect to tau at constant pi."""
+        return self._state.ders['gamma_tautau']
+
+    @property
+    def gamma_pitau(self) -> float:
+        """Second order derivative of gamma with respect to pi and then tau."""
+        return self._state.ders['gamma_pitau']
+
+    @property
+    def T(self) -> float:
+        """Temperature of state (K)"""
+        return self._state.T
+
+    @property
+    def p(self) -> float:
+        """Pressure of state (MPa)"""
+        return self._state.p
+
+    @property
+    def P(self) -> float:
+        """Pressure of state (MPa)"""
+        return self._state.p
+
+    @property
+    def v(self) -> float:
+        """Specific volume in m^3/kg"""
+        return self._state.v
+
+    @property
+    def rho(self) -> float:
+        """Density in kg/m^3"""
+        return self._state.rho
+
+    @property
+    def u(self) -> float:
+        """Specific internal energy in kJ/kg"""
+        return self._state.u
+
+    @property
+    def s(self) -> float:
+        """Specific entropy in kJ/kg/K"""
+        return self._state.s
+
+    @property
+    def h(self) -> float:
+        """Specific enthalpy in kJ/kg"""
+        return self._state.h
+
+    @property
+    def cp(self) -> float:
+        """Specific isobaric heat capacity kJ/kg/K"""
+        return self._state.cp
+
+    @property
+    def cv(self) -> float:
+        """Specific isochoric heat capacity kJ/kg/K"""
+        return self._state.cv
+
+    @property
+    def w(self) -> float:
+        """Speed of sound in m/s"""
+        return self._state.w
+
+    @property
+    def alpha_v(self) -> float:
+        """Isobaric cubic expansion coefficient in 1/K"""
+        return self._state.alpha_v
+
+    @property
+    def kappa_T(self) -> float:
+        """Isothermal compressibility in 1/MPa"""
+        return self._state.kappa_T
+
+    @property
+    def mu_JT(self) -> float:
+        """Joule-Thomson coefficient in K/MPa"""
+        return self._state.mu_JT
+
+    @property
+    def kappa(self) -> float:
+        """Isentropic exponent"""
+        return self._state.kappa
+
+    @property
+    def dpdT_v(self) -> float:
+        """Derivative of pressure with respect to temperature at constant specific volume, in MPa/K"""
+        return self._state.dpdT_v
+
+    #############################################################
+    ####################### Backwards ###########################
+    #############################################################
+    def T_ph(self, p: float, h: float) -> float:
+        """
+        Temperature as a function of pressure and enthalpy, from a Newton iteration on the kernel.
+        Args:
+            p: Pressure (MPa).
+            h: Enthalpy (kJ/kg).
+        Returns:
+            Temperature (K).
+        Raises:
+            ValueError if the state is out of Region5.
+        """
+        T = float(Region5._T_ph(p, h))
+        if not 1073.15 <= T <= 2273.15 or not 0 < p <= 50:
+            raise ValueError(f'State out of bounds. p={p}, h={h}.')
+        return T
+
+    def T_ps(self, p: float, s: float) -> float:
+        """
+        Temperature as a function of pressure and entropy, from a Newton iteration on the kernel.
+        Args:
+            p: Pressure (MPa).
+            s: Entropy (kJ/kg/K).
+        Returns:
+            Temperature (K).
+        Raises:
+            ValueError if the state is out of Region5.
+        """
+        T = float(Region5._T_ps(p, s))
+        if not 1073.15 <= T <= 2273.15 or not 0 < p <= 50:
+            raise ValueError(f'State out of bounds. p={p}, s={s}.')
+        return T
+
+    @staticmethod
+    def _solve_T(p, name: str, z):
+        """
+        Vectorized Newton iteration on T for `name` (h or s) equal to z at pressure p, with the slopes cp and cp / T.
+        It starts from the middle of the region, from which both properties are close to linear in T. A single point
+        given as scalars is iterated on floats, on the scalar path of the kernel.
+        """
+        if np.ndim(p) == 0 and np.ndim(z) == 0:
+            p, z, T, out = float(p), float(z), 1673.15, State()
+        else:
+            p, z = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(z, dtype=float))
+            T, out = np.full(p.shape, 1673.15), None
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for _ in range(Region5.MAX_ITERATIONS):
+                state = Region5.evaluate(T, p, out=out)
+                slope = state.cp if name == 'h' else state.cp / T
+                step = (getattr(state, name) - z) / slope
+                T = T - step
+                if not (np.abs(step) > Region5.TOLERANCE * np.abs(T)).any():
+                    break
+        return T
+
+    @staticmethod
+    def _T_ph(p, h):
+        """Vectorized T(p, h), without range check. See `_solve_T`."""
+        return Region5._solve_T(p, 'h', h)
+
+    @staticmethod
+    def _T_ps(p, s):
+        """Vectorized T(p, s), without range check. See `_solve_T`."""
+        return Region5._solve_T(p, 's', s)
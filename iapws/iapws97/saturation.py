@@ -0,0 +1,74 @@
+"""
+Saturation curves over arrays: the saturation pressure p_s(T) (eq. 30 of [1]) and temperature T_s(p) (eq. 31).
+
+`_utils._p_s`, `Region4.p_sat` and `Region4.T_sat` evaluate one point at a time and raise (or warn) when it is out of
+the range of the equations. The functions here evaluate every point of an array in one pass of the closed forms and,
+instead of raising, return the status of every point (see `STATUS`). Points out of range are NaN, or evaluated at the
+nearest bound of the range with `clamp=True`, e.g. to classify points just below the triple point as liquid or vapour.
+
+    p_s, status = saturation.p_sat(T, clamp=True)
+    boiling = (p < p_s) & (status == saturation.IN_RANGE)
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from ._utils import T_c, p_c, _p_s_eqn, _T_s_eqn
+
+# Status of every point.
+IN_RANGE = 0
+BELOW = -1
+ABOVE = 1
+INVALID = 2
+STATUS = {IN_RANGE: 'in range', BELOW: 'below the range', ABOVE: 'above the range', INVALID: 'not a number'}
+
+# Range of both equations, from the triple point (273.15 K is the lower bound of IF97) to the critical point.
+T_MIN, T_MAX = 273.15, T_c
+p_MIN, p_MAX = float(_p_s_eqn(T_MIN)), p_c
+
+
+class Saturation(NamedTuple):
+    """
+    Outcome of a saturation curve evaluation.
+    Attributes:
+        value: Saturation pressure (MPa) or temperature (K) of every point. NaN out of range, unless clamped.
+        status: Status of every input (int8), one of `IN_RANGE`, `BELOW`, `ABOVE` or `INVALID` (NaN inputs).
+    """
+    value: np.ndarray
+    status: np.ndarray
+
+
+def _curve(equation, x, lower: float, upper: float, clamp: bool) -> Saturation:
+    """Evaluates `equation` on the points of x within [lower, upper], the other points as given by `clamp`."""
+    x = np.asarray(x, dtype=float)
+    status = np.select([x < lower, x > upper, np.isnan(x)], [BELOW, ABOVE, INVALID], default=IN_RANGE).astype(np.int8)
+    if clamp:
+        value = equation(np.clip(x, lower, upper))
+    else:
+        value = equation(np.where(status == IN_RANGE, x, lower))
+        value = np.where(status == IN_RANGE, value, np.nan)
+    return Saturation(value, status)
+
+
+def p_sat(T, clamp: bool = False) -> Saturation:
+    """
+    Saturation pressure of every temperature (eq. 30 of [1]).
+    Args:
+        T: Temperature (K). Array or scalar.
+        clamp: Evaluate the temperatures out of [T_MIN, T_MAX] at the nearest bound instead of returning NaN.
+    Returns:
+        The Saturation, with the pressures (MPa) and the status of every temperature, of the shape of T.
+    """
+    return _curve(_p_s_eqn, T, T_MIN, T_MAX, clamp)
+
+
+def T_sat(p, clamp: bool = False) -> Saturation:
+    """
+    Saturation temperature of every pressure (eq. 31 of [1]).
+    Args:
+        p: Pressure (MPa). Array or scalar.
+        clamp: Evaluate the pressures out of [p_MIN, p_MAX] at the nearest bound instead of returning NaN.
+    Returns:
+        The Saturation, with the temperatures (K) and the status of every pressure, of the shape of p.
+    """
+    return _curve(_T_s_eqn, p, p_MIN, p_MAX, clamp)
@@ -0,0 +1,438 @@
+"""
+Vectorized Newton iterations on the forward equations.
+
+The backward equations (`Region1._T_ph`, `Region2._T_ps`, `Region3._T_ph`, `Region3._v_ph`, ...) only reproduce the
+forward equations within their permissible deviations (up to tens of mK for T(p, h)), so the state found for a (p, h)
+pair does not have exactly the enthalpy h. The solvers here take the backward result as the initial guess and refine it
+with Newton steps on the forward equations, which converge quadratically from such a close start: one or two steps are
+enough to match the inputs to machine precision.
+
+The unknowns are the natural variables of the region, (p, T) in Regions 1, 2 and 5 and (rho, T) in Region3, so the
+Jacobian of every step comes from the analytic derivatives of `derivatives.natural`, computed from the `ders` the kernel
+evaluation already returns. Once the step of a point is below `TOLERANCE` relative to the unknowns, the error left after
+taking it is of the order of the square of the step, below machine precision. That last step is then applied to the
+properties with the same derivatives, as a first-order update, instead of a new evaluation, and the point drops out of
+the iteration, so later steps only evaluate the points still moving. From the backward equations this typically takes
+two evaluations.
+
+(T, h) and (T, s) pairs have no backward equations and start from the bounds of their isotherm. For time series,
+`WarmStart` starts every sample from the solution of the previous one instead.
+
+The work done by every solver is counted in `instrumentation`.
+"""
+import warnings
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import instrumentation
+from ._utils import StateArray, R, b23, _p_s_eqn, rho_c, T_c
+from .derivatives import natural
+from .region1 import Region1
+from .region2 import Region2
+from .region3 import Region3
+from .region5 import Region5
+
+MAX_ITERATIONS = 10
+TOLERANCE = 1e-7
+
+
+class Result(NamedTuple):
+    """
+    Outcome of a solver.
+    Attributes:
+        state: StateArray with the properties and the `ders` of every point. T, p, v, rho, u, s and h are those of the
+            solution, cp, cv, w, the `_utils.DERIVED` properties and `ders` those of the last evaluation, at most one
+            (converged) step away from it.
+        converged: Boolean array, True where the last step was below the tolerance.
+        iterations: Number of forward evaluations of every point.
+    """
+    state: StateArray
+    converged: np.ndarray
+    iterations: np.ndarray
+
+
+def _kernel(code: int, a: np.ndarray, b: np.ndarray) -> StateArray:
+    """Evaluates the kernel of a region on its natural variables: (p, T) in Regions 1, 2 and 5, (rho, T) in Region3."""
+    # Iterates may be unstable states, where the speed of sound is not defined.
+    with np.errstate(invalid='ignore'):
+        if code == 3:
+            return Region3.evaluate(b, a)
+        return {1: Region1, 2: Region2, 5: Region5}[code].evaluate(b, a)
+
+
+def _safeguard(x: np.ndarray, step: np.ndarray, above: np.ndarray, active: np.ndarray, lower: np.ndarray,
+               upper: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bisection safeguard of the Newton steps on a function that is monotonic within the brackets [lower, upper] of its
+    roots. The brackets of the `active` points are shrunk to x in place, on the side given by `above` (x is above the
+    root), and steps leaving them are replaced by steps to their middle.
+    Returns:
+        The steps and a mask of the points that took a Newton step.
+    """
+    lower[active] = lo = np.where(above, lower[active], x)
+    upper[active] = hi = np.where(above, x, upper[active])
+    new = x - step
+    newton_step = (lo <= new) & (new <= hi)
+    return np.where(newton_step, step, x - (lo + hi) / 2), newton_step
+
+
+def newton(code: int, a, b, targets: Sequence[Tuple[str, np.ndarray]], unknowns: str = 'b',
+           max_iterations: int = MAX_ITERATIONS, tolerance: float = TOLERANCE, name: str = 'newton',
+           bounds: Optional[Tuple] = None) -> Result:
+    """
+    Solves `z(a, b) = target` for the natural variables (a, b) of a region with Newton's method.
+    Args:
+        code: Region number. 1, 2 or 5, where (a, b) is (p, T), or 3, where (a, b) is (rho, T).
+        a: Initial guess of the first natural variable, or its fixed value if it is not an unknown.
+        b: Initial guess of the second natural variable (T), or its fixed value if it is not an unknown.
+        targets: (property name, target values) pairs, one per unknown. Names are those of `derivatives.PROPERTIES`.
+        unknowns: 'a', 'b' or 'ab'.
+        max_iterations: Maximum number of Newton steps.
+        tolerance: Steps below `tolerance` times the unknown are applied as a first-order update and end the iteration
+            of a point.
+        name: Name the call is recorded under in `instrumentation`.
+        bounds: (lower, upper) bracket of the root, for a single unknown. The target property must be monotonic within
+            it. Steps leaving the bracket are replaced by bisection steps.
+    Returns:
+        The Result, with arrays of the broadcast shape of the inputs.
+    Raises:
+        ValueError if the unknowns are not supported or if there are not as many targets as unknowns.
+    """
+    if unknowns not in ('a', 'b', 'ab'):
+        raise ValueError(f"unknowns must be one of 'a', 'b' or 'ab'. {unknowns} given.")
+    if len(targets) != len(unknowns):
+        raise ValueError(f'Pass one target per unknown. {len(targets)} targets for {len(unknowns)} unknowns given.')
+    arrays = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float),
+                                 *(np.asarray(values, dtype=float) for _, values in targets))
+    shape = arrays[0].shape
+    a, b, *values = (np.array(array, dtype=float).ravel() for array in arrays)
+    names = [target for target, _ in targets]
+    if bounds is not None:
+        lower, upper = (np.array(np.broadcast_to(bound, shape), dtype=float).ravel() for bound in bounds)
+
+    n = a.size
+    out = None
+    converged = np.zeros(n, dtype=bool)
+    iterations = np.zeros(n, dtype=int)
+    active = np.arange(n)
+    for _ in range(max_iterations):
+        state = _kernel(code, a[active], b[active])
+        ders = natural(state)
+        residuals = [getattr(state, target) - value[active] for target, value in zip(names, values)]
+        newton_step = True
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if unknowns == 'ab':
+                (f_a, f_b), (g_a, g_b) = ders[names[0]], ders[names[1]]
+                f, g = residuals
+                det = f_a * g_b - f_b * g_a
+                step_a, step_b = (f * g_b - g * f_b) / det, (g * f_a - f * g_a) / det
+            else:
+                slope = ders[names[0]][0 if unknowns == 'a' else 1]
+                step = residuals[0] / slope
+                if bounds is not None:
+                    x = (a if unknowns == 'a' else b)[active]
+                    step, newton_step = _safeguard(x, step, residuals[0] * slope > 0, active, lower, upper)
+                step_a, step_b = (step, 0) if unknowns == 'a' else (0, step)
+
+        # Only Newton steps converge: a small bisection step only bounds the root within the bracket.
+        done = (np.abs(step_a) <= tolerance * np.abs(a[active])) & (np.abs(step_b) <= tolerance * np.abs(b[active])) \
+            & newton_step
+        for z, (z_a, z_b) in ders.items():
+            setattr(state, z, getattr(state, z) - np.where(done, z_a * step_a + z_b * step_b, 0))
+
+        if out is None:
+            out = StateArray.empty(n)
+            out.ders = {key: np.empty(n) for key in state.ders}
+        out[active] = state
+        for key, der in state.ders.items():
+            out.ders[key][active] = der
+        iterations[active] += 1
+
+        converged[active[done]] = True
+        a[active] -= step_a
+        b[active] -= step_b
+        # Points whose step is not finite cannot recover and are dropped too, without being flagged as converged.
+        active = active[~done & np.isfinite(step_a + step_b)]
+        if not active.size:
+            break
+
+    instrumentation.record(name, n, int(iterations.sum()), int(n - converged.sum()))
+    state = StateArray(ders={key: der.reshape(shape) for key, der in out.ders.items()},
+                       **{column: getattr(out, column).reshape(shape) for column in StateArray.columns})
+    return Result(state, converged.reshape(shape), iterations.reshape(shape))
+
+
+def newton_point(code: int, a: float, b: float, targets: Sequence[Tuple[str, float]],
+                 unknowns: str = 'b') -> StateArray:
+    """
+    `newton` on a single point, for the scalar backward methods of the regions (`Region1.T_ph(..., consistent=True)`,
+    ...), which return a float and have no `converged` flag to report a failure with.
+    Returns:
+        The state of the point, as 0-d arrays.
+    Warns:
+        RuntimeWarning if the iteration does not converge. The state is then the last iterate, which does not match the
+        targets.
+    """
+    result = newton(code, a, b, targets, unknowns)
+    if not result.converged:
+        warnings.warn(f'The refinement on the forward equations did not converge. {dict(targets)}', RuntimeWarning)
+    return result.state
+
+
+def _solve_p(code: int, p, name: str, z, T, v=None) -> Result:
+    """Refines a backward (T, v) guess of the state of pressure p and property `name` equal to z."""
+    if code == 3:
+        return newton(3, 1 / v, T, [('p', p), (name, z)], unknowns='ab', name='p' + name)
+    return newton(code, p, T, [(name, z)], unknowns='b', name='p' + name)
+
+
+def solve_pT(p, T) -> Result:
+    """
+    Region3 state of a (p, T) pair: the density of the backward equations v(p, T) refined on the Helmholtz equation,
+    `p = rho * R * T * delta * phi_delta`, at constant T.
+    Args:
+        p: Pressure (MPa).
+        T: Temperature (K).
+    Returns:
+        The Result. The pressure of the state matches p to machine precision.
+    """
+    return newton(3, 1 / Region3._v_pT(p, T), T, [('p', p)], unknowns='a', name='pT')
+
+
+def solve_ph(code: int, p, h) -> Result:
+    """
+    State of a (p, h) pair, from the backward equations refined on the forward equations.
+    Args:
+        code: Region number (1, 2, 3 or 5) the points belong to.
+        p: Pressure (MPa).
+        h: Enthalpy (kJ/kg).
+    Returns:
+        The Result. The enthalpy of the state matches h to machine precision.
+    """
+    kernel = {1: Region1, 2: Region2, 3: Region3, 5: Region5}[code]
+    return _solve_p(code, p, 'h', h, kernel._T_ph(p, h), Region3._v_ph(p, h) if code == 3 else None)
+
+
+def solve_ps(code: int, p, s) -> Result:
+    """
+    State of a (p, s) pair, from the backward equations refined on the forward equations.
+    Args:
+        code: Region number (1, 2, 3 or 5) the points belong to.
+        p: Pressure (MPa).
+        s: Entropy (kJ/kg/K).
+    Returns:
+        The Result. The entropy of the state matches s to machine precision.
+    """
+    kernel = {1: Region1, 2: Region2, 3: Region3, 5: Region5}[code]
+    return _solve_p(code, p, 's', s, kernel._T_ps(p, s), Region3._v_ps(p, s) if code == 3 else None)
+
+
+def _region3_mask(result: Result) -> Result:
+    """
+    Keeps the converged points that are stable states of Region3: within its bounds and, below the critical temperature,
+    liquid above the saturation pressure or vapour below it. Every other point is set to NaN and flagged as not
+    converged, which covers the two-phase region, where the Helmholtz equation still has (metastable) solutions.
+    """
+    state = result.state
+    with np.errstate(invalid='ignore'):
+        p_rho = natural(state)['p'][0]
+        p_s = _p_s_eqn(np.minimum(state.T, T_c))
+        stable = (state.T >= T_c) | np.where(state.rho > rho_c, state.p >= p_s, state.p <= p_s)
+        valid = result.converged & (623.15 <= state.T) & (b23(T=state.T) <= state.p) & (state.p <= 100) & (p_rho > 0) \
+            & stable
+    for column in StateArray.columns:
+        getattr(state, column)[~valid] = np.nan
+    return Result(state, valid, result.iterations)
+
+
+def _p_bracket(code: int, T: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pressures bounding the isotherms of Region1, [p_s(T), 100], of Region2, [0, p_s(T) or b23(T) or 100], or of
+    Region5, [0, 50].
+    """
+    if code == 5:
+        return np.zeros(T.shape), np.full(T.shape, 50.)
+    p_s = _p_s_eqn(np.minimum(T, 623.15))
+    if code == 1:
+        return p_s, np.full(T.shape, 100.)
+    upper = np.where(T <= 623.15, p_s, np.where(T <= 863.15, b23(T=T), 100.))
+    return np.zeros(T.shape), upper
+
+
+def _region125_mask(code: int, result: Result) -> Result:
+    """Keeps the converged points within the bounds of Region1, Region2 or Region5 and sets every other point to NaN."""
+    state = result.state
+    lower, upper = _p_bracket(code, state.T)
+    T_min, T_max = {1: (273.15, 623.15), 2: (273.15, 1073.15), 5: (1073.15, 2273.15)}[code]
+    with np.errstate(invalid='ignore'):
+        valid = result.converged & (T_min <= state.T) & (state.T <= T_max) & (lower < state.p) & (state.p <= upper)
+    for column in StateArray.columns:
+        getattr(state, column)[~valid] = np.nan
+    return Result(state, valid, result.iterations)
+
+
+def _solve_T(T, name: str, z, code: int = 3) -> Result:
+    """
+    State of temperature T and property `name` (h or s) equal to z in a region, from an iteration on its first natural
+    variable bracketed by the bounds of the isotherm: the pressures of `_p_bracket` in Regions 1, 2 and 5, starting
+    from their middle (from the ideal gas for the entropy of Regions 2 and 5), and in Region3, where h and s decrease
+    with density along isotherms, the densities of the isotherm at the 2-3 boundary and at 100 MPa.
+    """
+    T, z = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(z, dtype=float))
+    if code != 3:
+        lower, upper = _p_bracket(code, T)
+        p = (lower + upper) / 2
+        if code != 1 and name == 's':
+            # The entropy of steam is close to that of the ideal gas, logarithmic in p: start from the ideal gas (of
+            # Region2, whose equation extrapolates well enough to the temperatures of Region5 for a start).
+            s_1 = R * (540 / T * Region2.base_id_gas_der_tau_const_pi(T, 1) - Region2.base_eqn_id_gas(T, 1))
+            p = np.clip(np.exp((s_1 - z) / R), lower, upper)
+        return _region125_mask(code, newton(code, p, T, [(name, z)], unknowns='a', name='T' + name,
+                                           bounds=(lower, upper)))
+
+    # The bounds are taken just inside Region3, where the backward equations of solve_pT are defined.
+    T_bounds = np.clip(T, 623.15, 863.15)
+    low = solve_pT(np.maximum(b23(T=T_bounds), _p_s_eqn(623.15)) * (1 + 1e-9), T_bounds).state
+    high = solve_pT(100 * (1 - 1e-9), T_bounds).state
+
+    # Initial guess interpolated between the bounds, linearly in log(rho).
+    z_low, z_high = getattr(low, name), getattr(high, name)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rho = low.rho * (high.rho / low.rho) ** ((z - z_low) / (z_high - z_low))
+    rho = np.clip(np.nan_to_num(rho, nan=rho_c), low.rho, high.rho)
+    return _region3_mask(newton(3, rho, T, [(name, z)], unknowns='a', name='T' + name, bounds=(low.rho, high.rho)))
+
+
+def solve_Th(T, h, code: int = 3) -> Result:
+    """
+    State of a (T, h) pair in a region, from a bracketed Newton iteration on the density in Region3 and on the pressure
+    in Regions 1, 2 and 5.
+    Args:
+        T: Temperature (K).
+        h: Enthalpy (kJ/kg).
+        code: Region number (1, 2, 3 or 5) the points are searched in.
+    Returns:
+        The Result. Points that did not converge to a state of the region (out of its bounds or in the two-phase region)
+        are NaN and flagged in `converged`.
+    """
+    return _solve_T(T, 'h', h, code)
+
+
+def solve_Ts(T, s, code: int = 3) -> Result:
+    """
+    State of a (T, s) pair in a region, from a bracketed Newton iteration on the density in Region3 and on the pressure
+    in Regions 1, 2 and 5.
+    Args:
+        T: Temperature (K).
+        s: Entropy (kJ/kg/K).
+        code: Region number (1, 2, 3 or 5) the points are searched in.
+    Returns:
+        The Result. Points that did not converge to a state of the region (out of its bounds or in the two-phase region)
+        are NaN and flagged in `converged`.
+    """
+    return _solve_T(T, 's', s, code)
+
+
+def solve_hs(h, s, code: int = 3) -> Result:
+    """
+    State of an (h, s) pair in a region. The pressure of the backward equation p(h, s) of the region gives the initial
+    T through the backward equation T(p, h), and in Region3 the initial v through v(p, h), which are refined by a Newton
+    iteration on (p, T) in Regions 1 and 2 and on (rho, T) in Region3.
+    Args:
+        h: Enthalpy (kJ/kg).
+        s: Entropy (kJ/kg/K).
+        code: Region number (1, 2 or 3) the points belong to.
+    Returns:
+        The Result. Points that did not converge to a state of the region (out of its bounds or in the two-phase region)
+        are NaN and flagged in `converged`.
+    """
+    kernel = {1: Region1, 2: Region2, 3: Region3}[code]
+    with np.errstate(invalid='ignore'):
+        p = kernel._p_hs(h, s)
+        T = kernel._T_ph(p, h)
+        v = Region3._v_ph(p, h) if code == 3 else None
+    if code != 3:
+        return _region125_mask(code, newton(code, p, T, [('h', h), ('s', s)], unknowns='ab', name='hs'))
+    return _region3_mask(newton(3, 1 / v, T, [('h', h), ('s', s)], unknowns='ab', name='hs'))
+
+
+class WarmStart:
+    """
+    Stateful solver of (T, h) or (T, s) pairs for time series, e.g. the nodes of a transient simulation, which are
+    solved once per time step.
+
+    Every call solves one sample (a scalar or an array of points) and keeps its solution, so that the next call of the
+    same shape starts each point from its previous solution (its pressure in Regions 1 and 2, its density in Region3)
+    instead of the cold start of `_solve_T`, which in Region3 also needs two (p, T) solves for its bracket. The previous
+    solution is moved along its tangent to the new inputs, a Newton step on the derivatives it was solved with, so that
+    on smooth data the start is within the square of the change of the inputs and one or two evaluations are enough.
+    Points whose warm iteration does not converge to a state of the region (a jump of the inputs, ...) fall back to the
+    cold start, as do every point of the first call, after a change of shape or after `reset`.
+
+    Warm iterations are recorded in `instrumentation` under 'warm Th' or 'warm Ts', cold starts under 'Th' or 'Ts'.
+
+        solver = WarmStart(1, 'h')
+        for T, h in samples:
+            p = solver(T, h).state.p
+    """
+
+    def __init__(self, code: int, name: str):
+        """
+        Args:
+            code: Region number (1, 2 or 3) the points belong to.
+            name: Property given with the temperature, 'h' or 's'.
+        Raises:
+            ValueError if the region or the property are not supported.
+        """
+        if code not in (1, 2, 3):
+            raise ValueError(f'code must be 1, 2 or 3. {code} given.')
+        if name not in ('h', 's'):
+            raise ValueError(f"name must be 'h' or 's'. {name} given.")
+        self.code, self.name = code, name
+        self._shape = None
+        self._last = None
+
+    def reset(self):
+        """Forgets the previous solution: the next call is a cold start."""
+        self._shape = self._last = None
+
+    def __call__(self, T, z) -> Result:
+        """
+        Solves one sample.
+        Args:
+            T: Temperature (K).
+            z: Enthalpy (kJ/kg) or entropy (kJ/kg/K), as given by `name`.
+        Returns:
+            The Result, with arrays of the broadcast shape of the inputs. Points that did not converge to a state of the
+            region are NaN and flagged in `converged`. `iterations` includes those of the warm iteration of the points
+            that fell back to the cold start.
+        """
+        T, z = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(z, dtype=float))
+        shape = T.shape
+        T, z = T.ravel(), z.ravel()
+        if self._shape != shape:
+            result = _solve_T(T, self.name, z, self.code)
+        else:
+            T_last, z_last, a_last, z_a, z_b = self._last
+            # Points that did not converge in the previous call have NaN guesses, which fall back to the cold start.
+            a = a_last + (z - z_last - z_b * (T - T_last)) / z_a
+            result = newton(self.code, a, T, [(self.name, z)], unknowns='a', name='warm T' + self.name)
+            result = _region3_mask(result) if self.code == 3 else _region125_mask(self.code, result)
+            failed = ~result.converged
+            if failed.any():
+                cold = _solve_T(T[failed], self.name, z[failed], self.code)
+                result.state[failed] = cold.state
+                for key, der in result.state.ders.items():
+                    der[failed] = cold.state.ders[key]
+                result.converged[failed] = cold.converged
+                result.iterations[failed] += cold.iterations
+
+        # The state holds the derivatives of its last evaluation, at most one (converged) step away from the solution.
+        z_a, z_b = natural(result.state)[self.name]
+        a = result.state.rho if self.code == 3 else result.state.p
+        self._shape, self._last = shape, (T, z, np.where(result.converged, a, np.nan), z_a, z_b)
+        state = result.state
+        return Result(StateArray(ders={key: der.reshape(shape) for key, der in state.ders.items()},
+                                 **{column: getattr(state, column).reshape(shape) for column in StateArray.columns}),
+                      result.converged.reshape(shape), result.iterations.reshape(shape))
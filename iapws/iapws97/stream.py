@@ -0,0 +1,257 @@
+"""
+Streaming evaluation of plant historian exports.
+
+Files with one row per reading and `p` (MPa) plus either `T` (K) or `h` (kJ/kg) columns (any other column, such as a
+timestamp or a tag, is passed through untouched) are read in chunks of a bounded number of rows, enriched with the
+properties computed by `batch.evaluate` and written out chunk by chunk. Only one chunk is held in memory at a time, so
+memory use does not depend on the size of the file.
+
+Empty or unparseable input cells (gaps and bad-quality readings of the historian) are read as NaN, so their rows come
+out with NaN properties, like out-of-bounds readings, instead of stopping the stream. With several workers, one pool
+(see `batch.executor`) evaluates every chunk of the stream.
+
+CSV files are handled with the standard library. Parquet files need the optional `pyarrow` dependency.
+
+Command line usage:
+    python -m iapws.iapws97.stream historian.csv enriched.csv --chunk-size 100000 --dedup
+    python -m iapws.iapws97.stream historian.parquet enriched.parquet --benchmark
+"""
+import argparse
+import csv
+import time
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+from . import batch
+from ._utils import StateArray
+
+DEFAULT_CHUNK_SIZE = 100_000
+INPUT_COLUMNS = ('p', 'T', 'h')
+
+Chunk = Dict[str, np.ndarray]
+
+
+def _format(path: str) -> str:
+    """File format ('csv' or 'parquet') deduced from the file extension."""
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        return 'parquet'
+    return 'csv'
+
+
+def _pyarrow():
+    """Imports the optional pyarrow dependency."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError('Reading and writing Parquet files requires pyarrow: pip install pyarrow.') from e
+    return pyarrow
+
+
+def read_csv(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Chunk]:
+    """
+    Reads a CSV file with a header row in chunks.
+    Args:
+        path: Path of the file.
+        chunk_size: Maximum number of rows per chunk.
+    Yields:
+        Dicts of column name to array. The p, T and h columns are floats (NaN for empty or unparseable cells), every
+        other column is kept as strings.
+    """
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) == chunk_size:
+                yield _csv_chunk(header, rows)
+                rows = []
+        if rows:
+            yield _csv_chunk(header, rows)
+
+
+def _float(cell: str) -> float:
+    """Value of a CSV cell, NaN if it is empty or not a number."""
+    try:
+        return float(cell)
+    except ValueError:
+        return np.nan
+
+
+def _floats(column: tuple) -> np.ndarray:
+    """Float array of a CSV column. Cells are only parsed one by one if the column has an empty or unparseable cell."""
+    try:
+        return np.array(column, dtype=float)
+    except ValueError:
+        return np.array([_float(cell) for cell in column])
+
+
+def _csv_chunk(header: list, rows: list) -> Chunk:
+    """Transposes CSV rows into columns. Short rows are padded with empty cells, which read as NaN."""
+    columns = zip(*(row + [''] * (len(header) - len(row)) for row in rows))
+    return {name: _floats(column) if name in INPUT_COLUMNS else np.array(column, dtype=str)
+            for name, column in zip(header, columns)}
+
+
+def write_csv(chunks: Iterable[Chunk], path: str) -> Iterator[Chunk]:
+    """
+    Writes chunks to a CSV file as they arrive. The header is taken from the first chunk.
+    Args:
+        chunks: Chunks to write.
+        path: Path of the file.
+    Yields:
+        Every chunk once it has been written.
+    """
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        header = None
+        for chunk in chunks:
+            if header is None:
+                header = list(chunk)
+                writer.writerow(header)
+            writer.writerows(zip(*(chunk[name].tolist() for name in header)))
+            yield chunk
+
+
+def read_parquet(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Chunk]:
+    """
+    Reads a Parquet file in chunks (record batches). Requires pyarrow.
+    Args:
+        path: Path of the file.
+        chunk_size: Maximum number of rows per chunk.
+    Yields:
+        Dicts of column name to array.
+    """
+    pyarrow = _pyarrow()
+    for record_batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield {name: column.to_numpy(zero_copy_only=False)
+               for name, column in zip(record_batch.schema.names, record_batch.columns)}
+
+
+def write_parquet(chunks: Iterable[Chunk], path: str) -> Iterator[Chunk]:
+    """
+    Writes chunks to a Parquet file as they arrive. The schema is taken from the first chunk. Requires pyarrow.
+    Args:
+        chunks: Chunks to write.
+        path: Path of the file.
+    Yields:
+        Every chunk once it has been written.
+    """
+    pyarrow = _pyarrow()
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pyarrow.table(chunk)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            yield chunk
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def read(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Chunk]:
+    """Reads a CSV or Parquet file in chunks, depending on its extension."""
+    if _format(path) == 'parquet':
+        return read_parquet(path, chunk_size)
+    return read_csv(path, chunk_size)
+
+
+def write(chunks: Iterable[Chunk], path: str) -> Iterator[Chunk]:
+    """Writes chunks to a CSV or Parquet file, depending on its extension."""
+    if _format(path) == 'parquet':
+        return write_parquet(chunks, path)
+    return write_csv(chunks, path)
+
+
+def enrich(chunks: Iterable[Chunk], **kwargs) -> Iterator[Chunk]:
+    """
+    Adds the properties of every row to each chunk.
+    Args:
+        chunks: Chunks with a `p` column and either a `T` or an `h` column.
+        kwargs: Passed to `batch.evaluate` (workers, chunk_size, sort_regions, backend, pool, ...). With more than one
+            worker and no pool, one pool of the backend is created for the whole stream and shut down at its end.
+    Yields:
+        The chunks with one extra column per property of `StateArray.columns` not already in the chunk.
+    Raises:
+        ValueError if a chunk lacks the input columns.
+    """
+    kwargs.setdefault('workers', 1)
+    if kwargs['workers'] != 1 and kwargs.get('pool') is None:
+        with batch.executor(kwargs.get('backend', 'process'), kwargs['workers']) as pool:
+            yield from enrich(chunks, **dict(kwargs, pool=pool))
+        return
+    for chunk in chunks:
+        if 'p' not in chunk or ('T' in chunk) == ('h' in chunk):
+            raise ValueError(f'Chunks need a p column and either a T or an h column. {list(chunk)} given.')
+        state = batch.evaluate(chunk['p'], T=chunk.get('T'), h=chunk.get('h'), **kwargs)
+        for name in StateArray.columns:
+            if name not in chunk:
+                chunk[name] = getattr(state, name)
+        yield chunk
+
+
+def run(source: str, destination: str, chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs) -> int:
+    """
+    Reads `source`, enriches it and writes it to `destination`, one chunk at a time.
+    Args:
+        source: Input CSV or Parquet file.
+        destination: Output CSV or Parquet file.
+        chunk_size: Maximum number of rows held in memory.
+        kwargs: Passed to `batch.evaluate`.
+    Returns:
+        Number of rows processed.
+    """
+    return sum(len(chunk['p']) for chunk in write(enrich(read(source, chunk_size), **kwargs), destination))
+
+
+def benchmark(source: str, destination: str, chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs) -> Dict[str, float]:
+    """
+    Measures the throughput of the pipeline against the throughput of the bare reader on the same file.
+    Args:
+        source: Input CSV or Parquet file.
+        destination: Output CSV or Parquet file.
+        chunk_size: Maximum number of rows held in memory.
+        kwargs: Passed to `batch.evaluate`.
+    Returns:
+        Rows, reader rows/s, pipeline rows/s and their ratio.
+    """
+    start = time.perf_counter()
+    rows = sum(len(chunk['p']) for chunk in read(source, chunk_size))
+    read_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    run(source, destination, chunk_size, **kwargs)
+    run_time = time.perf_counter() - start
+
+    return dict(rows=rows, reader_rows_per_s=rows / read_time, pipeline_rows_per_s=rows / run_time,
+                pipeline_vs_reader=read_time / run_time)
+
+
+def main(argv: Optional[list] = None):
+    """Command line entry point. See the module docstring."""
+    parser = argparse.ArgumentParser(description='Enrich historian exports with IAPWS-IF97 properties.')
+    parser.add_argument('source', help='Input CSV or Parquet file with p and T or h columns.')
+    parser.add_argument('destination', help='Output CSV or Parquet file.')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows held in memory at a time.')
+    parser.add_argument('--workers', type=int, default=1, help='Workers used to evaluate each chunk.')
+    parser.add_argument('--backend', choices=batch.BACKENDS, default='process', help='Kind of workers.')
+    parser.add_argument('--dedup', action='store_true', help='Evaluate repeated readings once.')
+    parser.add_argument('--benchmark', action='store_true', help='Report throughput against the bare reader.')
+    args = parser.parse_args(argv)
+
+    kwargs = dict(workers=args.workers, backend=args.backend, dedup=args.dedup)
+    if args.benchmark:
+        stats = benchmark(args.source, args.destination, args.chunk_size, **kwargs)
+        print(f"{stats['rows']} rows. Reader: {stats['reader_rows_per_s']:.0f} rows/s. "
+              f"Pipeline: {stats['pipeline_rows_per_s']:.0f} rows/s ({stats['pipeline_vs_reader']:.1%} of reader).")
+    else:
+        rows = run(args.source, args.destination, args.chunk_size, **kwargs)
+        print(f'{rows} rows written to {args.destination}.')
+
+
+if __name__ == '__main__':
+    main()
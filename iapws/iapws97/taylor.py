@@ -0,0 +1,151 @@
+"""
+Incremental updates of states for small changes of (p, T), e.g. the steps of a control loop or of a sensitivity
+analysis, by a first-order Taylor expansion around a reference state.
+
+The expansion is done in the natural variables (a, b) of the region of the reference, (p, T) in Regions 1, 2 and 5 and
+(rho, T) in Region3, with the analytic slopes of `derivatives.natural` for T, p, v, rho, u, s and h. In Region3 the
+change of density follows from (dp, dT) to first order, `drho = (dp - p_T * dT) / p_rho`. The slopes of cp, cv and w,
+which would need third derivatives of gamma or phi, are central differences on probes of the reference.
+
+The error of the expansion is estimated by its second-order term, with the curvatures taken from the same probes: five
+kernel evaluations at (a +- da, b), (a, b +- db) and (a + da, b + db), done once per reference. For the properties of
+Region3, the second-order term includes that of the density, `-(second-order term of p) / p_rho`. Points whose
+estimated relative error exceeds the tolerance in any property are evaluated instead: by the kernel in Regions 1, 2 and
+5, by a Newton iteration on the density from the expanded one in Region3.
+
+Every update is recorded in `instrumentation` under 'taylor', with the evaluated points as evaluations, so that
+points / evaluations is the number of updates per evaluation (see `instrumentation.ratio`).
+
+    reference = taylor.Reference(1, Region1.evaluate(T, p))
+    update = reference.update(p + dp, T + dT)
+"""
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+from . import instrumentation, solvers
+from ._utils import StateArray
+from .derivatives import PROPERTIES, natural
+
+# Properties that are expanded, T and p being given.
+EXPANDED = ('v', 'rho', 'u', 's', 'h', 'cp', 'cv', 'w')
+# Properties without analytic slopes.
+PROBED = ('cp', 'cv', 'w')
+
+
+class Update(NamedTuple):
+    """
+    Outcome of an incremental update.
+    Attributes:
+        state: StateArray (without `ders`) of the points.
+        error: Estimated relative error of the expansion of every point, the largest over its properties. It is that of
+            the expansion even for the evaluated points.
+        evaluated: Boolean array, True where the error exceeded the tolerance and the point was evaluated instead.
+    """
+    state: StateArray
+    error: np.ndarray
+    evaluated: np.ndarray
+
+
+class Reference:
+    """Reference state of incremental updates. See the module docstring."""
+
+    def __init__(self, code: int, state: StateArray, step: float = 1e-4):
+        """
+        Args:
+            code: Region number (1, 2, 3 or 5) of the state.
+            state: StateArray returned by the kernel of the region, with its `ders`.
+            step: Distance of the probes to the reference, relative to its natural variables.
+        Raises:
+            ValueError if the region is not supported or the state has no gamma or phi derivatives.
+        """
+        if code not in (1, 2, 3, 5):
+            raise ValueError(f'code must be 1, 2, 3 or 5. {code} given.')
+        self.code = code
+        self.shape = np.shape(state.T)
+        ders = natural(state)
+        values = {z: np.ravel(getattr(state, z)).astype(float) for z in PROPERTIES + PROBED}
+        n = values['T'].size
+        slopes = {z: tuple(np.broadcast_to(der, self.shape).ravel().astype(float) for der in ders[z])
+                  for z in PROPERTIES}
+
+        a, b = values['rho' if code == 3 else 'p'], values['T']
+        da, db = step * a, step * b
+        probes = solvers._kernel(code, np.concatenate([a + da, a - da, a, a, a + da]),
+                                 np.concatenate([b, b, b + db, b - db, b + db]))
+        probe_ders = natural(probes)
+        a_plus, a_minus, b_plus, b_minus, both = (slice(i * n, (i + 1) * n) for i in range(5))
+
+        # (z_aa, z_ab, z_bb) of every property.
+        curvatures = {}
+        for z in PROPERTIES:
+            z_a, z_b = (np.broadcast_to(der, (5 * n,)) for der in probe_ders[z])
+            z_ab = ((z_b[a_plus] - z_b[a_minus]) / (2 * da) + (z_a[b_plus] - z_a[b_minus]) / (2 * db)) / 2
+            curvatures[z] = ((z_a[a_plus] - z_a[a_minus]) / (2 * da), z_ab, (z_b[b_plus] - z_b[b_minus]) / (2 * db))
+        for z in PROBED:
+            value, probe = values[z], getattr(probes, z)
+            slopes[z] = ((probe[a_plus] - probe[a_minus]) / (2 * da), (probe[b_plus] - probe[b_minus]) / (2 * db))
+            curvatures[z] = ((probe[a_plus] - 2 * value + probe[a_minus]) / da ** 2,
+                             (probe[both] - probe[a_plus] - probe[b_plus] + value) / (da * db),
+                             (probe[b_plus] - 2 * value + probe[b_minus]) / db ** 2)
+
+        # The expanded properties are stacked as rows, so that an update is a few operations on (properties, n) arrays.
+        self._T, self._p = values['T'], values['p']
+        self._p_slopes, self._p_curvatures = slopes['p'], curvatures['p']
+        self._values = np.stack([values[z] for z in EXPANDED])
+        self._slopes = tuple(np.stack([slopes[z][i] for z in EXPANDED]) for i in range(2))
+        self._curvatures = tuple(np.stack([curvatures[z][i] for z in EXPANDED]) for i in range(3))
+
+    @staticmethod
+    def _second_order(curvatures: Tuple, da: np.ndarray, db: np.ndarray) -> np.ndarray:
+        """Second-order term of an expansion in the natural variables, from its (z_aa, z_ab, z_bb)."""
+        z_aa, z_ab, z_bb = curvatures
+        return (z_aa * da ** 2 + 2 * z_ab * da * db + z_bb * db ** 2) / 2
+
+    def expand(self, p, T) -> Tuple[StateArray, np.ndarray]:
+        """
+        First-order expansion of the reference at (p, T), without fallback.
+        Args:
+            p: Pressure (MPa). Array or scalar (broadcast against the reference).
+            T: Temperature (K).
+        Returns:
+            The StateArray of the flattened points and their estimated relative error, NaN where it is not defined.
+        """
+        p, T = (np.array(np.broadcast_to(x, self.shape), dtype=float).ravel() for x in (p, T))
+        p_a, p_b = self._p_slopes
+        db = T - self._T
+        da = (p - self._p - p_b * db) / p_a
+
+        z_a, z_b = self._slopes
+        values = self._values + z_a * da + z_b * db
+        with np.errstate(divide='ignore', invalid='ignore'):
+            second = self._second_order(self._curvatures, da, db) \
+                - z_a * (self._second_order(self._p_curvatures, da, db) / p_a)
+            error = np.max(np.abs(second / values), axis=0)
+        return StateArray(T=T, p=p, **dict(zip(EXPANDED, values))), error
+
+    def update(self, p, T, tolerance: float = 1e-9) -> Update:
+        """
+        Properties at (p, T), from the expansion of the reference where its estimated error is within the tolerance.
+        Args:
+            p: Pressure (MPa). Array or scalar (broadcast against the reference).
+            T: Temperature (K).
+            tolerance: Largest estimated relative error of the expanded properties.
+        Returns:
+            The Update, with arrays of the shape of the reference.
+        """
+        state, error = self.expand(p, T)
+        evaluated = ~(error <= tolerance)
+        if evaluated.any():
+            p, T = state.p[evaluated], state.T[evaluated]
+            if self.code == 3:
+                exact = solvers.newton(3, state.rho[evaluated], T, [('p', p)], unknowns='a', name='pT').state
+            else:
+                exact = solvers._kernel(self.code, p, T)
+            for z in EXPANDED:
+                getattr(state, z)[evaluated] = getattr(exact, z)
+        instrumentation.record('taylor', error.size, int(evaluated.sum()), 0)
+
+        state = StateArray(**{z: getattr(state, z).reshape(self.shape) for z in StateArray.columns
+                              if getattr(state, z) is not None})
+        return Update(state, error.reshape(self.shape), evaluated.reshape(self.shape))
@@ -0,0 +1,195 @@
+"""
+Transport properties of the states of the region kernels: the viscosity of the IAPWS Formulation 2008 [6] and the
+thermal conductivity of the IAPWS Formulation 2011 [7], both in their industrial form.
+
+Both are functions of density and temperature only, so they are evaluated on the rho and T of a StateArray returned by
+a region kernel (or `batch.evaluate`, `flash`, ...), without evaluating the state again. The critical enhancement of
+the thermal conductivity needs cp, cv and the isothermal compressibility `kappa_T`, which the kernels compute from the
+derivatives of their free energy, and the viscosity, which `transport` evaluates once for both. As in the industrial
+formulations, the critical enhancement of the viscosity is neglected (mu_2 = 1) and the compressibility of the
+reference temperature of the conductivity comes from the polynomials of Table 6 of [7].
+
+Units are SI: Pa*s for the viscosity and W/(m*K) for the thermal conductivity.
+
+    state = batch.evaluate(p, T=T)
+    mu, k = transport(state)
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from ._utils import StateArray, _poly, p_c, rho_c, T_c
+
+# Reference constants of both formulations: mu* = 1e-6 Pa*s, lambda* = 1e-3 W/(m*K).
+mu_star = 1e-6
+lambda_star = 1e-3
+# Specific gas constant of [7] (kJ/kg/K), which differs slightly from that of IF97.
+R_lambda = 0.46151805
+
+viscosity_table1 = {0: 1.67752, 1: 2.20462, 2: 0.6366564, 3: -0.241605}
+
+viscosity_table2 = {1: {'I': 0, 'J': 0, 'n': 5.20094e-1},
+                    2: {'I': 1, 'J': 0, 'n': 8.50895e-2},
+                    3: {'I': 2, 'J': 0, 'n': -1.08374},
+                    4: {'I': 3, 'J': 0, 'n': -2.89555e-1},
+                    5: {'I': 0, 'J': 1, 'n': 2.22531e-1},
+                    6: {'I': 1, 'J': 1, 'n': 9.99115e-1},
+                    7: {'I': 2, 'J': 1, 'n': 1.88797},
+                    8: {'I': 3, 'J': 1, 'n': 1.26613},
+                    9: {'I': 5, 'J': 1, 'n': 1.20573e-1},
+                    10: {'I': 0, 'J': 2, 'n': -2.81378e-1},
+                    11: {'I': 1, 'J': 2, 'n': -9.06851e-1},
+                    12: {'I': 2, 'J': 2, 'n': -7.72479e-1},
+                    13: {'I': 3, 'J': 2, 'n': -4.89837e-1},
+                    14: {'I': 4, 'J': 2, 'n': -2.57040e-1},
+                    15: {'I': 0, 'J': 3, 'n': 1.61913e-1},
+                    16: {'I': 1, 'J': 3, 'n': 2.57399e-1},
+                    17: {'I': 0, 'J': 4, 'n': -3.25372e-2},
+                    18: {'I': 3, 'J': 4, 'n': 6.98452e-2},
+                    19: {'I': 4, 'J': 5, 'n': 8.72102e-3},
+                    20: {'I': 3, 'J': 6, 'n': -4.35673e-3},
+                    21: {'I': 5, 'J': 6, 'n': -5.93264e-4}}
+
+conductivity_table1 = {0: 2.443221e-3, 1: 1.323095e-2, 2: 6.770357e-3, 3: -3.454586e-3, 4: 4.096266e-4}
+
+conductivity_table2 = {1: {'I': 0, 'J': 0, 'n': 1.60397357},
+                       2: {'I': 0, 'J': 1, 'n': -0.646013523},
+                       3: {'I': 0, 'J': 2, 'n': 0.111443906},
+                       4: {'I': 0, 'J': 3, 'n': 0.102997357},
+                       5: {'I': 0, 'J': 4, 'n': -0.0504123634},
+                       6: {'I': 0, 'J': 5, 'n': 0.00609859258},
+                       7: {'I': 1, 'J': 0, 'n': 2.33771842},
+                       8: {'I': 1, 'J': 1, 'n': -2.78843778},
+                       9: {'I': 1, 'J': 2, 'n': 1.53616167},
+                       10: {'I': 1, 'J': 3, 'n': -0.463045512},
+                       11: {'I': 1, 'J': 4, 'n': 0.0832827019},
+                       12: {'I': 1, 'J': 5, 'n': -0.00719201245},
+                       13: {'I': 2, 'J': 0, 'n': 2.19650529},
+                       14: {'I': 2, 'J': 1, 'n': -4.54580785},
+                       15: {'I': 2, 'J': 2, 'n': 3.55777244},
+                       16: {'I': 2, 'J': 3, 'n': -1.40944978},
+                       17: {'I': 2, 'J': 4, 'n': 0.275418278},
+                       18: {'I': 2, 'J': 5, 'n': -0.0205938816},
+                       19: {'I': 3, 'J': 0, 'n': -1.21051378},
+                       20: {'I': 3, 'J': 1, 'n': 1.60812989},
+                       21: {'I': 3, 'J': 2, 'n': -0.621178141},
+                       22: {'I': 3, 'J': 3, 'n': 0.0716373224},
+                       23: {'I': 4, 'J': 0, 'n': -2.7203370},
+                       24: {'I': 4, 'J': 1, 'n': 4.57586331},
+                       25: {'I': 4, 'J': 2, 'n': -3.18369245},
+                       26: {'I': 4, 'J': 3, 'n': 1.1168348},
+                       27: {'I': 4, 'J': 4, 'n': -0.19268305},
+                       28: {'I': 4, 'J': 5, 'n': 0.012913842}}
+
+# Coefficients A_ij of the reciprocal of (d rho / d p)_T at the reference temperature, one column j per range of
+# reduced density, given by the upper bound of the range.
+conductivity_table6 = {0.310559006: (6.53786807199516, -5.61149954923348, 3.39624167361325, -2.27492629730878,
+                                     10.2631854662709, 1.97815050331519),
+                       0.776397516: (6.52717759281799, -6.30816983387575, 8.08379285492595, -9.82240510197603,
+                                     12.1358413791395, -5.54349664571295),
+                       1.242236025: (5.35500529896124, -3.96415689925446, 8.91990208918795, -12.0338729505790,
+                                     9.19494865194302, -2.16866274479712),
+                       1.863354037: (1.55225959906681, 0.464621290821181, 8.93237374861479, -11.0321960061126,
+                                     6.16780999933360, -0.965458722086812),
+                       np.inf: (1.11999926419994, 0.595748562571649, 9.88952565078920, -10.3255051147040,
+                                4.66861294457414, -0.503243546373828)}
+
+# Critical region constants of [7] (Table 3). The lengths are in nm.
+Lambda = 177.8514
+q_D = 1 / 0.4
+nu = 0.630
+gamma = 1.239
+xi_0 = 0.13
+Gamma_0 = 0.06
+T_R = 1.5
+
+
+class Transport(NamedTuple):
+    """
+    Transport properties of a StateArray.
+    Attributes:
+        viscosity: Dynamic viscosity (Pa*s).
+        conductivity: Thermal conductivity (W/(m*K)).
+    """
+    viscosity: np.ndarray
+    conductivity: np.ndarray
+
+
+def _mu_bar(T_bar: np.ndarray, rho_bar: np.ndarray) -> np.ndarray:
+    """Reduced viscosity mu_0 * mu_1 (eqs. 11 and 12 of [6])."""
+    mu_0 = 100 * np.sqrt(T_bar) / sum(H / T_bar ** i for i, H in viscosity_table1.items())
+    mu_1 = np.exp(rho_bar * _poly(viscosity_table2, 1 / T_bar - 1, rho_bar - 1))
+    return mu_0 * mu_1
+
+
+def _zeta_R(rho_bar: np.ndarray) -> np.ndarray:
+    """Reduced (d rho / d p)_T at the reference temperature T_R (eq. 26 of [7])."""
+    bounds = np.array(list(conductivity_table6))
+    A = np.array(list(conductivity_table6.values()))[np.searchsorted(bounds, rho_bar)]
+    return 1 / sum(A[..., i] * rho_bar ** i for i in range(A.shape[-1]))
+
+
+def _lambda_bar(state: StateArray, T_bar: np.ndarray, rho_bar: np.ndarray, mu_bar: np.ndarray,
+                critical_enhancement: bool) -> np.ndarray:
+    """Reduced thermal conductivity lambda_0 * lambda_1 + lambda_2 (eqs. 16, 17 and 18 of [7])."""
+    lambda_0 = np.sqrt(T_bar) / sum(L / T_bar ** k for k, L in conductivity_table1.items())
+    lambda_1 = np.exp(rho_bar * _poly(conductivity_table2, 1 / T_bar - 1, rho_bar - 1))
+    if not critical_enhancement:
+        return lambda_0 * lambda_1
+
+    # (d rho / d p)_T = rho * kappa_T, reduced by rho_c / p_c.
+    zeta = p_c / rho_c * state.rho * state.kappa_T
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        delta_chi = np.maximum(rho_bar * (zeta - _zeta_R(rho_bar) * T_R / T_bar), 0)
+        y = q_D * xi_0 * (delta_chi / Gamma_0) ** (nu / gamma)
+        kappa = state.cp / state.cv
+        Z = 2 / (np.pi * y) * ((1 - 1 / kappa) * np.arctan(y) + y / kappa
+                               - (1 - np.exp(-1 / (1 / y + y ** 2 / (3 * rho_bar ** 2)))))
+        Z = np.where(y < 1.2e-7, 0, Z)
+    lambda_2 = Lambda * rho_bar * state.cp / R_lambda * T_bar / mu_bar * Z
+    return lambda_0 * lambda_1 + lambda_2
+
+
+def viscosity(state: StateArray) -> np.ndarray:
+    """
+    Dynamic viscosity of the industrial formulation of [6].
+    Args:
+        state: StateArray with rho and T, e.g. returned by a region kernel.
+    Returns:
+        The viscosity (Pa*s), with one entry per point of the state.
+    """
+    T_bar, rho_bar = np.asarray(state.T) / T_c, np.asarray(state.rho) / rho_c
+    return mu_star * _mu_bar(T_bar, rho_bar)
+
+
+def thermal_conductivity(state: StateArray, mu: Optional[np.ndarray] = None,
+                         critical_enhancement: bool = True) -> np.ndarray:
+    """
+    Thermal conductivity of the industrial formulation of [7].
+    Args:
+        state: StateArray with rho, T, cp, cv and kappa_T, e.g. returned by a region kernel.
+        mu: Viscosity of the state (Pa*s), if already known. Only used by the critical enhancement.
+        critical_enhancement: Include the critical enhancement lambda_2. Without it, the conductivity is that of the
+            verification values of Table 4 of [7].
+    Returns:
+        The thermal conductivity (W/(m*K)), with one entry per point of the state.
+    """
+    T_bar, rho_bar = np.asarray(state.T) / T_c, np.asarray(state.rho) / rho_c
+    mu_bar = None
+    if critical_enhancement:
+        mu_bar = _mu_bar(T_bar, rho_bar) if mu is None else np.asarray(mu) / mu_star
+    return lambda_star * _lambda_bar(state, T_bar, rho_bar, mu_bar, critical_enhancement)
+
+
+def transport(state: StateArray) -> Transport:
+    """
+    Viscosity and thermal conductivity of a state in one pass, the viscosity being shared by the critical enhancement
+    of the conductivity.
+    Args:
+        state: StateArray with rho, T, cp, cv and kappa_T, e.g. returned by a region kernel.
+    Returns:
+        The Transport properties, with one entry per point of the state.
+    """
+    T_bar, rho_bar = np.asarray(state.T) / T_c, np.asarray(state.rho) / rho_c
+    mu_bar = _mu_bar(T_bar, rho_bar)
+    return Transport(mu_star * mu_bar, lambda_star * _lambda_bar(state, T_bar, rho_bar, mu_bar, True))
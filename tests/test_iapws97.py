@@ -1,9 +1,19 @@
+import csv
+import functools
+import os
+import tempfile
 import unittest
+from unittest import mock
 from iapws.iapws97.region1 import Region1
 from iapws.iapws97.region2 import Region2
 from iapws.iapws97.region3 import Region3
 from iapws.iapws97.region4 import Region4
-from iapws.iapws97._utils import b23, _p_s, State, _hpp_2ab, _hpp_2c3b, _h_b13, _T_b23, _hp_1, _hp_3a
+from iapws.iapws97.region5 import Region5
+from iapws.iapws97._utils import b23, _p_s, State, _hpp_2ab, _hpp_2c3b, _h_b13, _T_b23, _hp_1, _hp_3a, region, StateArray, \
+    Derivatives, region_hs, _poly, _poly_ders
+from iapws.iapws97.handle import IAPWS97
+from iapws.iapws97 import batch, stream, derivatives, grid, solvers, instrumentation, flash, benchmark, taylor, \
+    transport, saturation, _utils
 import numpy as np
 
 # TODO: Maybe increase precision to X after comma with X the number of digits after comma of the data values.
@@ -86,6 +96,51 @@ class GeneralTests(unittest.TestCase):
         for s, h in zip(ss, hs):
             self.assertAlmostEqual(_hp_3a(s), h, places=5)
 
+    def test_region_pT(self):
+        pees = [3, 80, 0.0035, 30, 25, 50, 1, 60, 1]
+        tees = [300, 300, 700, 700, 650, 2000, 200, 2000, 2300]
+        codes = [1, 1, 2, 2, 3, 5, 0, 0, 0]
+
+        np.testing.assert_array_equal(region(pees, tees), codes)
+        self.assertEqual(region(3, 300), 1)
+        self.assertEqual(region(30, 1500), 5)
+        self.assertRaises(ValueError, region, p=1, T=200)
+        self.assertRaises(ValueError, region, p=60, T=2000)
+
+    def test_region_hs(self):
+        # Check points of the backward equations p(h, s) of every region and of T_sat(h, s), then points out of bounds.
+        hs = [90, 1500, 2800, 4100, 3600, 2800, 1700, 2100, 2600, 2700, 1800, 2400, 3000, -100, 4000, 2700, 2600]
+        ss = [0, 3.4, 6.5, 9.5, 6, 5.1, 3.8, 4.3, 5.1, 5.0, 5.3, 6.0, 13, 3, 5, 5.15, 5.2]
+        codes = [1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 0, 0, 0, 2, 3]
+
+        np.testing.assert_array_equal(region_hs(hs, ss), codes)
+        self.assertEqual(region_hs(3000, 7), 2)
+
+    def test_region_hs_matches_region_pT(self):
+        pees, tees = np.meshgrid(np.geomspace(0.001, 99.9, 40), np.linspace(273.5, 1073, 40))
+        pees, tees = pees.ravel(), tees.ravel()
+        codes = region(pees, tees)
+        h, s = np.full(pees.shape, np.nan), np.full(pees.shape, np.nan)
+        for code, kernel in ((1, Region1), (2, Region2)):
+            mask = codes == code
+            state = kernel.evaluate(tees[mask], pees[mask])
+            h[mask], s[mask] = state.h, state.s
+        mask = codes == 3
+        state = solvers.solve_pT(pees[mask], tees[mask]).state
+        h[mask], s[mask] = state.h, state.s
+
+        np.testing.assert_array_equal(region_hs(h, s), codes)
+
+    def test_region_p_scalar(self):
+        # The float classifier of `IAPWS97.update` against the vectorized one, on (p, h) and (p, s) points.
+        rng = np.random.default_rng(0)
+        pees = np.concatenate([rng.uniform(0, 110, 2000), rng.uniform(15, 25, 1000)])
+        for name, low, high in (('h', -100, 7500), ('s', -1, 14)):
+            zs = rng.uniform(low, high, pees.shape)
+            expected = batch._region_p(pees, name, zs)
+            self.assertEqual([batch._region_p_scalar(p, name, z) for p, z in zip(pees.tolist(), zs.tolist())],
+                             list(expected))
+
 class TestRegion1(unittest.TestCase):
 
     def test_range_validity(self):
@@ -167,6 +222,18 @@ class TestRegion1(unittest.TestCase):
             p = [r.v, r.h, r.u, r.s, r.cp, r.w]
             np.testing.assert_almost_equal(properties, p, decimal=5)
 
+    def test_evaluate(self):
+        """Test the vectorized kernel against Table 5."""
+        table5 = np.array([[0.100215168e-2, 0.971180894e-3, 0.120241800e-2],
+                           [0.115331273e3, 0.184142828e3, 0.975542239e3],
+                           [0.112324818e3, 0.106448356e3, 0.971934985e3],
+                           [0.392294792, 0.368563852, 0.258041912e1],
+                           [0.417301218e1, 0.401008987e1, 0.465580682e1],
+                           [0.150773921e4, 0.163469054e4, 0.124071337e4]])
+
+        r = Region1.evaluate(T=[300, 300, 500], p=[3, 80, 3])
+        np.testing.assert_almost_equal(table5, [r.v, r.h, r.u, r.s, r.cp, r.w], decimal=5)
+
 class TestRegion2(unittest.TestCase):
 
     def test_range_validity(self):
@@ -331,6 +398,36 @@ class TestRegion2(unittest.TestCase):
             p = [r.v, r.h, r.u, r.s, r.cp, r.w]
             np.testing.assert_almost_equal(properties, p, decimal=5)
 
+    def test_evaluate(self):
+        """Test the vectorized kernel against Table 15."""
+        table15 = np.array([[0.394913866e2, 0.923015898e2, 0.542946619e-2],
+                           [0.254991145e4, 0.333568375e4, 0.263149474e4],
+                           [0.241169160e4, 0.301262819e4, 0.246861076e4],
+                           [0.852238967e1, 0.101749996e2, 0.517540298e1],
+                           [0.191300162e1, 0.208141274e1, 0.103505092e2],
+                           [0.427920172e3, 0.644289068e3, 0.480386523e3]])
+
+        r = Region2.evaluate(T=[300, 700, 700], p=[0.0035, 0.0035, 30])
+        np.testing.assert_almost_equal(table15, [r.v, r.h, r.u, r.s, r.cp, r.w], decimal=5)
+
+    def test_metastable(self):
+        """Test the metastable-vapour equation against Table 18."""
+        table18 = np.array([[0.192516540, 0.186212297, 0.121685206],
+                            [0.276881115e4, 0.274015123e4, 0.272134539e4],
+                            [0.257629461e4, 0.255393894e4, 0.253881758e4],
+                            [0.656660377e1, 0.650218759e1, 0.629170440e1],
+                            [0.276349265e1, 0.298166443e1, 0.362795578e1],
+                            [0.498408101e3, 0.489363295e3, 0.481941819e3]])
+
+        r = Region2.evaluate(T=[450, 440, 450], p=[1, 1, 1.5], metastable=True)
+        np.testing.assert_allclose([r.v, r.h, r.u, r.s, r.cp, r.w], table18, rtol=1e-8)
+        np.testing.assert_allclose(derivatives.partial(r, 'h', 'T', 'p'), r.cp)
+
+        r = Region2(T=450, p=1, metastable=True)
+        np.testing.assert_allclose([r.v, r.h, r.u, r.s, r.cp, r.w], table18[:, 0], rtol=1e-8)
+        self.assertNotAlmostEqual(Region2(T=450, p=1).h, r.h, places=3)
+        self.assertRaises(ValueError, Region2, p=1, h=2768, metastable=True)
+
 class TestRegion3(unittest.TestCase):
 
     def test_h_3ab(self):
@@ -514,6 +611,39 @@ class TestRegion3(unittest.TestCase):
             np.testing.assert_almost_equal(properties, p, decimal=5)
 
 
+    def test_evaluate(self):
+        """Test the vectorized kernel against Table 33."""
+        table33 = np.array([[0.255837018e2, 0.222930643e2, 0.783095639e2],
+                            [0.186343019e4, 0.237512401e4, 0.225868845e4],
+                            [0.181226279e4, 0.226365868e4, 0.210206932e4],
+                            [0.405427273e1, 0.485438792e1, 0.446971906e1],
+                            [0.138935717e2, 0.446579342e2, 0.634165359e1],
+                            [0.502005554e3, 0.383444594e3, 0.760696041e3]])
+
+        r = Region3.evaluate(T=[650, 650, 750], rho=[500, 200, 500])
+        np.testing.assert_allclose([r.p, r.h, r.u, r.s, r.cp, r.w], table33, rtol=1e-8)
+
+        # On floats, the kernel overwrites the given State and its derivatives.
+        out = State(ders=Derivatives())
+        for column, (T, rho) in enumerate([(650, 500), (650, 200), (750, 500)]):
+            self.assertIs(Region3.evaluate(float(T), float(rho), out=out), out)
+            self.assertIsInstance(out.p, float)
+            np.testing.assert_allclose([out.p, out.h, out.u, out.s, out.cp, out.w], table33[:, column], rtol=1e-8)
+            self.assertEqual(set(out.ders), set(r.ders))
+            for key, values in r.ders.items():
+                self.assertAlmostEqual(out.ders[key], values[column], delta=1e-12 * abs(values[column]))
+
+    def test_subregion_v_pT_scalar(self):
+        # The scalar selection agrees with the vectorized one, near the critical point and out of Region3 too.
+        pees, tees = np.meshgrid(np.linspace(16, 101, 120), np.linspace(620, 870, 120))
+        near_pees, near_tees = np.meshgrid(np.linspace(21, 23, 60), np.linspace(640, 650, 60))
+        pees = np.concatenate([pees.ravel(), near_pees.ravel()])
+        tees = np.concatenate([tees.ravel(), near_tees.ravel()])
+        expected = Region3._subregions_v_pT(pees, tees)
+
+        self.assertEqual([Region3._subregion_v_pT(p, T) for p, T in zip(pees.tolist(), tees.tolist())], list(expected))
+
+
 class TestRegion4(unittest.TestCase):
 
     def test_range_validity(self):
@@ -566,5 +696,907 @@ class TestRegion4(unittest.TestCase):
             self.assertAlmostEqual(Region4().T_sat(h=h, s=s), t, places=5)
 
 
+class TestRegion5(unittest.TestCase):
+    # Table 42.
+    table42 = np.array([[0.138455090e1, 0.230761299e-1, 0.311385219e-1],
+                        [0.521976855e4, 0.516723514e4, 0.657122604e4],
+                        [0.452749310e4, 0.447495124e4, 0.563707038e4],
+                        [0.965408875e1, 0.772970133e1, 0.853640523e1],
+                        [0.261609445e1, 0.272724317e1, 0.288569882e1],
+                        [0.917068690e3, 0.928548002e3, 0.106736948e4]])
+
+    def test_range_validity(self):
+        self.assertTrue(State(T=1500, p=0.5) in Region5())
+        self.assertTrue(State(T=2000, p=50) in Region5())
+        self.assertFalse(State(T=1000, p=30) in Region5())
+        self.assertFalse(State(T=2000, p=60) in Region5())
+
+    def test_property_accuracy(self):
+        for (T, p), properties in zip([(1500, 0.5), (1500, 30), (2000, 30)], self.table42.T):
+            r = Region5(T=T, p=p)
+            np.testing.assert_allclose([r.v, r.h, r.u, r.s, r.cp, r.w], properties, rtol=1e-8)
+
+    def test_evaluate(self):
+        """Test the vectorized kernel against Table 42."""
+        r = Region5.evaluate(T=[1500, 1500, 2000], p=[0.5, 30, 30])
+        np.testing.assert_allclose([r.v, r.h, r.u, r.s, r.cp, r.w], self.table42, rtol=1e-8)
+        np.testing.assert_allclose(derivatives.partial(r, 'h', 'T', 'p'), r.cp)
+
+    def test_backwards_t_ph_t_ps(self):
+        pees = [0.5, 30, 30]
+        tees = [1500, 1500, 2000]
+
+        np.testing.assert_allclose(Region5._T_ph(pees, self.table42[1]), tees, rtol=1e-8)
+        np.testing.assert_allclose(Region5._T_ps(pees, self.table42[3]), tees, rtol=1e-8)
+        self.assertAlmostEqual(Region5(p=30, h=0.657122604e4).T, 2000, places=5)
+        self.assertAlmostEqual(Region5(p=0.5, s=0.965408875e1).T, 1500, places=5)
+        self.assertRaises(ValueError, Region5().T_ph, 30, 3000)
+
+    def test_dispatch(self):
+        pees = [0.5, 3, 30, 0.0035, 30]
+        tees = [1500, 300, 2000, 700, 1500]
+
+        r = batch.evaluate(pees, T=tees)
+        np.testing.assert_allclose(r.v[[0, 2, 4]], self.table42[0, [0, 2, 1]], rtol=1e-8)
+        np.testing.assert_allclose(batch.evaluate(pees, h=r.h).T[[0, 2, 4]], [1500, 2000, 1500], rtol=1e-12)
+        np.testing.assert_array_equal(flash.flash_ph(pees, r.h).region, [5, 1, 5, 2, 5])
+        self.assertEqual(IAPWS97(p=30, T=2000).region, 5)
+        self.assertAlmostEqual(IAPWS97(p=30, h=0.657122604e4).T, 2000, places=5)
+        self.assertRaises(ValueError, IAPWS97, p=60, T=2000)
+
+
+class TestState(unittest.TestCase):
+
+    def test_slots(self):
+        state = IAPWS97(p=0.0035, T=700).state
+
+        self.assertFalse(hasattr(state, '__dict__'))
+        self.assertFalse(hasattr(state.ders, '__dict__'))
+        self.assertRaises(AttributeError, setattr, state, 'enthalpy', 1)
+        self.assertEqual(State(T=300, p=3), State(p=3, T=300))
+        self.assertNotEqual(State(T=300, p=3), State(T=300, p=4))
+
+    def test_derivatives(self):
+        ders = Derivatives(gamma=1.5, gamma_pi=2.)
+
+        self.assertEqual(ders['gamma_pi'], ders.gamma_pi)
+        self.assertEqual(ders['gamma_tau'], 0)
+        self.assertEqual(ders.get('gamma_tau', 3), 3)
+        self.assertTrue('gamma' in ders)
+        self.assertFalse('phi' in ders)
+        self.assertEqual(dict(ders.items()), {'gamma': 1.5, 'gamma_pi': 2.})
+        self.assertRaises(KeyError, ders.__setitem__, 'gamma_p', 1)
+        ders.clear()
+        self.assertEqual(len(ders), 0)
+
+
+class TestIAPWS97(unittest.TestCase):
+
+    def test_dispatch_pT(self):
+        # Tables 5, 15 and table 5 of [3].
+        pees = [3, 0.0035, 50, 21.1]
+        tees = [300, 700, 630, 644]
+        regions = [1, 2, 3, 3]
+        vs = [0.100215168e-2, 0.923015898e2, 1.470853100e-3, 5.251009921e-3]
+
+        for p, T, reg, v in zip(pees, tees, regions, vs):
+            r = IAPWS97(p=p, T=T)
+            self.assertEqual(r.region, reg)
+            self.assertAlmostEqual(r.v / v, 1, places=8)
+            self.assertEqual((r.p, r.T), (p, T))
+
+    def test_dispatch_ph(self):
+        # Table 7, table 24 and table 5 of [4].
+        pees = [3, 0.001, 20, 100]
+        hs = [500, 3000, 1700, 2700]
+        tees = [0.391_798_509e3, 0.534433241e3, 6.293083892e2, 8.420460876e2]
+
+        for p, h, T in zip(pees, hs, tees):
+            r = IAPWS97(p=p, h=h)
+            self.assertAlmostEqual(r.T, T, places=5)
+            self.assertEqual(r.h, h)
+
+    def test_dispatch_other_pairs(self):
+        # States of every region given by any two of p, T, h and s, against their (p, T) evaluation.
+        handle = IAPWS97()
+        for p, T, code in [(3, 300, 1), (80, 500, 1), (0.0035, 700, 2), (30, 700, 2), (10, 1000, 2), (25, 650, 3),
+                           (50, 700, 3), (30, 2000, 5), (0.5, 1500, 5)]:
+            # Consistent, so that the Region3 states match their pressure too.
+            expected = IAPWS97(p=p, T=T, consistent=True)
+            for pair in ('ps', 'Th', 'Ts', 'hs'):
+                if pair == 'hs' and code == 5:
+                    continue
+                with self.subTest(p=p, T=T, pair=pair):
+                    values = {name: getattr(expected, name) for name in pair}
+                    r = IAPWS97(**values)
+                    self.assertEqual(r.region, code)
+                    self.assertEqual([getattr(r, name) for name in pair], list(values.values()))
+                    if pair == 'ps' or pair == 'hs' and code != 3:
+                        # The backward equations, within their permissible deviations.
+                        self.assertAlmostEqual(r.T, T, delta=0.05)
+                        self.assertAlmostEqual(r.p / p, 1, places=3)
+                    else:
+                        self.assertAlmostEqual(r.T / T, 1, places=8)
+                        self.assertAlmostEqual(r.p / p, 1, places=8)
+
+                    handle.update(pair, *values.values())
+                    for name in StateArray.columns:
+                        if name != 'x':
+                            self.assertEqual(getattr(handle.state, name), getattr(r.state, name))
+
+                    r = IAPWS97(consistent=True, **values)
+                    self.assertAlmostEqual(r.T / T, 1, places=8)
+                    self.assertAlmostEqual(r.p / p, 1, places=8)
+
+    def test_regions_use_kernels(self):
+        self.assertAlmostEqual(Region1(p=3, h=500).T, 0.391_798_509e3, places=5)
+        self.assertAlmostEqual(Region2(p=0.001, h=3000).T, 0.534433241e3, places=5)
+        self.assertEqual(Region2(p=0.0035, T=700)._state.ders['gammaR_pi'],
+                         Region2.evaluate(700, 0.0035).ders['gammaR_pi'])
+
+    def test_update(self):
+        handle = IAPWS97()
+        state = handle.state
+        handle.update('pT', 3, 300)
+        ders = state.ders
+
+        for pair, p, y in [('pT', 0.0035, 700), ('ph', 20, 1700), ('pT', 3, 500)]:
+            handle.update(pair, p, y)
+            expected = IAPWS97(p=p, **{pair[1]: y})
+            self.assertIs(handle.state, state)
+            self.assertIs(handle.state.ders, ders)
+            self.assertEqual(handle.region, expected.region)
+            self.assertEqual(handle.state, expected.state)
+
+        self.assertRaises(ValueError, handle.update, 'pv', 3, 1)
+        self.assertRaises(ValueError, handle.update, 'pT', 1, 200)
+        self.assertRaises(ValueError, handle.update, 'Th', 500, 2000)
+        self.assertEqual(handle.T, 500)
+
+    def test_update_scalar_path(self):
+        # Tables 5, 15 and 42: the scalar path of Region1, Region2 and Region5 against the kernels.
+        handle = IAPWS97()
+        for p, T in [(3, 300), (80, 300), (3, 500), (0.0035, 300), (0.0035, 700), (30, 700), (0.5, 1500),
+                     (30, 1500), (30, 2000), (3, 300)]:
+            handle.update('pT', p, T)
+            expected = batch._evaluate_region(handle.region, 'pT', np.asarray(p, dtype=float),
+                                              np.asarray(T, dtype=float)).point()
+            for name in StateArray.columns:
+                if name != 'x':
+                    self.assertIsInstance(getattr(handle.state, name), float)
+                    self.assertAlmostEqual(getattr(handle.state, name) / getattr(expected, name), 1, places=12)
+            # The derivatives of the previous region are cleared: (3, 300) follows a Region5 point.
+            self.assertEqual(set(handle.state.ders), set(expected.ders))
+            for key, value in expected.ders.items():
+                self.assertAlmostEqual(handle.state.ders[key], value, delta=1e-12 * abs(value))
+        self.assertIs(_utils.IAPWS97, IAPWS97)
+
+    def test_update_scalar_classifiers(self):
+        # Region3 (p, T) and every region in (p, h) run on floats too, without StateArrays, and agree with `batch`.
+        handle = IAPWS97()
+        points = [('pT', 25, 650), ('pT', 50, 630), ('pT', 21.1, 644), ('pT', 22.1, 647), ('ph', 3, 500),
+                  ('ph', 0.001, 3000), ('ph', 20, 1700), ('ph', 100, 2700), ('ph', 20, 1800), ('ph', 30, 5500)]
+        with mock.patch.object(StateArray, '__init__', side_effect=AssertionError('StateArray created')):
+            for pair, p, y in points:
+                handle.update(pair, p, y)
+        for pair, p, y in points:
+            handle.update(pair, p, y)
+            expected = batch.evaluate(p, **{pair[1]: y})
+            self.assertEqual(handle.region, int(batch._classify(pair, np.asarray(p), np.asarray(y))))
+            for name in StateArray.columns:
+                if name != 'x':
+                    np.testing.assert_allclose(getattr(handle.state, name), getattr(expected, name)[0], rtol=1e-10)
+
+    def test_exception(self):
+        self.assertRaises(ValueError, IAPWS97, p=1, h=1500)
+        self.assertRaises(ValueError, IAPWS97, p=1, T=200)
+        self.assertRaises(ValueError, IAPWS97, T=300, h=100)
+        self.assertRaises(ValueError, IAPWS97, p=1, T=300, h=100)
+        self.assertRaises(ValueError, IAPWS97, p=1, s=6.5)
+        self.assertRaises(ValueError, IAPWS97, T=3000, s=7)
+        self.assertRaises(ValueError, IAPWS97, h=2600, s=6)
+        self.assertRaises(ValueError, IAPWS97, p=1)
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_evaluate_pT(self):
+        # Tables 5 and 15, shuffled so that regions are mixed.
+        pees = [0.0035, 3, 30, 80, 0.0035, 3]
+        tees = [300, 300, 700, 300, 700, 500]
+        hs = [0.254991145e4, 0.115331273e3, 0.263149474e4, 0.184142828e3, 0.333568375e4, 0.975542239e3]
+
+        for sort_regions in (True, False):
+            r = batch.evaluate(pees, T=tees, workers=2, chunk_size=2, sort_regions=sort_regions)
+            np.testing.assert_almost_equal(r.h, hs, decimal=5)
+
+    def test_evaluate_ph(self):
+        # Table 7 and table 24, plus a point in the two-phase region.
+        pees = [3, 0.001, 80, 5, 60, 80, 1]
+        hs = [500, 3000, 500, 3500, 2700, 1500, 1500]
+        tees = [0.391_798_509e3, 0.534433241e3, 0.378_108_626e3, 0.801299102e3, 0.791137067e3, 0.611_041_229e3, np.nan]
+
+        r = batch.evaluate(pees, h=hs, workers=3, chunk_size=3)
+        np.testing.assert_almost_equal(r.T, tees, decimal=5)
+        np.testing.assert_array_equal(r.h[:-1], hs[:-1])
+
+    def test_evaluate_in_process(self):
+        pees = np.random.uniform(0.01, 100, 1000)
+        tees = np.random.uniform(280, 1070, 1000)
+
+        np.testing.assert_array_equal(batch.evaluate(pees, T=tees, workers=1).h,
+                                      batch.evaluate(pees, T=tees, workers=2, chunk_size=100).h)
+
+    def test_evaluate_threads(self):
+        pees = np.random.uniform(0.01, 100, 1000)
+        hs = np.random.uniform(100, 4000, 1000)
+
+        for sort_regions in (True, False):
+            np.testing.assert_array_equal(batch.evaluate(pees, h=hs, workers=1).T,
+                                          batch.evaluate(pees, h=hs, workers=4, chunk_size=64, backend='thread',
+                                                         sort_regions=sort_regions).T)
+
+    def test_evaluate_mixed_regions(self):
+        # Tables 5 and 15 and table 5 of [3] (Region3 subregions a, c, r and v), shuffled.
+        pees = [50, 3, 20, 0.0035, 21.1, 80, 22.3]
+        tees = [630, 300, 630, 700, 644, 300, 647.9]
+        vs = [1.470853100e-3, 0.100215168e-2, 1.761696406e-3, 0.923015898e2, 5.251009921e-3, 0.971180894e-3,
+              2.811424405e-3]
+
+        r = IAPWS97.evaluate(pees, T=tees)
+        np.testing.assert_allclose(r.v, vs, rtol=1e-8)
+        np.testing.assert_array_equal(r.p, pees)
+        np.testing.assert_array_equal(r.h, batch.evaluate(pees, T=tees, workers=2, chunk_size=3).h)
+
+    def test_evaluate_region3_ph(self):
+        # Tables 5 and 8 of [4].
+        pees = [20, 50, 100, 20, 50, 100]
+        hs = [1700, 2000, 2100, 2500, 2400, 2700]
+        tees = [6.293083892e2, 6.905718338e2, 7.336163014e2, 6.418418053e2, 7.351848618e2, 8.420460876e2]
+        vs = [1.749903962e-3, 1.908139035e-3, 1.676229776e-3, 6.670547043e-3, 2.801244590e-3, 2.404234998e-3]
+
+        r = IAPWS97.evaluate(pees, h=hs)
+        np.testing.assert_allclose(r.T, tees, rtol=1e-9)
+        np.testing.assert_allclose(r.v, vs, rtol=1e-9)
+
+    def test_evaluate_out(self):
+        pees = np.random.uniform(0.01, 100, 1000)
+        tees = np.random.uniform(280, 1070, 1000)
+        expected = batch.evaluate(pees, T=tees, workers=1)
+
+        out = StateArray.empty(1000)
+        for kwargs in (dict(workers=1), dict(workers=2, chunk_size=300),
+                       dict(workers=2, chunk_size=300, backend='thread')):
+            out.h[:] = 0
+            self.assertIs(batch.evaluate(pees, T=tees, out=out, **kwargs), out)
+            np.testing.assert_array_equal(out.h, expected.h)
+        self.assertRaises(ValueError, batch.evaluate, pees, T=tees, out=StateArray.empty(10))
+
+    def test_evaluate_exception(self):
+        self.assertRaises(ValueError, batch.evaluate, 1, T=300, h=100)
+        self.assertRaises(ValueError, batch.evaluate, 1, T=300, backend='gpu')
+
+    def test_evaluate_dedup(self):
+        # Runs of stuck readings and a repeated setpoint, plus a point out of bounds.
+        pees = np.repeat(np.random.uniform(0.01, 100, 50), 8)
+        tees = np.repeat(np.random.uniform(280, 1070, 50), 8)
+        pees[::10], tees[::10] = 3, 300
+        pees[7] = 200
+        expected = batch.evaluate(pees, T=tees, workers=1)
+
+        instrumentation.reset()
+        for kwargs in (dict(workers=1), dict(workers=2, chunk_size=30, backend='thread')):
+            r = batch.evaluate(pees, T=tees, dedup=True, **kwargs)
+            for name in StateArray.columns:
+                np.testing.assert_array_equal(getattr(r, name), getattr(expected, name))
+        unique = len(set(zip(pees, tees)))
+        self.assertEqual(instrumentation.snapshot()['dedup'], dict(calls=2, points=800, evaluations=2 * unique,
+                                                                  failures=0))
+        self.assertAlmostEqual(instrumentation.ratio('dedup'), 400 / unique)
+
+        out = StateArray.empty(400)
+        self.assertIs(batch.evaluate(pees, T=tees, workers=1, dedup=True, out=out), out)
+        np.testing.assert_array_equal(out.h, expected.h)
+        np.testing.assert_array_equal(batch.evaluate(pees, h=expected.h, workers=1, dedup=True).T,
+                                      batch.evaluate(pees, h=expected.h, workers=1).T)
+
+
+class TestStream(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.dir.name, 'historian.csv')
+        with open(self.source, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', 'tag', 'p', 'T'])
+            writer.writerows([['2020-01-01 00:00', 'FW', 3, 300],
+                              ['2020-01-01 00:01', 'FW', 80, 300],
+                              ['2020-01-01 00:02', 'MS', 0.0035, 700],
+                              ['2020-01-01 00:03', 'MS', 30, 700],
+                              ['2020-01-01 00:04', 'FW', 3, 500]])
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_read_chunks(self):
+        chunks = list(stream.read(self.source, chunk_size=2))
+
+        self.assertEqual([len(chunk['p']) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(chunks[1]['tag'].tolist(), ['MS', 'MS'])
+        np.testing.assert_array_equal(chunks[2]['T'], [500])
+
+    def test_run(self):
+        destination = os.path.join(self.dir.name, 'enriched.csv')
+        rows = stream.run(self.source, destination, chunk_size=2)
+
+        with open(destination, newline='') as f:
+            records = list(csv.DictReader(f))
+        self.assertEqual(rows, 5)
+        self.assertEqual([r['timestamp'] for r in records][-1], '2020-01-01 00:04')
+        np.testing.assert_almost_equal([float(r['h']) for r in records],
+                                       [0.115331273e3, 0.184142828e3, 0.333568375e4, 0.263149474e4, 0.975542239e3],
+                                       decimal=5)
+
+    def test_run_bad_cells(self):
+        source = os.path.join(self.dir.name, 'gaps.csv')
+        with open(source, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', 'p', 'T'])
+            writer.writerows([['2020-01-01 00:00', 3, 300],
+                              ['2020-01-01 00:01', '', 300],
+                              ['2020-01-01 00:02', 3, 'Bad Input'],
+                              ['2020-01-01 00:03', 3, 500],
+                              ['2020-01-01 00:04', 3]])
+        destination = os.path.join(self.dir.name, 'enriched.csv')
+
+        self.assertEqual(stream.run(source, destination, chunk_size=2), 5)
+        with open(destination, newline='') as f:
+            h = [float(r['h']) for r in csv.DictReader(f)]
+        np.testing.assert_almost_equal(h, [0.115331273e3, np.nan, np.nan, 0.975542239e3, np.nan], decimal=5)
+
+    def test_enrich_single_pool(self):
+        chunks = [chunk for chunk in stream.read(self.source, chunk_size=2)]
+        for backend in batch.BACKENDS:
+            with mock.patch.object(batch, 'executor', wraps=batch.executor) as pools:
+                r = list(stream.enrich([dict(chunk) for chunk in chunks], workers=2, chunk_size=1, backend=backend))
+            self.assertEqual(pools.call_count, 1)
+            np.testing.assert_almost_equal(np.concatenate([chunk['h'] for chunk in r]),
+                                           [0.115331273e3, 0.184142828e3, 0.333568375e4, 0.263149474e4,
+                                            0.975542239e3], decimal=5)
+
+    def test_enrich_exception(self):
+        chunks = [{'p': np.array([1.]), 'T': np.array([300.]), 'h': np.array([100.])}]
+        self.assertRaises(ValueError, list, stream.enrich(chunks))
+
+
+class TestDerivatives(unittest.TestCase):
+
+    def test_cp_cv(self):
+        r1 = Region1.evaluate(T=[300, 500], p=[3, 3])
+        r3 = Region3.evaluate(T=[650, 750], rho=[500, 500])
+
+        np.testing.assert_allclose(derivatives.partial(r1, 'h', 'T', 'p'), r1.cp)
+        np.testing.assert_allclose(derivatives.partial(r1, 'u', 'T', 'v'), r1.cv)
+        np.testing.assert_allclose(derivatives.partial(r3, 'h', 'T', 'p'), r3.cp)
+        np.testing.assert_allclose(derivatives.partial(r3, 's', 'T', 'rho') * r3.T, r3.cv)
+
+    def test_against_finite_differences(self):
+        eps = 1e-6
+        for kernel, T, p in [(Region1, 300., 3.), (Region2, 700., 0.0035)]:
+            state = kernel.evaluate(T, p)
+            up, down = kernel.evaluate(T, p + eps), kernel.evaluate(T, p - eps)
+
+            self.assertAlmostEqual(derivatives.partial(state, 'h', 'p', 'T'), (up.h - down.h) / (2 * eps), places=4)
+            self.assertAlmostEqual(derivatives.partial(state, 's', 'p', 'T'), (up.s - down.s) / (2 * eps), places=4)
+
+        state = Region3.evaluate(650, 500)
+        up, down = Region3.evaluate(650, 500 + eps), Region3.evaluate(650, 500 - eps)
+        np.testing.assert_allclose(derivatives.partial(state, 'rho', 'p', 'T'), 2 * eps / (up.p - down.p), rtol=1e-5)
+        np.testing.assert_allclose(derivatives.partial(state, 'h', 'rho', 'T'), (up.h - down.h) / (2 * eps), rtol=1e-5)
+
+    def test_derived_properties(self):
+        for state in (Region1.evaluate(T=[300, 500], p=[3, 80]), Region2.evaluate(T=[700, 400], p=[5, 0.1]),
+                      Region3.evaluate(T=[650, 750], rho=[500, 200])):
+            np.testing.assert_allclose(state.alpha_v, derivatives.partial(state, 'v', 'T', 'p') / state.v, rtol=1e-12)
+            np.testing.assert_allclose(state.kappa_T, -derivatives.partial(state, 'v', 'p', 'T') / state.v, rtol=1e-12)
+            np.testing.assert_allclose(state.mu_JT, derivatives.partial(state, 'T', 'p', 'h'), rtol=1e-12)
+            np.testing.assert_allclose(state.kappa, -state.v / state.p * derivatives.partial(state, 'p', 'v', 's'),
+                                       rtol=1e-12)
+            np.testing.assert_allclose(state.dpdT_v, derivatives.partial(state, 'p', 'T', 'v'), rtol=1e-12)
+
+        # Liquid water at 300 K, steam close to an ideal gas (isentropic exponent of about 1.3).
+        r = Region1(p=3, T=300)
+        self.assertAlmostEqual(r.alpha_v, 2.77e-4, places=6)
+        self.assertAlmostEqual(r.kappa_T, 4.46e-4, places=6)
+        self.assertLess(r.mu_JT, 0)
+        self.assertAlmostEqual(Region2(p=0.1, T=400).kappa, 1.32, places=2)
+
+        state = batch.evaluate([3, 0.1], T=[300, 400], workers=1)
+        np.testing.assert_allclose(state.mu_JT, [r.mu_JT, Region2(p=0.1, T=400).mu_JT])
+        self.assertTrue(np.isnan(flash.flash_ph(1, 2000).state.kappa_T))
+
+    def test_partial_exception(self):
+        state = Region1.evaluate(300, 3)
+        self.assertRaises(ValueError, derivatives.partial, state, 'cp', 'p', 'T')
+        self.assertRaises(ValueError, derivatives.partial, batch.evaluate(3, T=300), 'h', 'p', 'T')
+
+
+class TestGrid(unittest.TestCase):
+
+    def test_sweep_isobar(self):
+        # Tables 5 and 15 at p = 3 MPa, plus a Region2 point checked against batch and one in Region5, out of the grid.
+        tees = [300, 500, 700, 1200]
+        r = grid.sweep_isobar(3, tees)
+
+        np.testing.assert_almost_equal(r.h[:2], [0.115331273e3, 0.975542239e3], decimal=5)
+        np.testing.assert_almost_equal(r.cp[:2], [0.417301218e1, 0.465580682e1], decimal=8)
+        np.testing.assert_allclose(r.h[2], batch.evaluate(3, T=700).h)
+        self.assertTrue(np.isnan(r.h[3]))
+
+    def test_sweep_isotherm(self):
+        pees = [0.0035, 3, 30, 50, 80]
+        r = grid.sweep_isotherm(700, pees)
+        expected = batch.evaluate(pees[:3], T=700)
+
+        for name in StateArray.columns:
+            np.testing.assert_allclose(getattr(r, name)[:3], getattr(expected, name), rtol=1e-12)
+        # Region3.
+        self.assertTrue(np.isnan(r.h[3:]).all())
+
+    def test_evaluate_grid(self):
+        pees = np.linspace(0.01, 100, 30)
+        tees = np.linspace(280, 1070, 40)
+        r = grid.evaluate_grid(pees, tees)
+        p_mesh, T_mesh = np.meshgrid(pees, tees, indexing='ij')
+        mask = np.isin(region(p_mesh, T_mesh), (1, 2))
+        expected = batch.evaluate(p_mesh[mask], T=T_mesh[mask])
+
+        self.assertEqual(r.h.shape, (30, 40))
+        self.assertTrue(np.isnan(r.h[~mask]).all())
+        for name in StateArray.columns:
+            np.testing.assert_allclose(getattr(r, name)[mask], getattr(expected, name), rtol=1e-10)
+        np.testing.assert_allclose(derivatives.partial(r, 'h', 'T', 'p'), r.cp)
+
+
+class TestSolvers(unittest.TestCase):
+
+    def test_round_trip(self):
+        # Forward states of Regions 1, 2 and 3, recovered from their (p, h) and (p, s) pairs.
+        cases = ((1, Region1.evaluate(np.linspace(280, 600, 20), 50)),
+                 (2, Region2.evaluate(np.linspace(700, 1000, 20), np.linspace(0.1, 15, 20))),
+                 (3, Region3.evaluate(np.linspace(630, 700, 20), np.linspace(200, 600, 20))))
+        for code, state in cases:
+            for solve, name in ((solvers.solve_ph, 'h'), (solvers.solve_ps, 's')):
+                r = solve(code, state.p, getattr(state, name))
+                self.assertTrue(r.converged.all())
+                self.assertTrue((r.iterations <= 3).all())
+                np.testing.assert_allclose(r.state.T, state.T, rtol=1e-12)
+                np.testing.assert_allclose(r.state.v, state.v, rtol=1e-12)
+                np.testing.assert_allclose(getattr(r.state, name), getattr(state, name), rtol=1e-14)
+
+    def test_refines_backward_equations(self):
+        # Table 7: the backward equation is only within mK of the forward equation.
+        T_back = Region1().T_ph(3, 500)
+        T = Region1().T_ph(3, 500, consistent=True)
+        self.assertAlmostEqual(T, 0.391_798_509e3, places=1)
+        self.assertNotEqual(T, T_back)
+        self.assertAlmostEqual(Region1.evaluate(T, 3).h, 500, places=10)
+        self.assertAlmostEqual(Region2.evaluate(Region2().T_ps(3, 7, consistent=True), 3).s, 7, places=12)
+
+        T = Region3().T_ph(20, 1700, consistent=True)
+        v = Region3().v_ph(20, 1700, consistent=True)
+        r = Region3.evaluate(T, 1 / v)
+        self.assertAlmostEqual(r.p, 20, places=10)
+        self.assertAlmostEqual(r.h, 1700, places=10)
+
+    def test_consistent_batch(self):
+        pees = [3, 0.001, 80, 5, 60, 80, 20, 100]
+        hs = [500, 3000, 500, 3500, 2700, 1500, 1700, 2700]
+        r = batch.evaluate(pees, h=hs, workers=1, consistent=True)
+        np.testing.assert_allclose(r.T, batch.evaluate(pees, h=hs, workers=1).T, rtol=1e-4)
+        np.testing.assert_allclose(IAPWS97.evaluate(pees[:6], T=r.T[:6]).h, hs[:6], rtol=1e-13)
+        # Region3: (p, T) goes through the v(p, T) backward equation, so evaluate on (T, rho).
+        np.testing.assert_allclose(Region3.evaluate(r.T[6:], r.rho[6:]).h, hs[6:], rtol=1e-13)
+        np.testing.assert_array_equal(r.h, batch.evaluate(pees, h=hs, workers=2, chunk_size=3, consistent=True).h)
+
+        handle = IAPWS97(p=3, h=500, consistent=True)
+        self.assertEqual(handle.T, r.T[0])
+        handle.update('ph', 80, 1500)
+        self.assertEqual(handle.T, r.T[5])
+
+    def test_consistent_not_converged(self):
+        # A single Newton step cannot converge from the backward equations.
+        with mock.patch.object(solvers, 'newton', functools.partial(solvers.newton, max_iterations=1)):
+            with self.assertWarns(RuntimeWarning):
+                Region1().T_ph(3, 500, consistent=True)
+            with self.assertWarns(RuntimeWarning):
+                Region3().v_ph(20, 1700, consistent=True)
+
+            r = batch.evaluate([3, 5], h=[500, 3500], workers=1, consistent=True)
+            for name in StateArray.columns:
+                self.assertTrue(np.isnan(getattr(r, name)).all())
+            # Region3 (p, T): the solved pressure is not written over by the input.
+            r = batch.evaluate([50, 3], T=[630, 300], workers=1, consistent=True)
+            for name in StateArray.columns:
+                self.assertTrue(np.isnan(getattr(r, name)[0]))
+            self.assertEqual(r.p[1], 3)
+
+            handle = IAPWS97(p=3, T=300)
+            self.assertRaises(ValueError, IAPWS97, p=3, h=500, consistent=True)
+            handle.consistent = True
+            self.assertRaises(ValueError, handle.update, 'ph', 3, 500)
+            self.assertEqual(handle.T, 300)
+
+    def test_solve_pT(self):
+        # Table 5 of [3], subregions a, c, r, u, y and z.
+        pees = [50, 20, 21.1, 21.5, 22, 22]
+        tees = [630, 630, 644, 644.6, 646.84, 646.89]
+        vs = [1.470853100e-3, 1.761696406e-3, 5.251009921e-3, 2.268366647e-3, 2.698354719e-3, 3.798732962e-3]
+
+        instrumentation.reset()
+        r = solvers.solve_pT(pees, tees)
+        self.assertTrue(r.converged.all())
+        np.testing.assert_allclose(r.state.p, pees, rtol=1e-14)
+        # The backward equations are within their permissible deviation, larger close to the critical point.
+        np.testing.assert_allclose(r.state.v[:3], vs[:3], rtol=1e-5)
+        np.testing.assert_allclose(r.state.v[3:], vs[3:], rtol=1e-2)
+        self.assertEqual(instrumentation.snapshot()['pT'], dict(calls=1, points=6, evaluations=int(r.iterations.sum()),
+                                                                  failures=0))
+
+        state = Region3(p=50, T=630, consistent=True)
+        self.assertEqual(state.p, 50)
+        self.assertAlmostEqual(Region3.evaluate(630, state.rho).p, 50, places=10)
+        np.testing.assert_allclose(batch.evaluate(pees, T=tees, workers=1, consistent=True).rho, r.state.rho)
+
+    def test_region3_inputs(self):
+        # Liquid, vapour (below the critical temperature) and supercritical states.
+        tees = np.array([630, 640, 700, 800])
+        rhos = np.array([650, 150, 400, 350])
+        state = Region3.evaluate(tees, rhos)
+
+        for r in (solvers.solve_Th(tees, state.h), solvers.solve_Ts(tees, state.s), solvers.solve_hs(state.h, state.s)):
+            self.assertTrue(r.converged.all())
+            np.testing.assert_allclose(r.state.rho, rhos, rtol=1e-12)
+            np.testing.assert_allclose(r.state.T, tees, rtol=1e-12)
+            np.testing.assert_allclose(r.state.p, state.p, rtol=1e-12)
+
+        for kwargs in (dict(T=700, h=state.h[2]), dict(T=700, s=state.s[2]), dict(h=state.h[2], s=state.s[2])):
+            r = Region3(**kwargs)
+            self.assertAlmostEqual(r.rho, 400, places=8)
+            self.assertAlmostEqual(r.p, state.p[2], places=8)
+
+    def test_region3_inputs_out_of_region(self):
+        # Two-phase (T, h), and (T, h) pairs out of Region3.
+        r = solvers.solve_Th([630, 645, 500, 900], [1900, 2050, 1000, 3000])
+        self.assertFalse(r.converged.any())
+        self.assertTrue(np.isnan(r.state.p).all())
+        self.assertRaises(ValueError, Region3, T=630, h=1900)
+
+    def test_gibbs_region_inputs(self):
+        # (T, h) and (T, s) pairs in Regions 1, 2 and 5, (h, s) pairs in Regions 1 and 2.
+        states = {1: Region1.evaluate([300, 400, 600], [5, 30, 80]),
+                  2: Region2.evaluate([400, 700, 1000], [0.1, 5, 60]),
+                  5: Region5.evaluate([1200, 1500, 2200], [0.5, 10, 45])}
+        for code, state in states.items():
+            results = [solvers.solve_Th(state.T, state.h, code), solvers.solve_Ts(state.T, state.s, code)]
+            if code != 5:
+                results.append(solvers.solve_hs(state.h, state.s, code))
+            for r in results:
+                self.assertTrue(r.converged.all())
+                np.testing.assert_allclose(r.state.p, state.p, rtol=1e-10)
+                np.testing.assert_allclose(r.state.T, state.T, rtol=1e-12)
+
+        # States of another region are NaN.
+        r = solvers.solve_Ts(state.T, state.s, 2)
+        self.assertFalse(r.converged.any())
+        self.assertTrue(np.isnan(r.state.p).all())
+
+    def test_instrumentation(self):
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot(), {})
+        solvers.solve_ph(1, [3, 80], [500, 500])
+        solvers.solve_ph(1, 3, 500)
+        counters = instrumentation.snapshot()['ph']
+        self.assertEqual((counters['calls'], counters['points'], counters['failures']), (2, 3, 0))
+        self.assertGreaterEqual(counters['evaluations'], 3)
+
+    def test_newton_exception(self):
+        self.assertRaises(ValueError, solvers.newton, 1, 3, 400, [('h', 500)], unknowns='c')
+        self.assertRaises(ValueError, solvers.newton, 1, 3, 400, [('h', 500)], unknowns='ab')
+
+    def test_warm_start(self):
+        # Smooth transients of 10 nodes in every region, 50 time steps.
+        steps = np.linspace(0, 1, 50)[:, None] + np.linspace(0, 0.2, 10)[None, :]
+        series = {1: Region1.evaluate(400 + 100 * steps, 30 + 20 * np.sin(3 * steps)),
+                  2: Region2.evaluate(650 + 200 * steps, 1 + 0.5 * np.sin(3 * steps)),
+                  3: Region3.evaluate(660 + 50 * steps, 1 / (0.003 + 0.001 * np.sin(3 * steps)))}
+        for code, state in series.items():
+            for name in 'hs':
+                with self.subTest(code=code, name=name):
+                    instrumentation.reset()
+                    solver = solvers.WarmStart(code, name)
+                    for T, z, p in zip(state.T, getattr(state, name), state.p):
+                        r = solver(T, z)
+                        self.assertTrue(r.converged.all())
+                        np.testing.assert_allclose(r.state.p, p, rtol=1e-11)
+                    warm = instrumentation.snapshot()
+                    self.assertEqual(warm['warm T' + name]['failures'], 0)
+
+                    instrumentation.reset()
+                    for T, z in zip(state.T, getattr(state, name)):
+                        solvers._solve_T(T, name, z, code)
+                    cold = sum(counters['evaluations'] for counters in instrumentation.snapshot().values())
+                    # Only the first step is a cold start.
+                    self.assertLess(warm['warm T' + name]['evaluations'] + warm['T' + name]['evaluations'], 0.7 * cold)
+
+    def test_warm_start_fallback(self):
+        solver = solvers.WarmStart(2, 'h')
+        r = solver(700, 3000)
+        self.assertEqual(r.state.p.shape, ())
+        self.assertAlmostEqual(float(r.state.h), 3000, places=9)
+
+        # A jump of the inputs (warm), a point out of the region and the point after it, and a change of shape (cold).
+        instrumentation.reset()
+        r = solver(1000, 3900)
+        self.assertTrue(r.converged)
+        self.assertAlmostEqual(float(Region2.evaluate(1000, r.state.p).h), 3900, places=9)
+        self.assertFalse(solver(400, 1000).converged)
+        self.assertTrue(solver(1000, 3900).converged)
+        r = solver([700, 1000], [3000, 3900])
+        self.assertTrue(r.converged.all())
+        self.assertEqual(instrumentation.snapshot()['Th']['calls'], 3)
+
+        self.assertRaises(ValueError, solvers.WarmStart, 4, 'h')
+        self.assertRaises(ValueError, solvers.WarmStart, 1, 'u')
+
+    def test_scalar_guess(self):
+        r = Region1()
+        p = r.p_Th(400, 600)
+        self.assertAlmostEqual(r.p_Th(400, 600, guess=p * 1.01), p, places=8)
+        # A guess the iteration does not converge from falls back to the cold start.
+        self.assertAlmostEqual(r.p_Th(400, 600, guess=np.nan), p, places=8)
+
+
+class TestFlash(unittest.TestCase):
+
+    def test_flash_ph(self):
+        # Table 7, table 24 and table 5 of [4], mixed with two-phase points (table 35: T_s(10 MPa)) and one out of bounds.
+        pees = [3, 0.001, 80, 10, 5, 60, 20, 20, 101]
+        hs = [500, 3000, 500, 2000, 3500, 2700, 1700, 2000, 1000]
+        r = flash.flash_ph(pees, hs)
+
+        np.testing.assert_array_equal(r.region, [1, 2, 1, 4, 2, 2, 3, 4, 0])
+        np.testing.assert_allclose(r.state.T[[0, 1, 2, 4, 5, 6]], [0.391_798_509e3, 0.534433241e3, 0.378_108_626e3,
+                                                                   0.801299102e3, 0.791137067e3, 6.293083892e2],
+                                   rtol=1e-9)
+        self.assertAlmostEqual(r.state.T[3], 0.584_149_488e3, places=6)
+        np.testing.assert_array_equal(r.state.h[:-1], hs[:-1])
+        self.assertTrue(np.isnan(r.state.h[-1]))
+        self.assertTrue(np.isnan(r.state.x[[0, 1, 2, 4, 5, 6]]).all())
+
+    def test_two_phase(self):
+        T_s = 0.584_149_488e3
+        liquid, vapour = Region1.evaluate(T_s, 10), Region2.evaluate(T_s, 10)
+        r = flash.flash_ph(10, (liquid.h + vapour.h) / 2)
+
+        self.assertEqual(r.region, 4)
+        self.assertAlmostEqual(float(r.state.x), 0.5, places=5)
+        self.assertAlmostEqual(float(r.state.v), (liquid.v + vapour.v) / 2, places=6)
+        self.assertAlmostEqual(float(r.state.s), (liquid.s + vapour.s) / 2, places=6)
+        self.assertTrue(np.isnan(r.state.cp))
+
+        # Two-phase points above 623.15 K are not in Region3.
+        r = flash.flash_ph([20, 20, 20], [1900, 2000, 2300])
+        np.testing.assert_array_equal(r.region, [4, 4, 4])
+        self.assertTrue(((0 < r.state.x) & (r.state.x < 1)).all())
+        self.assertTrue(np.isnan(batch.evaluate(20, h=2000).T).all())
+
+
+    def test_flash_ps(self):
+        # Table 9, table 29 and table 33 of [4], mixed with two-phase points and one out of bounds.
+        pees = [3, 80, 0.1, 0.1, 2.5, 50, 1, 20, 101]
+        ss = [0.5, 0.5, 7.5, 8, 8, 4.5, 5, 4.5, 5]
+        r = flash.flash_ps(pees, ss)
+
+        np.testing.assert_array_equal(r.region, [1, 1, 2, 2, 2, 3, 4, 4, 0])
+        np.testing.assert_allclose(r.state.T[:6], [0.307_842_258e3, 0.309_979_785e3, 0.399517097e3, 0.514127081e3,
+                                                   0.103984917e4, 7.163687517e2], rtol=1e-8)
+        np.testing.assert_array_equal(r.state.s[:-1], ss[:-1])
+        self.assertTrue(np.isnan(r.state.T[-1]))
+
+        # The quality of a two-phase point does not depend on the pair it is flashed from.
+        np.testing.assert_allclose(flash.flash_ph(pees[6:8], r.state.h[6:8]).state.x, r.state.x[6:8], rtol=1e-10)
+
+    def test_flash_ps_consistent(self):
+        pees = [3, 80, 0.1, 2.5]
+        ss = [0.5, 0.5, 7.5, 8]
+        r = flash.flash_ps(pees + [50], ss + [4.5], consistent=True)
+
+        np.testing.assert_array_equal(r.region, [1, 1, 2, 2, 3])
+        np.testing.assert_allclose(Region1.evaluate(r.state.T[:2], np.array(pees[:2])).s, ss[:2], rtol=1e-13)
+        np.testing.assert_allclose(Region2.evaluate(r.state.T[2:4], np.array(pees[2:])).s, ss[2:], rtol=1e-13)
+        self.assertAlmostEqual(Region3.evaluate(r.state.T[4], r.state.rho[4]).s, 4.5, places=12)
+
+class TestTaylor(unittest.TestCase):
+
+    def test_update(self):
+        tees, rhos = np.array([300, 500, 700, 900, 650, 750]), np.array([0, 0, 0, 0, 500, 200])
+        pees = np.array([3, 80, 1, 10, 0, 0])
+        for code, index in ((1, slice(0, 2)), (2, slice(2, 4)), (3, slice(4, 6))):
+            with self.subTest(code=code):
+                state = solvers._kernel(code, rhos[index] if code == 3 else pees[index], tees[index])
+                reference = taylor.Reference(code, state)
+                p, T = state.p * (1 + 2e-7), state.T * (1 - 1e-7)
+                update = reference.update(p, T)
+                self.assertFalse(update.evaluated.any())
+                self.assertTrue((update.error < 1e-9).all())
+                exact = solvers.newton(3, update.state.rho, T, [('p', p)], unknowns='a').state if code == 3 \
+                    else solvers._kernel(code, p, T)
+                for z in taylor.EXPANDED:
+                    np.testing.assert_allclose(getattr(update.state, z), getattr(exact, z), rtol=1e-10)
+
+    def test_error_estimate(self):
+        reference = taylor.Reference(2, Region2.evaluate(np.array([700, 800]), np.array([5, 10])))
+        p, T = np.array([5.05, 10.1]), np.array([707, 808])
+        state, error = reference.expand(p, T)
+        exact = Region2.evaluate(T, p)
+        actual = np.max([np.abs(getattr(state, z) / getattr(exact, z) - 1) for z in taylor.EXPANDED], axis=0)
+        np.testing.assert_allclose(error, actual, rtol=0.2)
+
+    def test_fallback(self):
+        state = Region3.evaluate(650, 500)
+        self.assertEqual(taylor.Reference(3, state).update(state.p, 650).state.h.shape, ())
+
+        reference = taylor.Reference(3, Region3.evaluate(np.array([650, 650]), np.array([500, 500])))
+        instrumentation.reset()
+        p, T = state.p * np.array([1 + 1e-8, 1.05]), np.array([650, 655])
+        update = reference.update(p, T)
+        np.testing.assert_array_equal(update.evaluated, [False, True])
+        np.testing.assert_allclose(update.state.p, p, rtol=1e-12)
+        np.testing.assert_allclose(solvers.newton(3, 500, T[1], [('p', p[1])], unknowns='a').state.h,
+                                   update.state.h[1], rtol=1e-12)
+        self.assertEqual(instrumentation.ratio('taylor'), 2)
+
+        self.assertRaises(ValueError, taylor.Reference, 4, Region1.evaluate(300, 3))
+        self.assertRaises(ValueError, taylor.Reference, 1, StateArray(T=np.array([300.]), p=np.array([3.])))
+
+
+class TestTransport(unittest.TestCase):
+
+    def test_viscosity(self):
+        # Table 4 of the IAPWS Formulation 2008 for the viscosity (muPa*s).
+        tees = np.array([298.15, 298.15, 373.15, 433.15, 433.15, 873.15, 873.15, 873.15, 1173.15, 1173.15, 1173.15])
+        rhos = np.array([998, 1200, 1000, 1, 1000, 1, 100, 600, 1, 100, 400])
+        mus = [889.735100, 1437.649467, 307.883622, 14.538324, 217.685358, 32.619287, 35.802262, 77.430195, 44.217245,
+               47.640433, 64.154608]
+        np.testing.assert_allclose(transport.viscosity(StateArray(T=tees, rho=rhos)) * 1e6, mus, atol=1e-6)
+
+    def test_thermal_conductivity(self):
+        # Table 4 of the IAPWS Formulation 2011 for the thermal conductivity (mW/(m*K)), without critical enhancement.
+        state = StateArray(T=np.array([298.15, 298.15, 298.15, 873.15]), rho=np.array([0, 998, 1200, 0]))
+        np.testing.assert_allclose(transport.thermal_conductivity(state, critical_enhancement=False) * 1e3,
+                                   [18.4341883, 607.712868, 799.038144, 79.1034659], atol=1e-6)
+
+    def test_transport(self):
+        state = batch.evaluate([0.1, 0.1, 22.5, 30], T=[298.15, 400, 647.35, 700], workers=1)
+        r = transport.transport(state)
+        np.testing.assert_allclose(r.viscosity, transport.viscosity(state))
+        np.testing.assert_allclose(r.conductivity, transport.thermal_conductivity(state))
+        np.testing.assert_allclose(r.conductivity, transport.thermal_conductivity(state, mu=r.viscosity))
+
+        # The critical enhancement is negligible far from the critical point and large close to it.
+        background = transport.thermal_conductivity(state, critical_enhancement=False)
+        np.testing.assert_allclose(r.conductivity[:2], background[:2], rtol=1e-4)
+        self.assertGreater(r.conductivity[2], 1.2 * background[2])
+        self.assertAlmostEqual(r.conductivity[0], 0.6065, places=3)
+
+    def test_critical_enhancement(self):
+        # Table 5 of the IAPWS Formulation 2011 for the thermal conductivity (mW/(m*K)), at 647.35 K away from the
+        # critical density. The reference values use IAPWS-95 for the derivatives, hence the tolerance.
+        rhos = np.array([1, 122, 422, 750])
+        state = Region3.evaluate(np.full(4, 647.35), rhos)
+        conductivity = transport.thermal_conductivity(state) * 1e3
+
+        np.testing.assert_allclose(conductivity, [51.9298924, 130.922885, 448.883487, 600.961346], rtol=5e-4)
+        background = transport.thermal_conductivity(state, critical_enhancement=False) * 1e3
+        self.assertTrue((conductivity[1:3] - background[1:3] > 10).all())
+
+
+class TestSaturation(unittest.TestCase):
+
+    def test_p_sat(self):
+        # Table 35, plus points out of range.
+        tees = np.array([[300, 500, 600], [200, 700, np.nan]])
+        r = saturation.p_sat(tees)
+
+        np.testing.assert_allclose(r.value[0], [0.353658941e-2, 0.263889776e1, 0.123443146e2], rtol=1e-8)
+        self.assertTrue(np.isnan(r.value[1]).all())
+        np.testing.assert_array_equal(r.status, [[0, 0, 0], [saturation.BELOW, saturation.ABOVE, saturation.INVALID]])
+        np.testing.assert_array_equal(r.value[0], [_p_s(T) for T in tees[0]])
+
+        r = saturation.p_sat([200, 700], clamp=True)
+        np.testing.assert_allclose(r.value, [saturation.p_MIN, saturation.p_MAX], rtol=1e-8)
+        np.testing.assert_array_equal(r.status, [saturation.BELOW, saturation.ABOVE])
+
+    def test_T_sat(self):
+        # Table 36, plus points out of range.
+        pees = [0.1, 1, 10, 30, 1e-5]
+        r = saturation.T_sat(pees)
+
+        np.testing.assert_allclose(r.value[:3], [0.372755919e3, 0.453035632e3, 0.584149488e3], rtol=1e-8)
+        self.assertTrue(np.isnan(r.value[3:]).all())
+        np.testing.assert_array_equal(r.status, [0, 0, 0, saturation.ABOVE, saturation.BELOW])
+        np.testing.assert_array_equal(r.value[:3], [Region4.T_sat(p=p) for p in pees[:3]])
+
+        r = saturation.T_sat(pees, clamp=True)
+        np.testing.assert_allclose(r.value[3:], [647.096, 273.15], rtol=1e-8)
+        np.testing.assert_allclose(saturation.p_sat(saturation.T_sat(pees[:3]).value).value, pees[:3], rtol=1e-8)
+        self.assertEqual(saturation.T_sat(1).status, saturation.IN_RANGE)
+
+
+class TestPoly(unittest.TestCase):
+
+    def test_matches_direct_evaluation(self):
+        rng = np.random.default_rng(0)
+        for name, (table, ders, draw) in benchmark.CASES.items():
+            with self.subTest(name):
+                x, y = draw(rng, 100)
+                if ders:
+                    for horner, direct in zip(_poly_ders(table, x, y), benchmark._poly_ders_direct(table, x, y)):
+                        np.testing.assert_allclose(horner, direct, rtol=1e-10)
+                else:
+                    np.testing.assert_allclose(_poly(table, x, y), benchmark._poly_direct(table, x, y), rtol=1e-10)
+
+    def test_scalars_and_broadcasting(self):
+        x, y = np.linspace(0.5, 1.5, 3), np.linspace(0.5, 1.5, 4)
+        expected = benchmark._poly_direct(Region1.table2, x[:, None], y)
+        np.testing.assert_allclose(_poly(Region1.table2, x[:, None], y), expected, rtol=1e-12)
+        np.testing.assert_allclose(_poly(Region1.table2, x[1], y), expected[1], rtol=1e-12)
+        np.testing.assert_allclose(_poly(Region1.table2, x[:, None], y[2]), expected[:, [2]], rtol=1e-12)
+        self.assertAlmostEqual(_poly(Region1.table2, 1.0, 1.0), benchmark._poly_direct(Region1.table2, 1.0, 1.0),
+                               places=10)
+
+        ders = _poly_ders(Region2.table11, x[:, None], y)
+        for horner, direct in zip(ders, benchmark._poly_ders_direct(Region2.table11, x[:, None], y)):
+            self.assertEqual(horner.shape, (3, 4))
+            np.testing.assert_allclose(horner, direct, rtol=1e-12)
+
+    def test_scalar_path(self):
+        rng = np.random.default_rng(1)
+        for name, (table, ders, draw) in benchmark.CASES.items():
+            with self.subTest(name):
+                x, y = draw(rng, 20)
+                function = _poly_ders if ders else _poly
+                arrays = function(table, x, y)
+                scalars = [function(table, float(x[i]), float(y[i])) for i in range(len(x))]
+                if ders:
+                    for k, column in enumerate(arrays):
+                        np.testing.assert_allclose([value[k] for value in scalars], column, rtol=1e-12)
+                else:
+                    np.testing.assert_allclose(scalars, arrays, rtol=1e-12)
+
+        # Python floats raise or give complex roots where numpy gives inf or NaN: the scalar path must not.
+        with np.errstate(all='ignore'):
+            self.assertEqual(_poly(Region2.table25, 0., 0.5), _poly(Region2.table25, np.zeros(1), 0.5)[0])
+            self.assertTrue(np.isnan(_poly(Region2.table25, -1., 0.5)))
+            arrays = _poly_ders(Region2.table11, np.zeros(1), 0.5)
+            for scalar, array in zip(_poly_ders(Region2.table11, 0., 0.5), arrays):
+                np.testing.assert_array_equal(scalar, array[0])
+
+    def test_benchmark(self):
+        stats = benchmark.run(points=1000, samples=20, repeats=1)
+        self.assertEqual(set(stats), set(benchmark.CASES))
+        for case in stats.values():
+            self.assertGreater(case['speedup'], 0)
+            self.assertGreater(case['scalar_speedup'], 0)
+            self.assertLess(case['horner_max_ulp'], 1e5)
+
+    def test_benchmark_handle(self):
+        stats = benchmark.run_handle(calls=10, repeats=1)
+        self.assertEqual(set(stats), set(benchmark.HANDLE_POINTS))
+        for case in stats.values():
+            self.assertGreater(case['speedup'], 0)
+            self.assertGreaterEqual(case['update_gc_collections'], 0)
+
 if __name__ == '__main__':
     unittest.main()